@@ -0,0 +1,176 @@
+"""
+Analysis Worker Module
+Runs file and recording analyses on a background thread for interactive
+front ends, with job ids, cancellation of superseded jobs and progress
+"""
+
+import itertools
+import queue
+import threading
+import numpy as np
+from audio_analyzer import AnalysisResult, analyze_signal, open_audio_blocks
+
+# Share of a file job's progress taken by decoding; the analysis stages
+# (pitch tracking, note segments, chord) fill the rest
+DECODE_SHARE = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that has been cancelled or superseded"""
+
+
+class AnalysisWorker:
+    """
+    Background analysis thread
+    
+    Every submitted job gets an increasing integer id, and submitting a new
+    job cancels the ones still queued or running: a newer file or recording
+    always supersedes the old one. A running job checks for cancellation
+    between decoded blocks and, through the progress hook of analyze_signal,
+    between analysis stages and tracked blocks, so even a long file stops
+    promptly.
+    
+    Results are posted to `events` (a queue.SimpleQueue) for the UI loop to
+    drain, e.g. from Tk's after(), as tuples:
+    
+        ('progress', job_id, fraction)   fraction of the job done (decoding
+                                         is the first DECODE_SHARE of a file)
+        ('done', job_id, result)         AnalysisResult
+        
+    No events are posted for cancelled jobs.
+    """
+    
+    def __init__(self, block_size=65536):
+        """
+        Args:
+            block_size (int): Samples decoded between progress reports and
+                cancellation checks
+        """
+        self.block_size = block_size
+        self.events = queue.SimpleQueue()
+        self._jobs = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+        self._latest = 0
+        self._cancelled_upto = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        
+    def submit_file(self, file_path, **params):
+        """
+        Queue the analysis of an audio file
+        
+        Args:
+            file_path (str, file-like or bytes): Audio source (see
+                audio_analyzer.open_audio_blocks)
+            **params: Keyword arguments for analyze_signal (reference,
+                temperament, method, ...)
+                
+        Returns:
+            int: Job id
+        """
+        return self._submit(('file', file_path, params))
+        
+    def submit_signal(self, audio_data, sample_rate, **params):
+        """
+        Queue the analysis of decoded samples (e.g. a live recording)
+        
+        Args:
+            audio_data (numpy.array): Mono audio signal
+            sample_rate (int): Sample rate in Hz
+            **params: Keyword arguments for analyze_signal
+            
+        Returns:
+            int: Job id
+        """
+        return self._submit(('signal', (audio_data, sample_rate), params))
+        
+    def cancel(self, job_id=None):
+        """
+        Cancel a job and every older one
+        
+        Args:
+            job_id (int): Job to cancel (default: every job submitted so far)
+        """
+        with self._lock:
+            self._cancelled_upto = max(self._cancelled_upto, job_id or self._latest)
+            
+    def is_cancelled(self, job_id):
+        """True if the job was cancelled or superseded by a newer one"""
+        return job_id < self._latest or job_id <= self._cancelled_upto
+        
+    def shutdown(self):
+        """Cancel every job and stop the thread once the current job ends"""
+        self.cancel()
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread = None
+            
+    def _submit(self, job):
+        with self._lock:
+            job_id = next(self._ids)
+            self._latest = job_id
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                
+        self._jobs.put((job_id, job))
+        return job_id
+        
+    def _run(self):
+        """Worker thread: analyze jobs in order, skipping cancelled ones"""
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+                
+            job_id, (kind, source, params) = item
+            if self.is_cancelled(job_id):
+                continue
+                
+            try:
+                if kind == 'file':
+                    audio_data, sample_rate = self._load(job_id, source)
+                    offset = DECODE_SHARE
+                else:
+                    audio_data, sample_rate = source
+                    offset = 0.0
+                result = analyze_signal(audio_data, sample_rate,
+                                        progress=self._reporter(job_id, offset), **params)
+            except JobCancelled:
+                continue
+            except Exception as e:
+                result = AnalysisResult(success=False, error=str(e))
+                
+            # analyze_signal turns a JobCancelled raised by the reporter into
+            # a failed result, which is dropped here
+            if not self.is_cancelled(job_id):
+                self.events.put(('done', job_id, result))
+                
+    def _reporter(self, job_id, offset):
+        """Progress hook for analyze_signal: post progress, stop if cancelled"""
+        def report(fraction):
+            if self.is_cancelled(job_id):
+                raise JobCancelled()
+            self.events.put(('progress', job_id, offset + (1.0 - offset) * fraction))
+            
+        return report
+                
+    def _load(self, job_id, file_path):
+        """Decode a file block by block, reporting progress and honouring cancellation"""
+        try:
+            sample_rate, num_samples, blocks = open_audio_blocks(file_path, self.block_size)
+        except Exception as e:
+            raise Exception(f"Error loading audio file: {str(e)}")
+            
+        audio_data = np.empty(num_samples, dtype=np.float32)
+        pos = 0
+        for block in blocks:
+            if self.is_cancelled(job_id):
+                raise JobCancelled()
+                
+            audio_data[pos:pos + len(block)] = block
+            pos += len(block)
+            self.events.put(('progress', job_id, DECODE_SHARE * pos / num_samples))
+            
+        return audio_data, sample_rate
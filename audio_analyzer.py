@@ -3,36 +3,57 @@ Audio Analyzer Module
 Handles audio file loading, FFT analysis, and note detection
 """
 
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
 import numpy as np
 from scipy.io import wavfile
-from scipy.fft import fft, fftfreq
+from numpy.lib.stride_tricks import sliding_window_view
 import wave
-from note_frequencies import get_note_from_frequency, format_note_name
+from note_frequencies import (
+    A4_FREQUENCY, get_note_from_frequency, get_notes_from_frequencies, format_note_name
+)
+from fft_cache import get_rfft_frequencies, get_window, rfft
+from pitch_estimators import (
+    PEAK_REFINEMENTS, fft_size, find_spectral_peak, get_estimator, interpolate_peak,
+    phase_vocoder_frequency
+)
+from onsets import segment_signal, steady_state
+
+try:
+    # Optional: faster JSON encoding of results
+    import orjson
+except ImportError:
+    orjson = None
+
+# Minimum threshold for a valid signal (adjust based on testing)
+# 0.01 means at least 1% of full scale
+MIN_RMS_THRESHOLD = 0.01
 
 
 def load_audio(file_path):
     """
     Load audio file and return audio data with sample rate
     
+    The file is memory-mapped and converted block by block into a single
+    preallocated float32 array, so no full-size intermediate copies are made.
+    
     Args:
-        file_path (str): Path to audio file
+        file_path (str, file-like or bytes): Path to audio file, an open
+            binary file or the encoded file contents
         
     Returns:
         tuple: (audio_data, sample_rate)
     """
     try:
-        # Try to load as WAV file
-        sample_rate, audio_data = wavfile.read(file_path)
+        sample_rate, num_samples, blocks = open_audio_blocks(file_path)
         
-        # Convert to mono if stereo
-        if len(audio_data.shape) > 1:
-            audio_data = np.mean(audio_data, axis=1)
-        
-        # Normalize to float
-        if audio_data.dtype == np.int16:
-            audio_data = audio_data.astype(np.float32) / 32768.0
-        elif audio_data.dtype == np.int32:
-            audio_data = audio_data.astype(np.float32) / 2147483648.0
+        audio_data = np.empty(num_samples, dtype=np.float32)
+        pos = 0
+        for block in blocks:
+            audio_data[pos:pos + len(block)] = block
+            pos += len(block)
         
         return audio_data, sample_rate
     
@@ -40,7 +61,63 @@ def load_audio(file_path):
         raise Exception(f"Error loading audio file: {str(e)}")
 
 
-def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
+# Full-scale value of each integer PCM sample type
+PCM_FULL_SCALE = {
+    np.dtype(np.uint8): 128.0,
+    np.dtype(np.int16): 32768.0,
+    np.dtype(np.int32): 2147483648.0,
+}
+
+
+def open_audio_blocks(file_path, block_size=65536):
+    """
+    Open a WAV file for lazy block-by-block reading
+    
+    Args:
+        file_path (str, file-like or bytes): Path to audio file, an open
+            binary file (e.g. an upload stream) or the encoded file contents
+        block_size (int): Samples (frames) per block
+        
+    Returns:
+        tuple: (sample_rate, num_samples, blocks) where blocks is a generator
+            of float32 mono arrays in [-1, 1]
+    """
+    if isinstance(file_path, (bytes, bytearray, memoryview)):
+        file_path = io.BytesIO(file_path)
+    
+    try:
+        # Memory-map the samples: only the blocks being converted are read
+        sample_rate, data = wavfile.read(file_path, mmap=True)
+    except (ValueError, TypeError):
+        # Formats numpy cannot map (e.g. 24-bit) or file-like objects
+        sample_rate, data = wavfile.read(file_path)
+    
+    return sample_rate, len(data), _iter_audio_blocks(data, block_size)
+
+
+def _iter_audio_blocks(data, block_size):
+    """Convert PCM samples to float32 mono, one block at a time"""
+    scale = PCM_FULL_SCALE.get(data.dtype)
+    
+    for start in range(0, len(data), block_size):
+        chunk = data[start:start + block_size]
+        
+        # Convert to mono if stereo (straight into a float32 block)
+        if chunk.ndim > 1:
+            block = chunk.mean(axis=1, dtype=np.float32)
+        else:
+            block = chunk.astype(np.float32)
+        
+        # Normalize to float in place
+        if data.dtype == np.uint8:
+            block -= 128.0
+        if scale is not None:
+            block *= 1.0 / scale
+        
+        yield block
+
+
+def get_fundamental_frequency(audio_data, sample_rate, window_size=None, method='fft'):
     """
     Extract fundamental frequency using FFT
     
@@ -48,6 +125,8 @@ def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
         audio_data (numpy.array): Audio signal data
         sample_rate (int): Sample rate in Hz
         window_size (int): Size of analysis window (default: use full signal)
+        method (str): Pitch estimator: 'fft' (strongest spectral peak),
+            'yin' or 'mcleod' (period-based, robust to octave errors)
         
     Returns:
         tuple: (fundamental_frequency in Hz, signal_strength, is_valid_signal)
@@ -56,10 +135,6 @@ def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
     # RMS (Root Mean Square) gives us the average signal strength
     rms = np.sqrt(np.mean(audio_data**2))
     
-    # Minimum threshold for a valid signal (adjust based on testing)
-    # 0.01 means at least 1% of full scale
-    MIN_RMS_THRESHOLD = 0.01
-    
     if rms < MIN_RMS_THRESHOLD:
         # Signal too weak - likely silence or just noise
         return 0.0, rms, False
@@ -73,60 +148,664 @@ def get_fundamental_frequency(audio_data, sample_rate, window_size=None):
     end_idx = min(len(audio_data), start_idx + window_size)
     windowed_data = audio_data[start_idx:end_idx]
     
-    # Apply Hamming window to reduce spectral leakage
-    window = np.hamming(len(windowed_data))
-    windowed_data = windowed_data * window
+    fundamental_freq, is_valid = get_estimator(method)(windowed_data, sample_rate)
     
-    # Compute FFT
-    fft_data = fft(windowed_data)
-    fft_freqs = fftfreq(len(windowed_data), 1/sample_rate)
+    if not is_valid:
+        return 0.0, rms, False
     
-    # Only consider positive frequencies
-    positive_freqs = fft_freqs[:len(fft_freqs)//2]
-    magnitude = np.abs(fft_data[:len(fft_data)//2])
+    return fundamental_freq, rms, True
+
+
+class PitchTracker:
+    """
+    Streaming frame-by-frame pitch tracker
     
-    # Find the peak frequency (fundamental)
-    # Ignore very low frequencies (below 20 Hz) which are likely noise
-    min_freq_idx = np.argmax(positive_freqs > 20)
-    max_freq_idx = np.argmax(positive_freqs > 5000)  # Ignore above 5kHz for fundamental
+    Samples are pushed in blocks of any size; every `hop_size` samples a new
+    frame of the last `frame_size` samples is analyzed. The ring buffer,
+    window and FFT scratch frame are allocated once, so memory use and
+    per-frame latency stay constant no matter how long the stream runs.
+    """
     
-    if max_freq_idx == 0:
-        max_freq_idx = len(positive_freqs)
+    def __init__(self, sample_rate, frame_size=4096, hop_size=1024,
+                 reference=A4_FREQUENCY, temperament='equal', method='fft',
+                 refine='gaussian'):
+        """
+        Initialize the tracker
+        
+        Args:
+            sample_rate (int): Sample rate in Hz
+            frame_size (int): Number of samples analyzed per frame
+            hop_size (int): Number of new samples between consecutive frames
+            reference (float): Frequency of A4 in Hz for note naming
+            temperament (str or sequence): Temperament for note naming
+            method (str): Pitch estimator ('fft', 'yin' or 'mcleod'); the
+                period-based ones work well with frames of 2048 or less
+            refine (str): Sub-bin refinement of the 'fft' peak: one of
+                PEAK_REFINEMENTS, or 'phase' to use the phase advance of the
+                peak bin between consecutive hops (phase vocoder)
+        """
+        if frame_size <= 0 or not 0 < hop_size <= frame_size:
+            raise ValueError("hop_size must be between 1 and frame_size")
+        if refine != 'phase' and refine not in PEAK_REFINEMENTS:
+            raise ValueError(f"Unknown peak refinement: {refine}")
+        
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.reference = reference
+        self.temperament = temperament
+        self.method = method
+        self._estimator = get_estimator(method)
+        self.refine = refine
+        
+        # Preallocated ring buffer, window and scratch frame
+        self._ring = np.zeros(frame_size, dtype=np.float32)
+        self._frame = np.empty(frame_size, dtype=np.float32)
+        self._window = get_window('hamming', frame_size).astype(np.float32)
+        self._n_fft = fft_size(frame_size, refine)
+        self._freqs = get_rfft_frequencies(self._n_fft, sample_rate)
+        
+        # Spectrum of the previous hop for phase vocoder refinement
+        self._prev_spectrum = np.zeros(len(self._freqs), dtype=np.complex64)
+        
+        self.reset()
     
-    search_range = magnitude[min_freq_idx:max_freq_idx]
-    search_freqs = positive_freqs[min_freq_idx:max_freq_idx]
+    def reset(self):
+        """Discard buffered samples and start a new stream"""
+        self._ring.fill(0.0)
+        self._write_pos = 0
+        self._filled = 0
+        self._since_last_frame = 0
+        self._has_prev_spectrum = False
+        self.samples_processed = 0
     
-    if len(search_range) == 0:
-        return 0.0, rms, False
+    def process(self, samples):
+        """
+        Push a block of samples and analyze every frame it completes
+        
+        Args:
+            samples (numpy.array): Mono audio samples (any length)
+            
+        Returns:
+            list: One dict per completed frame with keys 'time' (frame
+                center in seconds), 'frequency', 'rms', 'is_valid',
+                'note' and 'cents'
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        results = []
+        pos = 0
+        
+        while pos < len(samples):
+            # Copy up to the next hop boundary into the ring buffer
+            n = min(len(samples) - pos, self.hop_size - self._since_last_frame)
+            self._write(samples[pos:pos + n])
+            pos += n
+            
+            self._since_last_frame += n
+            self.samples_processed += n
+            self._filled = min(self.frame_size, self._filled + n)
+            
+            if self._since_last_frame == self.hop_size:
+                self._since_last_frame = 0
+                if self._filled == self.frame_size:
+                    results.append(self._analyze_frame())
+        
+        return results
+    
+    def _write(self, block):
+        """Write a block (at most frame_size samples) into the ring buffer"""
+        n = len(block)
+        end = self._write_pos + n
+        
+        if end <= self.frame_size:
+            self._ring[self._write_pos:end] = block
+        else:
+            first = self.frame_size - self._write_pos
+            self._ring[self._write_pos:] = block[:first]
+            self._ring[:n - first] = block[first:]
+        
+        self._write_pos = end % self.frame_size
+    
+    def _analyze_frame(self):
+        """Analyze the frame currently held in the ring buffer"""
+        # Unroll the ring buffer (oldest sample first) into the scratch frame
+        split = self.frame_size - self._write_pos
+        self._frame[:split] = self._ring[self._write_pos:]
+        self._frame[split:] = self._ring[:self._write_pos]
+        
+        rms = float(np.sqrt(np.dot(self._frame, self._frame) / self.frame_size))
+        time = (self.samples_processed - self.frame_size / 2) / self.sample_rate
+        
+        frequency, is_valid = 0.0, False
+        has_spectrum = False
+        if rms >= MIN_RMS_THRESHOLD and self.method == 'fft':
+            frequency, is_valid = self._fft_frequency()
+            has_spectrum = True
+        elif rms >= MIN_RMS_THRESHOLD:
+            frequency, is_valid = self._estimator(self._frame, self.sample_rate)
+        self._has_prev_spectrum = has_spectrum
+        
+        note, cents = None, None
+        if is_valid:
+            note, _, cents = get_note_from_frequency(frequency, self.reference, self.temperament)
+            cents = float(cents)
+        
+        return {
+            'time': time,
+            'frequency': float(frequency),
+            'rms': rms,
+            'is_valid': is_valid,
+            'note': note,
+            'cents': cents
+        }
+
+    def _fft_frequency(self):
+        """Refined strongest spectral peak of the scratch frame"""
+        np.multiply(self._frame, self._window, out=self._frame)
+        spectrum = rfft(self._frame, self._n_fft)
+        magnitude = np.abs(spectrum)
+        
+        if self.refine != 'phase':
+            frequency, is_valid = find_spectral_peak(magnitude, self._freqs, refine=self.refine)
+        else:
+            frequency, is_valid = find_spectral_peak(magnitude, self._freqs, refine='none')
+            peak_bin = int(round(frequency / self._freqs[1]))
+            
+            if is_valid and self._has_prev_spectrum:
+                frequency = phase_vocoder_frequency(
+                    np.angle(self._prev_spectrum[peak_bin]), np.angle(spectrum[peak_bin]),
+                    peak_bin, self.frame_size, self.hop_size, self.sample_rate
+                )
+            elif is_valid:
+                # First frame of a note: no previous phase to compare with
+                frequency += interpolate_peak(magnitude, peak_bin) * self._freqs[1]
+                
+            self._prev_spectrum[:] = spectrum
+            
+        return float(frequency), bool(is_valid)
+
+
+def track_pitch(audio_data, sample_rate, frame_size=4096, hop_size=1024, block_size=65536,
+                reference=A4_FREQUENCY, temperament='equal', method='fft', refine='gaussian',
+                progress=None):
+    """
+    Run a PitchTracker over a whole signal and collect its pitch track
+    
+    For a signal already in memory, analyze_frames gives the same track
+    with batched FFTs.
     
-    peak_idx = np.argmax(search_range)
-    fundamental_freq = search_freqs[peak_idx]
-    peak_magnitude = search_range[peak_idx]
+    Args:
+        audio_data (numpy.array or iterable): Audio signal data, or an
+            iterable of sample blocks (e.g. from open_audio_blocks)
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per analysis frame
+        hop_size (int): Samples between consecutive frames
+        block_size (int): Samples pushed to the tracker at a time when
+            audio_data is an array
+        reference (float): Frequency of A4 in Hz for note naming
+        temperament (str or sequence): Temperament for note naming
+        method (str): Pitch estimator ('fft', 'yin' or 'mcleod')
+        refine (str): Sub-bin refinement of the 'fft' peak (see PitchTracker)
+        progress (callable): Called after every block with the number of
+            samples processed so far; an exception it raises stops the
+            tracking
+        
+    Returns:
+        dict: Arrays 'time', 'frequency', 'rms', 'cents' and 'is_valid'
+            plus the list 'note', one entry per frame
+    """
+    tracker = PitchTracker(sample_rate, frame_size, hop_size, reference, temperament, method, refine)
+    frames = []
+    processed = 0
     
-    # Calculate Signal-to-Noise Ratio (SNR)
-    # Compare peak magnitude to average magnitude
-    avg_magnitude = np.mean(search_range)
-    snr = peak_magnitude / (avg_magnitude + 1e-10)  # Avoid division by zero
+    if isinstance(audio_data, np.ndarray):
+        blocks = (audio_data[start:start + block_size] for start in range(0, len(audio_data), block_size))
+    else:
+        blocks = audio_data
     
-    # Require a clear peak (SNR > 3 means peak is at least 3x stronger than average)
-    MIN_SNR = 3.0
+    for block in blocks:
+        frames.extend(tracker.process(block))
+        processed += len(block)
+        if progress is not None:
+            progress(processed)
     
-    if snr < MIN_SNR:
-        # No clear fundamental frequency - likely just noise
-        return 0.0, rms, False
+    return {
+        'time': np.array([f['time'] for f in frames]),
+        'frequency': np.array([f['frequency'] for f in frames]),
+        'rms': np.array([f['rms'] for f in frames]),
+        'cents': np.array([f['cents'] if f['is_valid'] else np.nan for f in frames]),
+        'is_valid': np.array([f['is_valid'] for f in frames], dtype=bool),
+        'note': [f['note'] for f in frames]
+    }
+
+
+def frame_signal(audio_data, frame_size, hop_size):
+    """
+    Split a signal into overlapping frames without copying
     
-    return fundamental_freq, rms, True
+    Args:
+        audio_data (numpy.array): Audio signal data
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between the starts of consecutive frames
+        
+    Returns:
+        numpy.array: Read-only strided view of shape (num_frames, frame_size)
+    """
+    if len(audio_data) < frame_size:
+        return np.empty((0, frame_size), dtype=audio_data.dtype)
+    
+    return sliding_window_view(audio_data, frame_size)[::hop_size]
+
+
+def compute_frame_spectra(audio_data, sample_rate, frame_size=4096, hop_size=1024,
+                          window='hamming', workers=-1):
+    """
+    Compute the spectrum of every frame with a single batched FFT
+    
+    The whole spectrogram is held at once; for long signals use
+    iter_frame_spectra, which transforms the frames in batches.
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between consecutive frames
+        window (str): Window type ('hamming', 'hanning', 'blackman', 'none')
+        workers (int): FFT worker threads (-1 uses all cores)
+        
+    Returns:
+        tuple: (times, frequencies, spectra) where times are the frame
+            centers in seconds and spectra is a complex array of shape
+            (num_frames, frame_size // 2 + 1)
+    """
+    frames = frame_signal(audio_data, frame_size, hop_size)
+    
+    # The window is broadcast over every row of the frame matrix
+    if window != 'none':
+        frames = frames * get_window(window, frame_size)
+    
+    spectra = rfft(frames, axis=-1, workers=workers)
+    frequencies = get_rfft_frequencies(frame_size, sample_rate)
+    times = (np.arange(len(frames)) * hop_size + frame_size / 2) / sample_rate
+    
+    return times, frequencies, spectra
+
+
+def iter_frame_spectra(audio_data, frame_size=4096, hop_size=1024, window='hamming',
+                       workers=-1, batch_frames=256, n_fft=None):
+    """
+    Compute the spectra of a signal's frames in batches
+    
+    Each batch is one multi-frame FFT, so the memory used is bounded by the
+    batch (its windowed frames and spectra) however long the signal is.
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between consecutive frames
+        window (str): Window type ('hamming', 'hanning', 'blackman', 'none')
+        workers (int): FFT worker threads (-1 uses all cores)
+        batch_frames (int): Frames transformed per FFT call
+        n_fft (int): FFT length, zero-padding each frame (default frame_size)
+        
+    Yields:
+        tuple: (start, spectra) where start is the index of the first frame
+            of the batch and spectra is a complex array of shape
+            (frames in the batch, n_fft // 2 + 1)
+    """
+    frames = frame_signal(audio_data, frame_size, hop_size)
+    window_values = get_window(window, frame_size) if window != 'none' else None
+    
+    for start in range(0, len(frames), batch_frames):
+        batch = frames[start:start + batch_frames]
+        if window_values is not None:
+            batch = batch * window_values
+        yield start, rfft(batch, n_fft, axis=-1, workers=workers)
+
+
+def analyze_frames(audio_data, sample_rate, frame_size=4096, hop_size=1024,
+                   workers=-1, batch_frames=256, reference=A4_FREQUENCY, temperament='equal',
+                   refine='gaussian'):
+    """
+    Vectorized pitch track of a whole signal
+    
+    Batch counterpart of track_pitch for in-memory signals: frames are
+    analyzed `batch_frames` at a time (see iter_frame_spectra), so memory
+    stays bounded and no Python code runs per frame in the transform.
+    
+    Args:
+        audio_data (numpy.array): Audio signal data
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between consecutive frames
+        workers (int): FFT worker threads (-1 uses all cores)
+        batch_frames (int): Frames transformed per FFT call
+        reference (float): Frequency of A4 in Hz for note naming
+        temperament (str or sequence): Temperament for note naming
+        refine (str): Sub-bin peak refinement, one of PEAK_REFINEMENTS
+            ('phase' needs the frame-to-frame state of a PitchTracker)
+        
+    Returns:
+        dict: Same layout as track_pitch
+    """
+    if refine not in PEAK_REFINEMENTS:
+        raise ValueError(f"Unknown peak refinement: {refine}")
+    
+    frames = frame_signal(audio_data, frame_size, hop_size)
+    num_frames = len(frames)
+    n_fft = fft_size(frame_size, refine)
+    freqs = get_rfft_frequencies(n_fft, sample_rate)
+    
+    frequency = np.zeros(num_frames)
+    is_valid = np.zeros(num_frames, dtype=bool)
+    rms = np.sqrt(np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frame_size)
+    
+    for start, spectra in iter_frame_spectra(audio_data, frame_size, hop_size, 'hamming',
+                                             workers, batch_frames, n_fft):
+        batch = slice(start, start + len(spectra))
+        frequency[batch], is_valid[batch] = find_spectral_peak(np.abs(spectra), freqs,
+                                                               refine=refine)
+    
+    # Frames below the RMS threshold are silence regardless of their spectrum
+    is_valid &= rms >= MIN_RMS_THRESHOLD
+    frequency[~is_valid] = 0.0
+    
+    notes, _, cents = get_notes_from_frequencies(frequency, reference, temperament)
+    
+    return {
+        'time': (np.arange(num_frames) * hop_size + frame_size / 2) / sample_rate,
+        'frequency': frequency,
+        'rms': rms,
+        'cents': cents,
+        'is_valid': is_valid,
+        'note': notes.tolist()
+    }
+
+
+def _add_slots(cls):
+    """
+    Recreate a dataclass with __slots__ for its fields
+    
+    dataclass(slots=True) needs Python 3.10. A class body cannot declare
+    __slots__ for fields that have defaults (the defaults are class
+    attributes), so the class is rebuilt without them; the generated
+    __init__ already holds the defaults.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_add_slots
+@dataclass
+class AnalysisResult:
+    """
+    Result of analyze_audio / analyze_signal
+    
+    Every number is stored as a plain Python int/float/bool, so the result
+    serializes without per-field numpy conversion. It can still be read like
+    the dict it replaces (result['note'], result.get('cents')). Instances
+    have __slots__ and no __dict__.
+    """
+    
+    frequency: float = 0.0
+    note: str = None
+    exact_frequency: float = 0.0
+    cents: float = 0.0
+    note_formatted: str = None
+    tuning_status: str = None
+    sample_rate: int = None
+    duration: float = None
+    signal_strength: float = 0.0
+    has_valid_signal: bool = False
+    success: bool = True
+    error: str = None
+    audio_data: np.ndarray = field(default=None, repr=False)
+    pitch_track: dict = field(default=None, repr=False)
+    segments: list = field(default=None, repr=False)
+    chord: list = field(default=None, repr=False)
+    
+    # Fields holding arrays, left out of to_dict() unless asked for
+    SIGNAL_FIELDS = ('audio_data', 'pitch_track')
+    
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+    
+    def to_dict(self, include_signal=False):
+        """
+        Convert to a plain dict
+        
+        Args:
+            include_signal (bool): Also include 'audio_data' and 'pitch_track'
+            
+        Returns:
+            dict: Field values (arrays are not copied)
+        """
+        return {
+            name: getattr(self, name) for name in self.__slots__
+            if include_signal or name not in self.SIGNAL_FIELDS
+        }
+    
+    def to_json(self, include_signal=False):
+        """
+        Serialize to JSON, with orjson when it is installed
+        
+        Args:
+            include_signal (bool): Also include the signal and pitch track
+            
+        Returns:
+            bytes: UTF-8 JSON document
+        """
+        data = self.to_dict(include_signal)
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(data, default=_json_default).encode()
+
+
+def _json_default(value):
+    """Convert numpy values for the standard json module"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def get_tuning_status(cents):
+    """
+    Describe how far a note is from its target pitch
+    
+    Args:
+        cents (float): Deviation in cents
+        
+    Returns:
+        str: Tuning status message
+    """
+    # Determine if in tune (within ±10 cents is considered good)
+    if abs(cents) < 10:
+        return "En tono ✓"
+    elif cents > 0:
+        return "Agudo (sostenido)"
+    else:
+        return "Grave (bemol)"
+
+
+def analyze_segments(audio_data, sample_rate, reference=A4_FREQUENCY, temperament='equal',
+                     method='fft', onset_method='complex', max_workers=None, progress=None):
+    """
+    Split a recording into notes at their onsets and analyze each one
+    
+    The onsets are found on the decoded signal (see onsets.segment_signal)
+    and the steady part of every note, after its attack, is analyzed on a
+    thread pool; the segments are views of the signal, so nothing is read
+    or copied again.
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal
+        sample_rate (int): Sample rate in Hz
+        reference (float): Frequency of A4 in Hz
+        temperament (str or sequence): Temperament (see note_frequencies)
+        method (str): Pitch estimator: 'fft', 'yin' or 'mcleod'
+        onset_method (str): Onset detection function: 'flux' or 'complex'
+        max_workers (int): Analysis threads (default: ThreadPoolExecutor's)
+        progress (callable): Called with the fraction of the notes analyzed
+            as each one finishes; an exception it raises cancels the notes
+            not yet started and stops the analysis
+        
+    Returns:
+        list: One dict per note with a valid signal, in time order, with
+            'start' and 'end' in seconds and the note fields of
+            AnalysisResult ('frequency', 'note', 'cents', ...)
+    """
+    bounds = segment_signal(audio_data, sample_rate, method=onset_method)
+    
+    def analyze_segment(segment):
+        start, end = steady_state(*segment, sample_rate)
+        return analyze_signal(audio_data[start:end], sample_rate, reference=reference,
+                              temperament=temperament, method=method, summary_only=True)
+                              
+    results = []
+    with ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(analyze_segment, segment) for segment in bounds]
+        try:
+            for future in futures:
+                results.append(future.result())
+                if progress is not None:
+                    progress(len(results) / len(futures))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        
+    return [
+        {
+            'start': start / sample_rate,
+            'end': end / sample_rate,
+            'frequency': result.frequency,
+            'note': result.note,
+            'exact_frequency': result.exact_frequency,
+            'cents': result.cents,
+            'note_formatted': result.note_formatted,
+            'tuning_status': result.tuning_status,
+            'signal_strength': result.signal_strength,
+        }
+        for (start, end), result in zip(bounds, results)
+        if result.success and result.has_valid_signal
+    ]
 
 
-def analyze_audio(file_path):
+def analyze_audio(file_path, track=False, frame_size=4096, hop_size=1024,
+                  reference=A4_FREQUENCY, temperament='equal', method='fft', cache=None,
+                  summary_only=False, segments=False, chord=False):
     """
     Complete audio analysis: load file, detect frequency, identify note
     
     Args:
-        file_path (str): Path to audio file
+        file_path (str, file-like or bytes): Path to audio file, an open
+            binary file or the encoded file contents
+        track (bool): If True, stream the file block by block through the
+            PitchTracker and return its per-frame pitch track; the scalar
+            results then summarize the valid frames (median frequency). The
+            signal is never held in memory, so 'audio_data' is None
+        frame_size (int): Samples per frame when tracking
+        hop_size (int): Samples between frames when tracking
+        reference (float): Frequency of A4 in Hz (e.g. 440, 442, 415)
+        temperament (str or sequence): 'equal', 'just', 'pythagorean',
+            'meantone' or 12 custom cents offsets (see note_frequencies)
+        method (str): Pitch estimator: 'fft', 'yin' or 'mcleod'
+        cache (ResultCache): Optional result cache (see result_cache); the
+            file contents are hashed and a cached result for the same bytes
+            and parameters is returned without decoding the file. The
+            decoded signal is never cached, so with a cache 'audio_data' is
+            always None (as with summary_only); the pitch track is, since
+            track=True asks for it. Cached results are shared and must not
+            be modified
+        summary_only (bool): Drop the decoded signal as soon as it has been
+            analyzed ('audio_data' is None), e.g. for servers that only
+            return the note
+        segments (bool): Also split the recording into notes and analyze
+            each one (see analyze_segments); the file is then decoded
+            whole even when tracking
+        chord (bool): Also detect every note sounding together (see
+            multipitch.detect_notes); the file is then decoded whole even
+            when tracking
         
     Returns:
-        dict: Analysis results containing:
+        AnalysisResult: Analysis results (see analyze_signal)
+    """
+    try:
+        if cache is not None:
+            # Keep cache entries small: never store the decoded signal
+            summary_only = True
+            key = cache.make_key(file_path, track=track, frame_size=frame_size,
+                                 hop_size=hop_size, reference=float(reference),
+                                 temperament=temperament, method=method,
+                                 segments=segments, chord=chord)
+            result = cache.get(key)
+            if result is not None:
+                return result
+        
+        if track and not (segments or chord):
+            # Stream blocks straight from the file into the tracker
+            sample_rate, num_samples, audio_data = open_audio_blocks(file_path)
+            duration = num_samples / sample_rate
+        else:
+            # Load audio
+            audio_data, sample_rate = load_audio(file_path)
+            duration = None
+        
+        result = analyze_signal(audio_data, sample_rate, track, frame_size, hop_size,
+                                reference=reference, temperament=temperament,
+                                method=method, duration=duration,
+                                summary_only=summary_only, segments=segments, chord=chord)
+        
+        if cache is not None and result.success:
+            cache.put(key, result)
+        
+        return result
+    
+    except Exception as e:
+        return AnalysisResult(success=False, error=str(e))
+
+
+def analyze_signal(audio_data, sample_rate, track=False, frame_size=4096, hop_size=1024,
+                   reference=A4_FREQUENCY, temperament='equal', method='fft', duration=None,
+                   summary_only=False, segments=False, chord=False, progress=None):
+    """
+    Complete analysis of decoded samples: detect frequency, identify note
+    
+    Args:
+        audio_data (numpy.array or iterable): Mono audio signal, or (when
+            tracking) an iterable of sample blocks
+        sample_rate (int): Sample rate in Hz
+        track (bool): If True, run the PitchTracker over the signal and
+            return its per-frame pitch track; the scalar results then
+            summarize the valid frames (median frequency)
+        frame_size (int): Samples per frame when tracking
+        hop_size (int): Samples between frames when tracking
+        reference (float): Frequency of A4 in Hz (e.g. 440, 442, 415)
+        temperament (str or sequence): Temperament (see note_frequencies)
+        method (str): Pitch estimator: 'fft', 'yin' or 'mcleod'
+        duration (float): Signal duration in seconds (default: from the
+            length of audio_data, which must then be an array)
+        summary_only (bool): Do not keep the signal in the result
+        segments (bool): Also analyze every note of the recording
+            separately (audio_data must then be an array)
+        chord (bool): Also detect the notes of a chord or interval held
+            through the recording (audio_data must then be an array)
+        progress (callable): Called with the fraction of the analysis done
+            after every stage and every tracked block, e.g. to report
+            progress or to check for cancellation: an exception it raises
+            stops the analysis (which then returns a failed result)
+        
+    Returns:
+        AnalysisResult: Analysis results (also readable as a dict) containing:
             - 'frequency': Detected fundamental frequency
             - 'note': Closest musical note
             - 'exact_frequency': Exact frequency of the note
@@ -134,69 +813,103 @@ def analyze_audio(file_path):
             - 'note_formatted': Formatted note name
             - 'sample_rate': Audio sample rate
             - 'duration': Audio duration in seconds
-            - 'audio_data': Raw audio data for visualization
+            - 'audio_data': Raw audio data for visualization (None when
+              blocks were streamed)
             - 'signal_strength': RMS amplitude of the signal
             - 'has_valid_signal': Whether a valid musical signal was detected
+            - 'pitch_track': Per-frame results (only when track=True)
+            - 'segments': Timestamped per-note results (only when
+              segments=True, see analyze_segments)
+            - 'chord': Simultaneous notes sorted by pitch (only when
+              chord=True, see multipitch.detect_notes)
     """
     try:
-        # Load audio
-        audio_data, sample_rate = load_audio(file_path)
-        duration = len(audio_data) / sample_rate
+        if duration is None:
+            duration = len(audio_data) / sample_rate
+        
+        # Each stage (pitch, segments, chord) is an equal share of the progress
+        num_stages = 1 + bool(segments) + bool(chord)
+        stages_done = 0
+        
+        def report(fraction=1.0):
+            if progress is not None:
+                progress((stages_done + min(fraction, 1.0)) / num_stages)
         
-        # Get fundamental frequency with signal validation
-        fundamental_freq, signal_strength, has_valid_signal = get_fundamental_frequency(audio_data, sample_rate)
+        pitch_track = None
+        if track:
+            num_samples = max(1, round(duration * sample_rate))
+            pitch_track = track_pitch(audio_data, sample_rate, frame_size, hop_size,
+                                      reference=reference, temperament=temperament,
+                                      method=method,
+                                      progress=lambda processed: report(processed / num_samples))
+            valid = pitch_track['is_valid']
+            
+            # Summarize the track: overall RMS and median pitch of valid frames
+            signal_strength = np.sqrt(np.mean(pitch_track['rms']**2)) if len(valid) else 0.0
+            has_valid_signal = bool(np.any(valid))
+            fundamental_freq = np.median(pitch_track['frequency'][valid]) if has_valid_signal else 0.0
+        else:
+            # Get fundamental frequency with signal validation
+            fundamental_freq, signal_strength, has_valid_signal = get_fundamental_frequency(audio_data, sample_rate, method=method)
+        report()
+        stages_done += 1
+        
+        note_segments = None
+        if segments:
+            note_segments = analyze_segments(audio_data, sample_rate, reference, temperament, method,
+                                             progress=report)
+            report()
+            stages_done += 1
+            
+        chord_notes = None
+        if chord:
+            # multipitch imports this module
+            from multipitch import detect_notes
+            chord_notes = detect_notes(audio_data, sample_rate, reference=reference,
+                                       temperament=temperament, progress=report)
+            report()
+            
+        if summary_only or not isinstance(audio_data, np.ndarray):
+            audio_data = None
         
         # Check if we have a valid signal
         if not has_valid_signal:
-            return {
-                'frequency': 0.0,
-                'note': 'N/A',
-                'exact_frequency': 0.0,
-                'cents': 0.0,
-                'note_formatted': 'Sin señal',
-                'tuning_status': 'No se detectó señal de audio válida',
-                'sample_rate': sample_rate,
-                'duration': duration,
-                'audio_data': audio_data,
-                'signal_strength': signal_strength,
-                'has_valid_signal': False,
-                'success': True,
-                'error': None
-            }
+            return AnalysisResult(
+                note='N/A',
+                note_formatted='Sin señal',
+                tuning_status='No se detectó señal de audio válida',
+                sample_rate=int(sample_rate),
+                duration=float(duration),
+                audio_data=audio_data,
+                signal_strength=float(signal_strength),
+                has_valid_signal=False,
+                pitch_track=pitch_track,
+                segments=note_segments,
+                chord=chord_notes
+            )
         
         # Identify note
-        note, exact_freq, cents = get_note_from_frequency(fundamental_freq)
-        note_formatted = format_note_name(note)
-        
-        # Determine if in tune (within ±10 cents is considered good)
-        if abs(cents) < 10:
-            tuning_status = "En tono ✓"
-        elif cents > 0:
-            tuning_status = "Agudo (sostenido)"
-        else:
-            tuning_status = "Grave (bemol)"
+        note, exact_freq, cents = get_note_from_frequency(fundamental_freq, reference, temperament)
         
-        return {
-            'frequency': fundamental_freq,
-            'note': note,
-            'exact_frequency': exact_freq,
-            'cents': cents,
-            'note_formatted': note_formatted,
-            'tuning_status': tuning_status,
-            'sample_rate': sample_rate,
-            'duration': duration,
-            'audio_data': audio_data,
-            'signal_strength': signal_strength,
-            'has_valid_signal': True,
-            'success': True,
-            'error': None
-        }
+        return AnalysisResult(
+            frequency=float(fundamental_freq),
+            note=note,
+            exact_frequency=float(exact_freq),
+            cents=float(cents),
+            note_formatted=format_note_name(note),
+            tuning_status=get_tuning_status(cents),
+            sample_rate=int(sample_rate),
+            duration=float(duration),
+            audio_data=audio_data,
+            signal_strength=float(signal_strength),
+            has_valid_signal=True,
+            pitch_track=pitch_track,
+            segments=note_segments,
+            chord=chord_notes
+        )
     
     except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
+        return AnalysisResult(success=False, error=str(e))
 
 
 if __name__ == "__main__":
@@ -205,10 +918,11 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1:
         file_path = sys.argv[1]
+        method = sys.argv[2] if len(sys.argv) > 2 else 'fft'
         print(f"Analyzing: {file_path}")
         print("-" * 60)
         
-        result = analyze_audio(file_path)
+        result = analyze_audio(file_path, method=method, segments=True)
         
         if result['success']:
             print(f"Detected Frequency: {result['frequency']:.2f} Hz")
@@ -217,7 +931,13 @@ if __name__ == "__main__":
             print(f"Deviation: {result['cents']:+.1f} cents")
             print(f"Status: {result['tuning_status']}")
             print(f"Duration: {result['duration']:.2f} seconds")
+            
+            if len(result['segments']) > 1:
+                print("-" * 60)
+                for segment in result['segments']:
+                    print(f"{segment['start']:7.2f}s  {segment['note_formatted']:>6}  "
+                          f"{segment['frequency']:8.2f} Hz  {segment['cents']:+6.1f} cents")
         else:
             print(f"Error: {result['error']}")
     else:
-        print("Usage: python audio_analyzer.py <audio_file.wav>")
+        print("Usage: python audio_analyzer.py <audio_file.wav> [fft|yin|mcleod]")
@@ -8,13 +8,22 @@ import wave
 import numpy as np
 import os
 import tempfile
+import threading
 from datetime import datetime
 
 
 class LiveRecorder:
-    """Clase para grabar audio en vivo desde el micrófono"""
+    """
+    Clase para grabar audio en vivo desde el micrófono
+    
+    Además de record() (grabación bloqueante a un WAV), permite una captura
+    continua: start_stream() abre un stream de PyAudio en modo callback que
+    escribe las muestras (float32 mono) en un buffer circular preasignado,
+    del que se leen las últimas N muestras (get_latest) o bloques nuevos a
+    medida que llegan (iter_blocks), sin pasar por disco.
+    """
     
-    def __init__(self, sample_rate=44100, channels=1, chunk_size=1024):
+    def __init__(self, sample_rate=44100, channels=1, chunk_size=1024, buffer_seconds=10.0):
         """
         Inicializa el grabador de audio
         
@@ -22,6 +31,7 @@ class LiveRecorder:
             sample_rate: Frecuencia de muestreo (Hz)
             channels: Número de canales (1=mono, 2=estéreo)
             chunk_size: Tamaño del buffer de audio
+            buffer_seconds: Duración del buffer circular de la captura continua
         """
         self.sample_rate = sample_rate
         self.channels = channels
@@ -30,6 +40,198 @@ class LiveRecorder:
         self.audio = None
         self.stream = None
         
+        # Buffer circular de la captura continua
+        self._ring = np.zeros(int(sample_rate * buffer_seconds), dtype=np.float32)
+        self._write_pos = 0
+        self._total = 0  # Muestras escritas desde start_stream()
+        self._condition = threading.Condition()
+        self._callback_stream = None
+        self._callback_audio = None
+        
+    @property
+    def is_streaming(self):
+        """True mientras la captura continua está activa"""
+        return self._callback_stream is not None
+    
+    @property
+    def samples_captured(self):
+        """Muestras recibidas desde el último start_stream()"""
+        return self._total
+    
+    def start_stream(self):
+        """
+        Inicia la captura continua en segundo plano (modo callback)
+        
+        Raises:
+            Exception: Si hay problemas con el micrófono
+        """
+        if self.is_streaming:
+            return
+        
+        with self._condition:
+            self._ring.fill(0.0)
+            self._write_pos = 0
+            self._total = 0
+        
+        try:
+            self._callback_audio = pyaudio.PyAudio()
+            self._callback_stream = self._callback_audio.open(
+                format=self.format,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.chunk_size,
+                stream_callback=self._on_audio
+            )
+            self._callback_stream.start_stream()
+        except Exception as e:
+            self.stop_stream()
+            raise Exception(f"Error al iniciar la captura: {str(e)}")
+    
+    def stop_stream(self):
+        """Detiene la captura continua (el buffer conserva lo capturado)"""
+        stream, audio = self._callback_stream, self._callback_audio
+        self._callback_stream = None
+        self._callback_audio = None
+        
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+        if audio is not None:
+            audio.terminate()
+        
+        # Despertar a los lectores de iter_blocks()
+        with self._condition:
+            self._condition.notify_all()
+    
+    def __enter__(self):
+        self.start_stream()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop_stream()
+    
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """Callback de PyAudio: escribe el bloque en el buffer circular"""
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        
+        with self._condition:
+            n = len(samples)
+            size = len(self._ring)
+            if n > size:
+                samples = samples[-size:]
+                n = size
+            
+            # Escribir (convirtiendo a float en [-1, 1]) sin memoria nueva
+            end = self._write_pos + n
+            if end <= size:
+                np.multiply(samples, 1.0 / 32768, out=self._ring[self._write_pos:end], casting='unsafe')
+            else:
+                first = size - self._write_pos
+                np.multiply(samples[:first], 1.0 / 32768, out=self._ring[self._write_pos:], casting='unsafe')
+                np.multiply(samples[first:], 1.0 / 32768, out=self._ring[:n - first], casting='unsafe')
+            
+            self._write_pos = end % size
+            self._total += n
+            self._condition.notify_all()
+        
+        return None, pyaudio.paContinue
+    
+    def _read(self, start, n):
+        """Copia n muestras a partir de la posición absoluta start (con el lock tomado)"""
+        size = len(self._ring)
+        begin = start % size
+        end = begin + n
+        if end <= size:
+            return self._ring[begin:end].copy()
+        return np.concatenate((self._ring[begin:], self._ring[:end - size]))
+    
+    def get_latest(self, n):
+        """
+        Devuelve las últimas n muestras capturadas
+        
+        Args:
+            n: Número de muestras (como mucho el tamaño del buffer)
+            
+        Returns:
+            numpy.array: Muestras float32 mono en orden cronológico (menos
+                de n si todavía no se han capturado tantas)
+        """
+        with self._condition:
+            n = min(n, self._total, len(self._ring))
+            return self._read(self._total - n, n)
+    
+    def iter_blocks(self, block_size=None, timeout=1.0):
+        """
+        Generador de bloques nuevos a medida que se capturan
+        
+        Si el lector se retrasa más que la duración del buffer, salta a las
+        muestras más antiguas que aún se conservan.
+        
+        Args:
+            block_size: Muestras por bloque (default: chunk_size)
+            timeout: Segundos de espera sin datos antes de terminar
+            
+        Yields:
+            numpy.array: Bloques float32 mono de block_size muestras
+        """
+        block_size = block_size or self.chunk_size
+        position = self._total
+        
+        while True:
+            with self._condition:
+                ready = self._condition.wait_for(
+                    lambda: self._total - position >= block_size or not self.is_streaming,
+                    timeout
+                )
+                if not ready or self._total - position < block_size:
+                    return
+                
+                # Descartar lo que ya se ha sobrescrito
+                position = max(position, self._total - len(self._ring))
+                block = self._read(position, block_size)
+                position += block_size
+            
+            yield block
+    
+    def capture(self, duration=3.0):
+        """
+        Graba audio en memoria, sin archivo temporal
+        
+        Args:
+            duration: Duración de la grabación en segundos
+            
+        Returns:
+            tuple: (audio_data, sample_rate) con audio_data float32 mono
+            
+        Raises:
+            Exception: Si hay problemas con el micrófono
+        """
+        num_samples = int(self.sample_rate * duration)
+        if num_samples > len(self._ring):
+            raise ValueError("La duración supera el buffer de captura")
+        
+        was_streaming = self.is_streaming
+        self.start_stream()
+        start = self._total
+        
+        try:
+            with self._condition:
+                finished = self._condition.wait_for(
+                    lambda: self._total - start >= num_samples or not self.is_streaming,
+                    duration + 2.0
+                )
+                if not finished or self._total - start < num_samples:
+                    raise Exception("El micrófono dejó de enviar audio")
+                audio_data = self._read(start, num_samples)
+        finally:
+            if not was_streaming:
+                self.stop_stream()
+        
+        return audio_data, self.sample_rate
+        
     def record(self, duration=3.0, output_file=None):
         """
         Graba audio desde el micrófono
@@ -0,0 +1,482 @@
+"""
+Multi-Pitch Module
+Polyphonic pitch estimation (chords, intervals) by harmonic summation over a
+log-frequency grid with iterative estimation and cancellation
+"""
+
+import numpy as np
+from scipy.optimize import nnls
+from audio_analyzer import MIN_RMS_THRESHOLD, frame_signal
+from fft_cache import get_window, rfft
+from pitch_estimators import interpolate_peak
+from note_frequencies import A4_FREQUENCY, format_note_name, get_notes_from_frequencies
+
+# Harmonic weights g(f0, h) = (f0 + ALPHA) / (h * f0 + BETA): higher partials
+# count less, more so for high notes (Klapuri's harmonic summation)
+WEIGHT_ALPHA = 52.0
+WEIGHT_BETA = 320.0
+
+# Spectral peaks must rise this many times above the local median magnitude
+# (over bands of about 350 Hz) to count as partials rather than noise
+NOISE_FLOOR_FACTOR = 2.0
+
+# Minimum share of a candidate's salience coming from its odd partials
+# (1st, 3rd, 5th...)
+MIN_ODD_SHARE = 0.25
+
+# The octave below the strongest candidate is taken instead when it has at
+# least this fraction of its salience
+OCTAVE_SALIENCE = 0.5
+
+# Partial amplitude decays h ** -p of the templates in the joint fit
+FIT_DECAYS = (0.0, 0.5, 1.0, 1.5, 2.0)
+
+# Notes whose fitted salience is below this fraction of the strongest one's
+# are dropped after the joint fit
+MIN_FIT_SALIENCE = 0.3
+
+
+class MultiPitchEstimator:
+    """
+    Estimate up to `max_notes` simultaneous pitches per frame
+    
+    The salience of every candidate f0 on a log-frequency grid is the
+    weighted sum of the spectrum at its first `num_harmonics` partials. The
+    strongest candidate is taken as a note, its partials are cancelled from
+    the spectrum (only down to the smooth envelope of its partial amplitudes,
+    so partials shared with other notes survive) and the search repeats until
+    the salience falls below `min_salience` of the first note.
+    
+    Salience is summed over the peaks left after subtracting a local noise
+    floor. Noise leaves few, unrelated peaks, so a frame whose best
+    candidate keeps less than `min_tonality` of its salience after that
+    subtraction has no notes at all.
+    
+    Cancellation cannot split a partial shared by notes an octave apart
+    (every partial of the upper note is one of the lower's), so in chords
+    with doubled notes (e.g. an open E: E2, E3 and E4) it removes the upper
+    notes with the lower. The detected notes and the octaves above them are
+    therefore fitted jointly to the spectrum, each as a non-negative mix of
+    smoothly decaying partial series, and the notes that explain enough of
+    it are kept.
+    
+    Partial positions, interpolation weights and harmonic weights are
+    computed once, and every step but the joint fit works on a whole batch
+    of frames, so the per-frame cost is a few array operations over
+    candidates x harmonics plus one small least-squares problem.
+    """
+    
+    def __init__(self, sample_rate, frame_size=8192, min_frequency=40.0, max_frequency=2000.0,
+                 resolution=10.0, num_harmonics=10, max_notes=6, min_salience=0.2,
+                 min_tonality=0.25):
+        """
+        Initialize the estimator
+        
+        Args:
+            sample_rate (int): Sample rate in Hz
+            frame_size (int): Samples per analyzed frame (chords with low
+                notes need long frames to resolve their partials)
+            min_frequency (float): Lowest candidate f0 in Hz
+            max_frequency (float): Highest candidate f0 in Hz
+            resolution (float): Spacing of the candidate grid in cents
+            num_harmonics (int): Partials summed per candidate
+            max_notes (int): Maximum simultaneous notes (K)
+            min_salience (float): Stop when a note's salience is below this
+                fraction of the first note's
+            min_tonality (float): Minimum fraction of the first note's
+                salience that must survive noise floor subtraction
+        """
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.max_notes = max_notes
+        self.min_salience = min_salience
+        self.min_tonality = min_tonality
+        self.resolution = resolution
+        
+        # Zero padding to twice the frame length samples the peaks finely
+        # enough for linear interpolation between bins
+        self.n_fft = 2 * frame_size
+        self._window = get_window('hanning', frame_size)
+        self._num_bins = self.n_fft // 2 + 1
+        bin_width = sample_rate / self.n_fft
+        
+        # Candidate grid and fractional bin of every (candidate, harmonic)
+        num_candidates = int(np.floor(1200 * np.log2(max_frequency / min_frequency) / resolution)) + 1
+        self.candidates = min_frequency * 2 ** (np.arange(num_candidates) * resolution / 1200)
+        harmonics = np.arange(1, num_harmonics + 1)
+        partials = self.candidates[:, None] * harmonics[None, :]
+        position = partials / bin_width
+        
+        inside = position < self._num_bins - 1
+        position = np.where(inside, position, 0.0)
+        self._lower = position.astype(np.intp)
+        self._upper = self._lower + 1
+        self._fraction = (position - self._lower).astype(np.float32)
+        self._weights = np.where(
+            inside, (self.candidates[:, None] + WEIGHT_ALPHA) / (partials + WEIGHT_BETA), 0.0
+        ).astype(np.float32)
+        
+        # Half-width of a partial's main lobe (Hann: 2 bins unpadded)
+        self._lobe = 2 * self.n_fft // frame_size
+        self._lobe_hz = self._lobe * bin_width
+        self._offsets = np.arange(-self._lobe, self._lobe + 1)
+        self._octave = int(round(1200 / resolution))
+        self._semitone = 100 / resolution
+        
+        # Noise floor: median of fixed bands, linearly interpolated between
+        # band centres (a sliding median per bin is far slower)
+        self._band_width = 32 * self.n_fft // frame_size
+        self._num_bands = max(1, self._num_bins // self._band_width)
+        band = np.clip((np.arange(self._num_bins) + 0.5) / self._band_width - 0.5, 0, self._num_bands - 1)
+        self._band_lower = band.astype(np.intp)
+        self._band_upper = np.minimum(self._band_lower + 1, self._num_bands - 1)
+        self._band_fraction = (band - self._band_lower).astype(np.float32)
+        
+    def spectra(self, frames):
+        """
+        Magnitude spectra of a batch of frames
+        
+        Args:
+            frames (numpy.array): Frames of shape (num_frames, frame_size)
+            
+        Returns:
+            numpy.array: float32 magnitudes of shape (num_frames, n_fft // 2 + 1)
+        """
+        return np.abs(rfft(frames * self._window, self.n_fft, axis=-1)).astype(np.float32)
+        
+    def noise_floor(self, magnitude):
+        """
+        Local median magnitude of a batch of spectra
+        
+        Args:
+            magnitude (numpy.array): Spectra of shape (num_frames, bins)
+            
+        Returns:
+            numpy.array: Floor of the same shape
+        """
+        usable = self._num_bands * self._band_width
+        bands = np.median(
+            magnitude[:, :usable].reshape(len(magnitude), self._num_bands, self._band_width), axis=2
+        )
+        lower = bands[:, self._band_lower]
+        upper = bands[:, self._band_upper]
+        return lower + (upper - lower) * self._band_fraction
+        
+    def partial_amplitudes(self, magnitude):
+        """
+        Spectrum interpolated at every partial of every candidate
+        
+        Args:
+            magnitude (numpy.array): Spectra of shape (num_frames, bins)
+            
+        Returns:
+            numpy.array: Amplitudes of shape (num_frames, candidates, harmonics)
+        """
+        lower = magnitude[:, self._lower]
+        upper = magnitude[:, self._upper]
+        return lower + (upper - lower) * self._fraction
+        
+    def salience(self, magnitude):
+        """
+        Harmonic-summation salience of every candidate
+        
+        Args:
+            magnitude (numpy.array): Spectra of shape (num_frames, bins)
+            
+        Returns:
+            numpy.array: Salience of shape (num_frames, candidates)
+        """
+        return np.einsum('fch,ch->fc', self.partial_amplitudes(magnitude), self._weights)
+        
+    def estimate_spectra(self, magnitude):
+        """
+        Iterative estimation and cancellation over a batch of spectra
+        
+        Args:
+            magnitude (numpy.array): Spectra of shape (num_frames, bins)
+            
+        Returns:
+            tuple: (frequencies, saliences) arrays of shape (num_frames,
+                max_notes), strongest first; unused slots are 0
+        """
+        magnitude = np.asarray(magnitude, dtype=np.float32)
+        residual = np.maximum(magnitude - NOISE_FLOOR_FACTOR * self.noise_floor(magnitude), 0.0)
+        denoised = residual.copy()
+        num_frames = len(residual)
+        rows = np.arange(num_frames)
+        
+        frequencies = np.zeros((num_frames, self.max_notes))
+        saliences = np.zeros((num_frames, self.max_notes))
+        chosen = np.full((num_frames, self.max_notes), -1)
+        active = np.ones(num_frames, dtype=bool)
+        excluded = np.zeros((num_frames, len(self.candidates)), dtype=bool)
+        
+        # A candidate with nothing at its fundamental (e.g. the sub-octave
+        # of a fifth, whose other partials are all the notes') is not a note
+        lower = residual[:, self._lower[:, 0]]
+        upper = residual[:, self._upper[:, 0]]
+        excluded |= lower + (upper - lower) * self._fraction[:, 0] <= 0
+        
+        for k in range(self.max_notes):
+            amplitudes = self.partial_amplitudes(residual)
+            weighted = amplitudes * self._weights
+            salience = weighted.sum(axis=2)
+            
+            # A sub-octave of a note only collects its (even) partials: real
+            # notes also have energy at their odd partials
+            odd = weighted[:, :, ::2].sum(axis=2)
+            salience[excluded | (odd < MIN_ODD_SHARE * salience)] = 0.0
+            
+            best = np.argmax(salience, axis=1)
+            
+            # The octave above a note can outscore it once another note's
+            # cancellation has taken its odd partials (the weights favour
+            # higher candidates for the same partials)
+            below = np.maximum(best - self._octave, 0)
+            take = (best >= self._octave) & (salience[rows, below] >= OCTAVE_SALIENCE * salience[rows, best])
+            best = np.where(take, below, best)
+            peak = salience[rows, best]
+            if k == 0:
+                first = peak
+                lower = magnitude[rows[:, None], self._lower[best]]
+                upper = magnitude[rows[:, None], self._upper[best]]
+                raw = np.einsum('fh,fh->f', lower + (upper - lower) * self._fraction[best],
+                                self._weights[best])
+                active &= peak >= self.min_tonality * raw
+            active &= (peak > 0) & (peak >= self.min_salience * first)
+            if not np.any(active):
+                break
+                
+            frequencies[active, k] = self._refine(residual, best)[active]
+            saliences[active, k] = peak[active]
+            chosen[active, k] = best[active]
+            
+            # Never pick the same note again: no candidate within a semitone
+            # or (for low notes) within the main lobe of its fundamental
+            found = self.candidates[best][:, None]
+            near = ((np.abs(1200 * np.log2(self.candidates / found)) < 100) |
+                    (np.abs(self.candidates - found) < self._lobe_hz))
+            excluded |= active[:, None] & near
+            
+            self._cancel(residual, amplitudes[rows, best], best, active)
+            
+        for i in np.flatnonzero(chosen[:, 0] >= 0):
+            self._fit(denoised[i], frequencies[i], saliences[i], chosen[i])
+            
+        return frequencies, saliences
+        
+    def _refine(self, magnitude, best):
+        """
+        Frequency of each chosen candidate from the measured peaks of its partials
+        
+        Every expected partial is matched to the largest bin within a main
+        lobe and refined to a fraction of a bin; the f0 estimates (partial
+        frequency / harmonic number) are then averaged with weights
+        g(f0, h) * amplitude. Dividing by h makes the upper partials far more
+        precise than the candidate grid or a single bin.
+        """
+        rows = np.arange(len(magnitude))[:, None, None]
+        centers = np.rint(self._lower[best] + self._fraction[best]).astype(np.intp)
+        search = np.clip(centers[..., None] + self._offsets, 0, self._num_bins - 1)
+        values = magnitude[rows, search]
+        
+        strongest = np.argmax(values, axis=-1)[..., None]
+        peak = np.take_along_axis(search, strongest, axis=-1)[..., 0]
+        amplitude = np.take_along_axis(values, strongest, axis=-1)[..., 0]
+        offset = interpolate_peak(magnitude[:, None, :], peak)
+        
+        harmonics = np.arange(1, self._weights.shape[1] + 1)
+        estimates = (peak + offset) * self.sample_rate / self.n_fft / harmonics
+        weight = self._weights[best] * amplitude
+        total = weight.sum(axis=1)
+        
+        return np.where(total > 0, (weight * estimates).sum(axis=1) / np.where(total > 0, total, 1.0),
+                        self.candidates[best])
+                        
+    def _cancel(self, residual, amplitudes, best, active):
+        """
+        Remove a detected note's partials from the residual spectra
+        
+        Each partial is only reduced to what exceeds the smooth envelope of
+        the note's partial amplitudes (moving average over 3 harmonics), so
+        a partial shared with another note keeps that note's share. The
+        fundamental is always removed whole: the only note that could share
+        it (an octave below) is found from its own odd partials.
+        """
+        padded = np.pad(amplitudes, ((0, 0), (1, 1)), mode='edge')
+        envelope = (padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]) / 3
+        smooth = np.minimum(amplitudes, envelope)
+        smooth[:, 0] = amplitudes[:, 0]
+        keep = np.where(amplitudes > 0, 1.0 - smooth / np.where(amplitudes > 0, amplitudes, 1.0), 1.0)
+        
+        # Scale the main lobe around every partial of every active frame
+        frames = np.flatnonzero(active)
+        centers = np.rint(self._lower[best[frames]] + self._fraction[best[frames]]).astype(np.intp)
+        bins = np.clip(centers[:, :, None] + self._offsets, 0, self._num_bins - 1)
+        inside = self._weights[best[frames]] > 0
+        factors = np.where(inside, keep[frames], 1.0)
+        
+        residual[frames[:, None, None], bins] *= factors[:, :, None].astype(np.float32)
+        
+    def _fit(self, spectrum, frequencies, saliences, chosen):
+        """
+        Jointly fit one frame's detected notes and the octaves above them
+        
+        Every candidate contributes one template per decay in FIT_DECAYS:
+        its partials with amplitudes h ** -p, each spread over the window's
+        main lobe. Their non-negative least-squares mix approximates the
+        spectrum, and each candidate's salience is that of its fitted
+        partials. The notes above MIN_FIT_SALIENCE of the strongest replace
+        the greedy ones in `frequencies` and `saliences`, strongest first.
+        """
+        notes = chosen[chosen >= 0]
+        known = dict(zip(notes, frequencies[chosen >= 0]))
+        octaves = [c + self._octave for c in notes
+                   if c + self._octave < len(self.candidates)
+                   and np.all(np.abs(notes - c - self._octave) >= self._semitone)]
+        candidates = np.concatenate([notes, octaves]).astype(np.intp)
+        
+        # Main lobe of every partial: bins (candidate, harmonic, offset)
+        position = self._lower[candidates] + self._fraction[candidates]
+        bins = np.rint(position)[..., None].astype(np.intp) + self._offsets
+        shape = self._lobe_shape(bins - position[..., None])
+        shape[(self._weights[candidates] <= 0)[..., None] | (bins < 0) | (bins >= self._num_bins)] = 0.0
+        bins = np.clip(bins, 0, self._num_bins - 1)
+        
+        used, index = np.unique(bins, return_inverse=True)
+        index = index.reshape(bins.shape)
+        harmonics = np.arange(1, self._weights.shape[1] + 1)
+        decays = harmonics[:, None] ** -np.array(FIT_DECAYS)
+        
+        templates = np.zeros((len(used), len(candidates), len(FIT_DECAYS)))
+        columns = np.broadcast_to(np.arange(len(candidates))[:, None, None], bins.shape)
+        for d in range(len(FIT_DECAYS)):
+            np.add.at(templates[:, :, d], (index, columns), shape * decays[:, d][:, None])
+            
+        mix, _ = nnls(templates.reshape(len(used), -1), spectrum[used].astype(np.float64))
+        fitted = np.einsum('cd,ch,hd->c', mix.reshape(len(candidates), -1),
+                           self._weights[candidates], decays)
+        
+        order = np.argsort(-fitted)[:self.max_notes]
+        order = order[fitted[order] >= MIN_FIT_SALIENCE * fitted[order[0]]]
+        frequencies[:] = 0.0
+        saliences[:] = 0.0
+        for j, c in enumerate(candidates[order]):
+            if c not in known:
+                known[c] = self._refine(spectrum[None], np.array([c]))[0]
+            frequencies[j] = known[c]
+        saliences[:len(order)] = fitted[order]
+        
+    def _lobe_shape(self, offset):
+        """Hann window main lobe at offsets in (zero-padded) bins, 1 at the centre"""
+        x = np.abs(offset) * self.frame_size / self.n_fft
+        edge = np.isclose(x, 1.0)
+        shape = np.sinc(x) / np.where(edge, 1.0, 1.0 - x ** 2)
+        return np.where(x < 2, np.where(edge, 0.5, shape), 0.0)
+        
+    def estimate(self, frames, reference=A4_FREQUENCY, temperament='equal'):
+        """
+        Notes sounding in each of a batch of frames
+        
+        Args:
+            frames (numpy.array): One frame (frame_size samples) or a batch
+                of shape (num_frames, frame_size)
+            reference (float): Frequency of A4 in Hz for note naming
+            temperament (str or sequence): Temperament for note naming
+            
+        Returns:
+            list: For each frame, a list of dicts with 'frequency', 'note',
+                'note_formatted', 'cents' and 'salience', sorted by pitch
+                (frames below the RMS threshold give an empty list)
+        """
+        frames = np.atleast_2d(np.asarray(frames, dtype=np.float32))
+        frequencies, saliences = self.estimate_spectra(self.spectra(frames))
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        return [
+            _notes_from_estimates(f, s, reference, temperament) if level >= MIN_RMS_THRESHOLD else []
+            for f, s, level in zip(frequencies, saliences, rms)
+        ]
+
+
+def _notes_from_estimates(frequencies, saliences, reference, temperament):
+    """Name the detected pitches of one frame"""
+    found = frequencies > 0
+    frequencies, saliences = frequencies[found], saliences[found]
+    order = np.argsort(frequencies)
+    frequencies, saliences = frequencies[order], saliences[order]
+    
+    notes, _, cents = get_notes_from_frequencies(frequencies, reference, temperament)
+    top = saliences.max() if len(saliences) else 1.0
+    
+    return [
+        {
+            'frequency': float(f),
+            'note': note,
+            'note_formatted': format_note_name(note),
+            'cents': float(c),
+            'salience': float(s / top),
+        }
+        for f, note, c, s in zip(frequencies, notes, cents, saliences)
+    ]
+
+
+def detect_notes(audio_data, sample_rate, max_notes=6, frame_size=8192, hop_size=2048,
+                 reference=A4_FREQUENCY, temperament='equal', batch_frames=64, progress=None):
+    """
+    Notes of a chord or interval held through a recording
+    
+    The magnitude spectra of the frames in the middle half of the signal
+    (where the notes are steady) are averaged before estimation, which
+    suppresses noise and the attack transient. The spectra are computed and
+    summed a batch at a time (as in iter_frame_spectra), so the memory used
+    does not grow with the length of the recording.
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal
+        sample_rate (int): Sample rate in Hz
+        max_notes (int): Maximum number of simultaneous notes
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between frames
+        reference (float): Frequency of A4 in Hz for note naming
+        temperament (str or sequence): Temperament for note naming
+        batch_frames (int): Frames transformed per FFT call
+        progress (callable): Called after every batch with the fraction of
+            the frames summed; an exception it raises stops the detection
+        
+    Returns:
+        list: Notes sorted by pitch (see MultiPitchEstimator.estimate); empty
+            for silence or signals shorter than a frame
+    """
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    quarter = len(audio_data) // 4
+    middle = audio_data[quarter:len(audio_data) - quarter]
+    if len(middle) < frame_size:
+        middle = audio_data
+        
+    frames = frame_signal(middle, frame_size, hop_size)
+    if len(frames) == 0 or np.sqrt(np.mean(middle ** 2)) < MIN_RMS_THRESHOLD:
+        return []
+        
+    estimator = MultiPitchEstimator(sample_rate, frame_size, max_notes=max_notes)
+    magnitude = np.zeros((1, estimator.n_fft // 2 + 1), dtype=np.float64)
+    for start in range(0, len(frames), batch_frames):
+        magnitude += estimator.spectra(frames[start:start + batch_frames]).sum(axis=0)
+        if progress is not None:
+            progress(min(start + batch_frames, len(frames)) / len(frames))
+    magnitude /= len(frames)
+    frequencies, saliences = estimator.estimate_spectra(magnitude)
+    
+    return _notes_from_estimates(frequencies[0], saliences[0], reference, temperament)
+
+
+if __name__ == "__main__":
+    import sys
+    from audio_analyzer import load_audio
+    
+    if len(sys.argv) > 1:
+        audio_data, sample_rate = load_audio(sys.argv[1])
+        for note in detect_notes(audio_data, sample_rate):
+            print(f"{note['note_formatted']:>5}  {note['frequency']:8.2f} Hz  "
+                  f"{note['cents']:+6.1f} cents  (salience {note['salience']:.2f})")
+    else:
+        print("Usage: python multipitch.py <audio_file.wav>")
@@ -3,73 +3,198 @@ Musical Note Frequencies Reference
 Contains standard frequencies for musical notes and helper functions
 """
 
+import math
+from functools import lru_cache
 import numpy as np
 
-# Standard musical notes with their frequencies in Hz (A4 = 440 Hz)
-# Covering range from C0 to B8
-NOTE_FREQUENCIES = {
-    'C0': 16.35, 'C#0': 17.32, 'D0': 18.35, 'D#0': 19.45, 'E0': 20.60, 'F0': 21.83,
-    'F#0': 23.12, 'G0': 24.50, 'G#0': 25.96, 'A0': 27.50, 'A#0': 29.14, 'B0': 30.87,
-    
-    'C1': 32.70, 'C#1': 34.65, 'D1': 36.71, 'D#1': 38.89, 'E1': 41.20, 'F1': 43.65,
-    'F#1': 46.25, 'G1': 49.00, 'G#1': 51.91, 'A1': 55.00, 'A#1': 58.27, 'B1': 61.74,
-    
-    'C2': 65.41, 'C#2': 69.30, 'D2': 73.42, 'D#2': 77.78, 'E2': 82.41, 'F2': 87.31,
-    'F#2': 92.50, 'G2': 98.00, 'G#2': 103.83, 'A2': 110.00, 'A#2': 116.54, 'B2': 123.47,
+# Reference pitch (A4 = MIDI note 69) used when none is given
+A4_FREQUENCY = 440.0
+A4_MIDI = 69
+
+# Table range: C0 (MIDI 12) to B8 (MIDI 119), stored in MIDI order so a
+# note is found by index arithmetic instead of scanning every entry
+FIRST_MIDI = 12
+LAST_MIDI = 119
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+NOTE_NAMES = np.array(
+    [f"{PITCH_CLASSES[m % 12]}{m // 12 - 1}" for m in range(FIRST_MIDI, LAST_MIDI + 1)],
+    dtype=object
+)
+
+
+def _offsets_from_ratios(ratios):
+    """Cents offsets from equal temperament for 12 frequency ratios above C"""
+    return tuple(1200 * math.log2(r) - 100 * i for i, r in enumerate(ratios))
+
+
+def _meantone_offsets():
+    """Cents offsets of quarter-comma meantone (Eb to G#, wolf fifth G#-Eb)"""
+    syntonic_comma = 1200 * math.log2(81 / 80)
+    fifth = 1200 * math.log2(3 / 2) - syntonic_comma / 4
+    
+    offsets = [0.0] * 12
+    for k in range(-3, 9):  # Position along the chain of fifths from C
+        pitch_class = (7 * k) % 12
+        offsets[pitch_class] = (k * fifth) % 1200 - 100 * pitch_class
+    return tuple(offsets)
+
+
+# Temperaments as cents offsets from equal temperament for each pitch class
+# (C, C#, D, ..., B), tuned relative to C
+TEMPERAMENTS = {
+    'equal': (0.0,) * 12,
+    'just': _offsets_from_ratios(
+        (1, 16/15, 9/8, 6/5, 5/4, 4/3, 45/32, 3/2, 8/5, 5/3, 9/5, 15/8)
+    ),
+    'pythagorean': _offsets_from_ratios(
+        (1, 2187/2048, 9/8, 32/27, 81/64, 4/3, 729/512, 3/2, 128/81, 27/16, 16/9, 243/128)
+    ),
+    'meantone': _meantone_offsets(),
+}
+
+
+def get_note_table(reference=A4_FREQUENCY, temperament='equal'):
+    """
+    Get the note table for a reference pitch and temperament
     
-    'C3': 130.81, 'C#3': 138.59, 'D3': 146.83, 'D#3': 155.56, 'E3': 164.81, 'F3': 174.61,
-    'F#3': 185.00, 'G3': 196.00, 'G#3': 207.65, 'A3': 220.00, 'A#3': 233.08, 'B3': 246.94,
+    Tables are generated once per (reference, temperament) and cached, so
+    changing the tuning between calls costs only a cache lookup.
     
-    'C4': 261.63, 'C#4': 277.18, 'D4': 293.66, 'D#4': 311.13, 'E4': 329.63, 'F4': 349.23,
-    'F#4': 369.99, 'G4': 392.00, 'G#4': 415.30, 'A4': 440.00, 'A#4': 466.16, 'B4': 493.88,
+    Args:
+        reference (float): Frequency of A4 in Hz (e.g. 440, 442, 415)
+        temperament (str or sequence): Name in TEMPERAMENTS or 12 custom
+            cents offsets from equal temperament (C, C#, ..., B)
+            
+    Returns:
+        tuple: (note_names, frequencies) arrays in MIDI order from C0 to B8;
+            both are shared between callers and must not be modified
+    """
+    if not isinstance(temperament, str):
+        temperament = tuple(float(c) for c in temperament)
+    return NOTE_NAMES, _build_note_table(float(reference), temperament)
+
+
+@lru_cache(maxsize=32)
+def _build_note_table(reference, temperament):
+    """Generate the frequency of every note in the table"""
+    if reference <= 0:
+        raise ValueError("Reference pitch must be positive")
+        
+    if isinstance(temperament, str):
+        if temperament not in TEMPERAMENTS:
+            raise ValueError(f"Unknown temperament: {temperament}")
+        offsets = np.array(TEMPERAMENTS[temperament])
+    else:
+        if len(temperament) != 12:
+            raise ValueError("A custom temperament needs 12 cents offsets")
+        offsets = np.array(temperament)
+        
+    # Shift the whole temperament so that A sits exactly on the reference
+    offsets = offsets - offsets[9]
     
-    'C5': 523.25, 'C#5': 554.37, 'D5': 587.33, 'D#5': 622.25, 'E5': 659.25, 'F5': 698.46,
-    'F#5': 739.99, 'G5': 783.99, 'G#5': 830.61, 'A5': 880.00, 'A#5': 932.33, 'B5': 987.77,
+    midi = np.arange(FIRST_MIDI, LAST_MIDI + 1)
+    frequencies = reference * 2 ** ((midi - A4_MIDI + offsets[midi % 12] / 100) / 12)
+    frequencies.flags.writeable = False
     
-    'C6': 1046.50, 'C#6': 1108.73, 'D6': 1174.66, 'D#6': 1244.51, 'E6': 1318.51, 'F6': 1396.91,
-    'F#6': 1479.98, 'G6': 1567.98, 'G#6': 1661.22, 'A6': 1760.00, 'A#6': 1864.66, 'B6': 1975.53,
+    return frequencies
+
+
+# Standard musical notes with their frequencies in Hz (A4 = 440 Hz)
+# Covering range from C0 to B8
+NOTE_FREQUENCIES = dict(zip(NOTE_NAMES, np.round(get_note_table()[1], 2).tolist()))
+
+
+def frequency_to_midi(frequency, reference=A4_FREQUENCY):
+    """
+    Convert frequency to a (fractional) MIDI note number
     
-    'C7': 2093.00, 'C#7': 2217.46, 'D7': 2349.32, 'D#7': 2489.02, 'E7': 2637.02, 'F7': 2793.83,
-    'F#7': 2959.96, 'G7': 3135.96, 'G#7': 3322.44, 'A7': 3520.00, 'A#7': 3729.31, 'B7': 3951.07,
+    Args:
+        frequency (float or numpy.array): Frequency in Hz (> 0)
+        reference (float): Frequency of A4 in Hz
+        
+    Returns:
+        float or numpy.array: 12 * log2(f / reference) + 69
+    """
+    return 12 * np.log2(frequency / reference) + A4_MIDI
+
+
+def _nearest_note_index(frequencies, reference, table):
+    """
+    Index of the closest table entry in log-frequency space
     
-    'C8': 4186.01, 'C#8': 4434.92, 'D8': 4698.63, 'D#8': 4978.03, 'E8': 5274.04, 'F8': 5587.65,
-    'F#8': 5919.91, 'G8': 6271.93, 'G#8': 6644.88, 'A8': 7040.00, 'A#8': 7458.62, 'B8': 7902.13
-}
+    The equal-tempered estimate is exact for equal temperament; since other
+    temperaments stay within a semitone of it, checking the two neighbouring
+    notes as well is enough.
+    """
+    idx = np.rint(frequency_to_midi(frequencies, reference)).astype(np.intp) - FIRST_MIDI
+    candidates = np.clip(idx[..., np.newaxis] + np.array([-1, 0, 1]), 0, len(table) - 1)
+    distance = np.abs(np.log2(frequencies[..., np.newaxis] / table[candidates]))
+    best = np.argmin(distance, axis=-1)[..., np.newaxis]
+    return np.take_along_axis(candidates, best, axis=-1)[..., 0]
 
 
-def get_note_from_frequency(frequency):
+def get_note_from_frequency(frequency, reference=A4_FREQUENCY, temperament='equal'):
     """
     Find the closest musical note to a given frequency
     
+    The nearest note is found in log-frequency (pitch) space with a direct
+    table index, so the lookup is O(1).
+    
     Args:
         frequency (float): Frequency in Hz
+        reference (float): Frequency of A4 in Hz
+        temperament (str or sequence): Temperament (see get_note_table)
         
     Returns:
         tuple: (note_name, exact_frequency, cents_deviation)
     """
     if frequency <= 0:
         return None, None, None
+        
+    names, table = get_note_table(reference, temperament)
+    idx = int(_nearest_note_index(np.float64(frequency), reference, table))
     
-    min_diff = float('inf')
-    closest_note = None
-    closest_freq = None
-    
-    for note, freq in NOTE_FREQUENCIES.items():
-        diff = abs(frequency - freq)
-        if diff < min_diff:
-            min_diff = diff
-            closest_note = note
-            closest_freq = freq
+    closest_note = names[idx]
+    closest_freq = table[idx]
     
     # Calculate cents deviation (100 cents = 1 semitone)
-    if closest_freq:
-        cents = 1200 * np.log2(frequency / closest_freq)
-    else:
-        cents = 0
+    cents = 1200 * np.log2(frequency / closest_freq)
     
     return closest_note, closest_freq, cents
 
 
+def get_notes_from_frequencies(frequencies, reference=A4_FREQUENCY, temperament='equal'):
+    """
+    Vectorized get_note_from_frequency for a whole pitch track
+    
+    Args:
+        frequencies (numpy.array): Frequencies in Hz; values <= 0 mark
+            frames without a note
+        reference (float): Frequency of A4 in Hz
+        temperament (str or sequence): Temperament (see get_note_table)
+        
+    Returns:
+        tuple: (note_names, exact_frequencies, cents_deviations) arrays of the
+            same shape; frames without a note get None / NaN
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    valid = frequencies > 0
+    safe = np.where(valid, frequencies, reference)
+    
+    names, table = get_note_table(reference, temperament)
+    idx = _nearest_note_index(safe, reference, table)
+    
+    names = names[idx]
+    exact = table[idx]
+    cents = 1200 * np.log2(safe / exact)
+    
+    names[~valid] = None
+    exact[~valid] = np.nan
+    cents[~valid] = np.nan
+    
+    return names, exact, cents
+
+
 def format_note_name(note):
     """
     Format note name for display (replace # with ♯)
@@ -0,0 +1,289 @@
+"""
+Result Cache Module
+Content-addressed cache of analysis results, so the same recording analyzed
+with the same parameters is only decoded and transformed once
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    # Optional: faster JSON encoding of the disk tier
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bytes hashed per read when the source is a file
+HASH_CHUNK_SIZE = 1 << 20
+
+# Seconds to wait for another process holding the sqlite file's lock
+DB_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+def hash_audio_source(source, digest=None):
+    """
+    Hash the encoded contents of an audio source
+    
+    Args:
+        source (str, file-like or bytes): Path, open binary file (read from
+            its current position, which is restored afterwards) or bytes
+        digest: hashlib object to update (default: a new 128-bit BLAKE2b)
+        
+    Returns:
+        hashlib object: Updated digest
+    """
+    if digest is None:
+        digest = hashlib.blake2b(digest_size=16)
+        
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        start = source.tell()
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(start)
+        
+    return digest
+
+
+def _dumps(value):
+    """Encode a disk-tier value as JSON bytes"""
+    if orjson is not None:
+        # Like json: dataclasses (e.g. AnalysisResult) are not encoded
+        return orjson.dumps(value, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(value).encode()
+
+
+def _loads(blob):
+    """Decode a disk-tier value"""
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
+
+
+class ResultCache:
+    """
+    Two-tier LRU cache of analysis results
+    
+    Entries live in an in-process LRU dict and, if a path is given, in a
+    sqlite file shared between processes and restarts. Both tiers honour
+    the TTL; the disk tier is also trimmed to a total size by evicting the
+    least recently used entries. Values are shared between callers, so
+    they must not be modified.
+    
+    The disk tier stores JSON, never pickles: a pickle read back from a
+    file that someone else can write would run arbitrary code. Only
+    JSON-serializable values (e.g. response dicts) reach the disk, and they
+    come back from it as plain dicts and lists; any other value (e.g. an
+    AnalysisResult) is kept in memory only.
+    
+    The disk tier is best effort: a sqlite error (e.g. the file is still
+    locked after DB_TIMEOUT) is logged and the lookup counts as a miss, or
+    the entry is kept in memory only.
+    """
+    
+    def __init__(self, max_entries=128, path=None, ttl=None, max_disk_bytes=256 * 1024 * 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries (int): Entries kept in memory
+            path (str): sqlite file for the disk tier (None: memory only)
+            ttl (float): Seconds an entry stays valid (None: no expiry)
+            max_disk_bytes (int): Total encoded size kept on disk
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=DB_TIMEOUT, check_same_thread=False)
+            # Readers do not block the writer of another process
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, used REAL)'
+            )
+            self._db.commit()
+            
+    @staticmethod
+    def make_key(source, **params):
+        """
+        Cache key of an audio source and the parameters of its analysis
+        
+        Args:
+            source (str, file-like or bytes): Audio source (see hash_audio_source)
+            **params: Analysis parameters (must have a stable repr)
+            
+        Returns:
+            str: Hex digest
+        """
+        digest = hash_audio_source(source)
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+        
+    def get(self, key):
+        """
+        Look up a result
+        
+        Args:
+            key (str): Key from make_key
+            
+        Returns:
+            Cached value, or None on a miss
+        """
+        now = time.time()
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if self.ttl is None or now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+                
+            if self._db is not None:
+                try:
+                    value = self._get_disk(key, now)
+                except sqlite3.Error as e:
+                    logger.warning('Result cache read failed: %s', e)
+                    self._rollback()
+                else:
+                    if value is not None:
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    
+            self.misses += 1
+            return None
+            
+    def put(self, key, value):
+        """
+        Store a result in every tier
+        
+        Args:
+            key (str): Key from make_key
+            value: Result (only JSON-serializable values are written to disk)
+        """
+        now = time.time()
+        
+        blob = None
+        if self._db is not None:
+            try:
+                blob = _dumps(value)
+            except (TypeError, ValueError):
+                pass
+        
+        with self._lock:
+            self._remember(key, now, value)
+            
+            if blob is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                        (key, blob, len(blob), now, now)
+                    )
+                    self._evict_disk(now)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning('Result cache write failed: %s', e)
+                    self._rollback()
+                    
+    def _get_disk(self, key, now):
+        """Read a live entry from the disk tier into memory (None on a miss)"""
+        row = self._db.execute(
+            'SELECT value, created FROM results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (self.ttl is not None and now - row[1] >= self.ttl):
+            return None
+            
+        try:
+            value = _loads(row[0])
+        except ValueError:
+            # Not JSON (e.g. written by an older version): drop it
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._db.commit()
+            return None
+            
+        self._db.execute('UPDATE results SET used = ? WHERE key = ?', (now, key))
+        self._db.commit()
+        self._remember(key, row[1], value)
+        return value
+        
+    def _rollback(self):
+        """Abandon a failed disk transaction"""
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+            
+    def _remember(self, key, created, value):
+        """Insert into the memory tier, dropping the least recently used entry"""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            
+    def _evict_disk(self, now):
+        """Drop expired entries, then the least recently used over the size limit"""
+        if self.ttl is not None:
+            self._db.execute('DELETE FROM results WHERE created < ?', (now - self.ttl,))
+            
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+            
+        rows = self._db.execute('SELECT key, size FROM results ORDER BY used').fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            total -= size
+            
+    def stats(self):
+        """
+        Hit/miss counters
+        
+        Returns:
+            dict: 'hits' (of which 'disk_hits' came from sqlite), 'misses',
+                'hit_rate' and 'entries' held in memory
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._memory),
+        }
+        
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+            self.hits = self.disk_hits = self.misses = 0
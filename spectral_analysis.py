@@ -5,9 +5,116 @@ Demuestra conceptos de DSP: Serie de Fourier, FFT, Espectro de Frecuencias
 
 import numpy as np
 from scipy.io import wavfile
-from scipy.fft import fft, fftfreq, rfft, rfftfreq
 import matplotlib.pyplot as plt
 from note_frequencies import get_note_from_frequency, format_note_name
+from audio_analyzer import frame_signal, iter_frame_spectra
+from fft_cache import get_rfft_frequencies, get_window, rfft
+from pitch_estimators import get_estimator, interpolate_peak
+from spectrogram import SpectrogramTiles
+
+
+# Semiancho (en bins) del lóbulo principal de un pico con ventana de Hamming
+MAIN_LOBE_BINS = 2
+
+
+def _fit_inharmonicity(orders, frequencies):
+    """
+    Ajusta f_n = n f_0 sqrt(1 + B n^2) (cuerdas rígidas, p. ej. piano)
+    
+    f_n^2 = f_0^2 n^2 + f_0^2 B n^4 es lineal en (f_0^2, f_0^2 B), así que
+    basta un ajuste por mínimos cuadrados.
+    
+    Returns:
+        tuple: (f_0, B) o None si no hay parciales suficientes
+    """
+    if len(orders) < 3:
+        return None
+    design = np.column_stack((orders**2, orders**4)).astype(np.float64)
+    (a, b), *_ = np.linalg.lstsq(design, frequencies**2, rcond=None)
+    if a <= 0:
+        return None
+    return np.sqrt(a), b / a
+
+
+def extract_harmonics(freqs, magnitude, fundamental_freq, num_harmonics=5, tolerance=50,
+                      min_level_db=-40):
+    """
+    Extrae los parciales f_n ≈ n * f_0 de un espectro sin recorrerlo por armónico
+    
+    Las ventanas de búsqueda de todos los parciales se construyen a la vez con
+    aritmética de índices (matriz parciales x bins), así que el costo es
+    O(H * ancho de ventana) en lugar de O(H * N). Como en cuerdas rígidas los
+    parciales altos se estiran, la búsqueda se hace en pasadas que duplican el
+    número de parciales y centran las ventanas en la predicción con la
+    inarmonicidad estimada en la pasada anterior.
+    
+    Args:
+        freqs (numpy.array): Frecuencia de cada bin (equiespaciadas, desde 0 Hz)
+        magnitude (numpy.array): Magnitud del espectro
+        fundamental_freq (float): Frecuencia fundamental f_0 en Hz
+        num_harmonics (int): Número de parciales, incluida la fundamental
+        tolerance (float): Semiancho de la ventana de búsqueda en Hz
+        min_level_db (float): Nivel mínimo (respecto al parcial más fuerte) de
+            los parciales usados para ajustar la inarmonicidad
+        
+    Returns:
+        dict: 'order', 'expected', 'frequency' (refinada entre bins) y
+            'magnitude' como arreglos de los parciales encontrados, más
+            'inharmonicity' (coeficiente B) y 'hnr_db' (relación armónicos/ruido)
+    """
+    bin_width = freqs[1] - freqs[0]
+    n_bins = len(magnitude)
+    half_width = max(1, int(round(tolerance / bin_width)))
+    offsets = np.arange(-half_width, half_width + 1)
+    
+    f0, inharmonicity = fundamental_freq, 0.0
+    count = min(num_harmonics, 8)
+    while True:
+        orders = np.arange(1, count + 1)
+        predicted = orders * f0 * np.sqrt(1 + inharmonicity * orders**2)
+        
+        # Ventanas de búsqueda de todos los parciales a la vez (parciales x bins),
+        # descartando las que caen fuera del espectro (sobre Nyquist)
+        centers = np.rint(predicted / bin_width).astype(np.intp)
+        found = centers - half_width < n_bins
+        orders, predicted = orders[found], predicted[found]
+        window_idx = centers[found, np.newaxis] + offsets
+        inside = (window_idx >= 0) & (window_idx < n_bins)
+        window_mag = np.where(inside, magnitude[np.clip(window_idx, 0, n_bins - 1)], -np.inf)
+        
+        best = np.argmax(window_mag, axis=1)
+        peak_idx = window_idx[np.arange(len(best)), best]
+        harmonic_freqs = (peak_idx + interpolate_peak(magnitude[np.newaxis, :], peak_idx)) * bin_width
+        peak_mag = magnitude[peak_idx]
+        
+        # Solo los parciales claramente por encima del ruido entran al ajuste
+        strong = peak_mag >= peak_mag.max() * 10 ** (min_level_db / 20) if len(peak_mag) else peak_mag
+        fit = _fit_inharmonicity(orders[strong], harmonic_freqs[strong])
+        if fit is not None:
+            f0, inharmonicity = fit
+        
+        if count >= num_harmonics or not found.all():
+            break
+        count = min(num_harmonics, 2 * count)
+    
+    # HNR: energía en los lóbulos de los parciales frente al resto de la banda
+    lobes = np.clip(peak_idx[:, np.newaxis] + np.arange(-MAIN_LOBE_BINS, MAIN_LOBE_BINS + 1), 0, n_bins - 1)
+    band_start = np.searchsorted(freqs, 20, side='right')
+    band_end = min(n_bins, peak_idx.max() + half_width + 1)
+    power = magnitude**2
+    lobes = np.unique(lobes)
+    harmonic_energy = power[lobes[(lobes >= band_start) & (lobes < band_end)]].sum()
+    noise_energy = max(power[band_start:band_end].sum() - harmonic_energy, 1e-12)
+    hnr_db = 10 * np.log10(max(harmonic_energy, 1e-12) / noise_energy)
+    
+    return {
+        'order': orders,
+        'expected': orders * fundamental_freq,
+        'frequency': harmonic_freqs,
+        'magnitude': peak_mag,
+        'inharmonicity': inharmonicity,
+        'hnr_db': hnr_db
+    }
 
 
 class SpectralAnalyzer:
@@ -38,9 +145,76 @@ class SpectralAnalyzer:
             audio_data = audio_data.astype(np.float32) / 2147483648.0
         
         self.audio_data = audio_data
+    
+    @property
+    def audio_data(self):
+        """Señal analizada (float, mono)"""
+        return self._audio_data
+    
+    @audio_data.setter
+    def audio_data(self, audio_data):
+        # Cambiar la señal invalida los espectros ya calculados
+        self._audio_data = audio_data
         self.duration = len(audio_data) / self.sample_rate
         self.N = len(audio_data)  # Número de muestras
+        self._spectra = {}
+        self._magnitudes = {}
+        self._spectrograms = {}
+    
+    def get_spectrum(self, window='hamming'):
+        """
+        Espectro complejo de la señal, calculado una sola vez por tipo de ventana
         
+        Args:
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            
+        Returns:
+            tuple: (frequencies, spectrum) con spectrum complejo (rfft), de
+                solo lectura y compartido entre llamadas
+        """
+        if window not in self._spectra:
+            # Aplicar ventana para reducir "spectral leakage" (ventanas en caché compartida)
+            windowed_signal = self.audio_data * get_window(window, self.N)
+            
+            # Calcular FFT (solo frecuencias positivas con rfft). Se devuelve
+            # siempre el mismo array, así que queda de solo lectura (como en
+            # fft_cache) para que nadie lo modifique in situ
+            spectrum = rfft(windowed_signal)
+            spectrum.flags.writeable = False
+            self._spectra[window] = spectrum
+        
+        return get_rfft_frequencies(self.N, self.sample_rate), self._spectra[window]
+    
+    def get_magnitude(self, window='hamming'):
+        """
+        Magnitud del espectro, calculada bajo demanda y reutilizada
+        
+        Args:
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            
+        Returns:
+            tuple: (frequencies, magnitude), magnitude de solo lectura
+        """
+        frequencies, spectrum = self.get_spectrum(window)
+        if window not in self._magnitudes:
+            magnitude = np.abs(spectrum)
+            magnitude.flags.writeable = False
+            self._magnitudes[window] = magnitude
+        return frequencies, self._magnitudes[window]
+    
+    def get_phase(self, window='hamming'):
+        """
+        Fase del espectro (no se guarda: se calcula solo cuando se pide)
+        
+        Args:
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            
+        Returns:
+            tuple: (frequencies, phase) con la fase en radianes
+        """
+        frequencies, spectrum = self.get_spectrum(window)
+        return frequencies, np.angle(spectrum)
+    
     def compute_fft(self, window='hamming'):
         """
         Calcula la FFT (Fast Fourier Transform) de la señal
@@ -56,29 +230,66 @@ class SpectralAnalyzer:
         Returns:
             tuple: (frequencies, magnitude, phase)
         """
-        # Aplicar ventana para reducir "spectral leakage"
-        if window == 'hamming':
-            w = np.hamming(self.N)
-        elif window == 'hanning':
-            w = np.hanning(self.N)
-        elif window == 'blackman':
-            w = np.blackman(self.N)
-        else:
-            w = np.ones(self.N)
+        # La transformada se reutiliza entre llamadas (ver get_spectrum)
+        frequencies, magnitude = self.get_magnitude(window)
+        _, phase = self.get_phase(window)
+        
+        return frequencies, magnitude, phase
+    
+    def compute_frames_fft(self, frame_size=4096, hop_size=1024, window='hamming', workers=-1,
+                           batch_frames=256):
+        """
+        Calcula la FFT de todas las tramas de la señal por lotes
+        
+        La señal se divide en tramas solapadas (vista sin copia), la ventana se
+        aplica por broadcasting y cada rfft recorre `batch_frames` tramas; solo
+        se guarda la magnitud, así que la memoria extra queda acotada por el
+        lote aunque la grabación sea larga.
         
-        windowed_signal = self.audio_data * w
+        Args:
+            frame_size (int): Muestras por trama
+            hop_size (int): Desplazamiento entre tramas consecutivas
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            workers (int): Hilos para la FFT (-1 = todos los núcleos)
+            batch_frames (int): Tramas por llamada a la FFT
+            
+        Returns:
+            tuple: (times, frequencies, magnitude) con magnitude float32 de
+                forma (num_tramas, frame_size // 2 + 1)
+        """
+        num_frames = len(frame_signal(self.audio_data, frame_size, hop_size))
+        magnitude = np.empty((num_frames, frame_size // 2 + 1), dtype=np.float32)
         
-        # Calcular FFT (solo frecuencias positivas con rfft)
-        fft_values = rfft(windowed_signal)
-        frequencies = rfftfreq(self.N, 1/self.sample_rate)
+        for start, spectra in iter_frame_spectra(self.audio_data, frame_size, hop_size,
+                                                 window, workers, batch_frames):
+            np.abs(spectra, out=magnitude[start:start + len(spectra)])
+            
+        times = (np.arange(num_frames) * hop_size + frame_size / 2) / self.sample_rate
+        return times, get_rfft_frequencies(frame_size, self.sample_rate), magnitude
+    
+    def get_spectrogram(self, frame_size=2048, window='hanning', max_frequency=None):
+        """
+        Espectrograma (STFT) de la señal, por teselas y con caché
         
-        # Magnitud y fase
-        magnitude = np.abs(fft_values)
-        phase = np.angle(fft_values)
+        Las teselas solo se calculan al consultarlas (ver SpectrogramTiles.query),
+        así que recorrer una grabación larga con zoom solo transforma lo visible.
         
-        return frequencies, magnitude, phase
+        Args:
+            frame_size (int): Muestras por trama
+            window (str): Tipo de ventana ('hamming', 'hanning', 'blackman', 'none')
+            max_frequency (float): Frecuencia máxima conservada (default: Nyquist)
+            
+        Returns:
+            SpectrogramTiles: Espectrograma, compartido entre llamadas
+        """
+        key = (frame_size, window, max_frequency)
+        if key not in self._spectrograms:
+            self._spectrograms[key] = SpectrogramTiles(
+                self.audio_data, self.sample_rate, frame_size, window, max_frequency
+            )
+        return self._spectrograms[key]
     
-    def find_fundamental_and_harmonics(self, num_harmonics=5):
+    def find_fundamental_and_harmonics(self, num_harmonics=5, method='fft', tolerance=50):
         """
         Encuentra la frecuencia fundamental y sus armónicos
         
@@ -87,11 +298,17 @@ class SpectralAnalyzer:
         
         Args:
             num_harmonics (int): Número de armónicos a detectar
+            method (str): Estimador de f0: 'fft' (pico más alto del espectro),
+                'yin' o 'mcleod' (basados en el periodo, evitan errores de octava)
+            tolerance (float): Semiancho en Hz de la búsqueda de cada armónico
+                (aumentarlo para parciales muy estirados, p. ej. en piano)
             
         Returns:
-            dict: Información sobre fundamental y armónicos
+            dict: Información sobre fundamental y armónicos, con el coeficiente
+                de inarmonicidad y la relación armónicos/ruido (HNR) en dB;
+                'fundamental' es None si no se detectó una fundamental válida
         """
-        freqs, magnitude, _ = self.compute_fft()
+        freqs, magnitude = self.get_magnitude()
         
         # Buscar picos en el rango de frecuencias musicales (20 Hz - 5000 Hz)
         min_idx = np.argmax(freqs > 20)
@@ -101,45 +318,60 @@ class SpectralAnalyzer:
         
         # Encontrar la frecuencia fundamental (pico más alto)
         search_magnitude = magnitude[min_idx:max_idx]
-        search_freqs = freqs[min_idx:max_idx]
-        
-        fundamental_idx = np.argmax(search_magnitude)
-        fundamental_freq = search_freqs[fundamental_idx]
         
-        # Buscar armónicos (múltiplos de la fundamental)
-        harmonics = []
-        for n in range(2, num_harmonics + 1):
-            harmonic_freq = n * fundamental_freq
-            
-            # Buscar el pico más cercano a la frecuencia armónica esperada
-            tolerance = 50  # Hz
-            harmonic_range = np.where(
-                (freqs >= harmonic_freq - tolerance) & 
-                (freqs <= harmonic_freq + tolerance)
-            )[0]
-            
-            if len(harmonic_range) > 0:
-                harmonic_idx = harmonic_range[np.argmax(magnitude[harmonic_range])]
-                harmonics.append({
-                    'order': n,
-                    'frequency': freqs[harmonic_idx],
-                    'magnitude': magnitude[harmonic_idx],
-                    'expected': harmonic_freq
-                })
+        if method == 'fft':
+            fundamental_idx = min_idx + np.argmax(search_magnitude)
+            fundamental_freq = freqs[fundamental_idx]
+            is_valid = magnitude[fundamental_idx] > 0
+        else:
+            # El pico más alto puede ser un armónico: estimar f0 por su periodo
+            # (con precisión menor que un bin); el bin más cercano solo da la magnitud
+            fundamental_freq, is_valid = get_estimator(method)(self.audio_data, self.sample_rate)
+            fundamental_idx = min(int(round(fundamental_freq * self.N / self.sample_rate)),
+                                  len(freqs) - 1)
         
         # Identificar nota musical
-        note, exact_freq, cents = get_note_from_frequency(fundamental_freq)
+        note, exact_freq, cents = None, None, None
+        if is_valid:
+            note, exact_freq, cents = get_note_from_frequency(fundamental_freq)
+        
+        if note is None:
+            # Sin fundamental válida (silencio o ruido): no hay armónicos que buscar
+            return {
+                'fundamental': None,
+                'harmonics': [],
+                'inharmonicity': 0.0,
+                'hnr_db': None,
+                'sample_rate': self.sample_rate,
+                'num_samples': self.N
+            }
+        
+        # Buscar armónicos (múltiplos de la fundamental) todos a la vez
+        partials = extract_harmonics(freqs, magnitude, fundamental_freq, num_harmonics, tolerance)
+        harmonics = [
+            {
+                'order': int(n),
+                'frequency': f,
+                'magnitude': m,
+                'expected': e
+            }
+            for n, f, m, e in zip(partials['order'], partials['frequency'],
+                                  partials['magnitude'], partials['expected'])
+            if n >= 2
+        ]
         
         return {
             'fundamental': {
                 'frequency': fundamental_freq,
-                'magnitude': magnitude[min_idx + fundamental_idx],
+                'magnitude': magnitude[fundamental_idx],
                 'note': note,
                 'note_formatted': format_note_name(note),
                 'exact_frequency': exact_freq,
                 'cents': cents
             },
             'harmonics': harmonics,
+            'inharmonicity': partials['inharmonicity'],
+            'hnr_db': partials['hnr_db'],
             'sample_rate': self.sample_rate,
             'num_samples': self.N
         }
@@ -152,7 +384,7 @@ class SpectralAnalyzer:
             max_freq (float): Frecuencia máxima a mostrar
             save_path (str): Ruta para guardar la imagen (opcional)
         """
-        freqs, magnitude, _ = self.compute_fft()
+        freqs, magnitude = self.get_magnitude()
         
         # Limitar a frecuencias de interés
         idx_max = np.argmax(freqs > max_freq)
@@ -195,9 +427,9 @@ class SpectralAnalyzer:
         else:
             plt.show()
     
-    def print_analysis(self):
+    def print_analysis(self, method='fft'):
         """Imprime un análisis completo de la señal"""
-        result = self.find_fundamental_and_harmonics()
+        result = self.find_fundamental_and_harmonics(method=method)
         
         print("=" * 70)
         print("ANÁLISIS ESPECTRAL - PROCESAMIENTO DIGITAL DE SEÑALES")
@@ -210,6 +442,11 @@ class SpectralAnalyzer:
         
         fund = result['fundamental']
         print(f"\n🎵 Frecuencia Fundamental (f₀):")
+        if fund is None:
+            print("   • Sin señal: no se detectó una frecuencia fundamental válida")
+            print("\n" + "=" * 70 + "\n")
+            return
+        
         print(f"   • Frecuencia detectada: {fund['frequency']:.2f} Hz")
         print(f"   • Nota musical: {fund['note_formatted']}")
         print(f"   • Frecuencia exacta de la nota: {fund['exact_frequency']:.2f} Hz")
@@ -223,6 +460,8 @@ class SpectralAnalyzer:
             for h in result['harmonics']:
                 print(f"   {h['order']:<8} {h['frequency']:<15.2f} "
                       f"{h['expected']:<15.2f} {h['magnitude']:<12.2f}")
+            print(f"\n   • Inarmonicidad (B): {result['inharmonicity']:.2e}")
+        print(f"   • Relación armónicos/ruido (HNR): {result['hnr_db']:.1f} dB")
         
         print("\n" + "=" * 70)
         print("CONCEPTOS DE DSP APLICADOS:")
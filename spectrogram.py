@@ -0,0 +1,174 @@
+"""
+Spectrogram Module
+STFT spectrograms of long recordings, computed in tiles at several time
+resolutions and cached, so zooming or panning only transforms what is shown
+"""
+
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+from audio_analyzer import compute_frame_spectra
+from fft_cache import get_rfft_frequencies, get_window
+
+# Decibel floor of the magnitudes (0 dB is a full-scale sine)
+FLOOR_DB = -120.0
+
+
+class SpectrogramTiles:
+    """
+    Multi-resolution tiled STFT of a signal
+    
+    Level 0 has a frame every `frame_size // 4` samples and every further
+    level doubles the hop (same frame size, so the same frequency
+    resolution) until the whole signal fits in a few tiles. Each level is
+    split into tiles of `tile_frames` frames, transformed on first use with
+    one batched FFT (compute_frame_spectra) and kept in an LRU cache. A query
+    is answered from the coarsest level that still has a frame per output
+    column, so an overview and a close zoom both transform only about as
+    many frames as there are columns, and every view that overlaps a tile
+    reuses it.
+    """
+    
+    def __init__(self, audio_data, sample_rate, frame_size=2048, window='hanning',
+                 max_frequency=None, tile_frames=128, max_tiles=256):
+        """
+        Prepare the levels (no FFT is computed until a tile is requested)
+        
+        Args:
+            audio_data (numpy.array): Mono audio signal
+            sample_rate (int): Sample rate in Hz
+            frame_size (int): Samples per STFT frame
+            window (str): Window type ('hamming', 'hanning', 'blackman', 'none')
+            max_frequency (float): Highest frequency kept (default: Nyquist)
+            tile_frames (int): Frames per tile
+            max_tiles (int): Tiles kept in the cache
+        """
+        self.audio_data = np.asarray(audio_data, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.window = window
+        self.tile_frames = tile_frames
+        self.max_tiles = max_tiles
+        
+        frequencies = get_rfft_frequencies(frame_size, sample_rate)
+        if max_frequency is not None:
+            frequencies = frequencies[:np.searchsorted(frequencies, max_frequency, side='right')]
+        self.frequencies = frequencies
+        
+        # Magnitude of a full-scale sine at a bin centre is 1 after this scale
+        self._scale = 2.0 / np.sum(get_window(window, frame_size))
+        
+        self.hops = [max(1, frame_size // 4)]
+        while self.num_frames(len(self.hops) - 1) > 4 * tile_frames:
+            self.hops.append(self.hops[-1] * 2)
+            
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+    @property
+    def duration(self):
+        return len(self.audio_data) / self.sample_rate
+        
+    def num_frames(self, level):
+        """Number of whole frames inside the signal at a level"""
+        if len(self.audio_data) < self.frame_size:
+            return 0
+        return (len(self.audio_data) - self.frame_size) // self.hops[level] + 1
+        
+    def tile(self, level, index):
+        """
+        Magnitudes of one tile
+        
+        Args:
+            level (int): Resolution level (0 is the finest)
+            index (int): Tile number within the level
+            
+        Returns:
+            numpy.array: float32 dB magnitudes of shape (frames, bins); the
+                array is shared with the cache and must not be modified
+        """
+        key = (level, index)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return self._tiles[key]
+                
+        hop = self.hops[level]
+        first = index * self.tile_frames
+        count = min(self.tile_frames, self.num_frames(level) - first)
+        segment = self.audio_data[first * hop:(first + count - 1) * hop + self.frame_size]
+        
+        _, _, spectra = compute_frame_spectra(segment, self.sample_rate, self.frame_size,
+                                              hop, self.window)
+        magnitude = np.abs(spectra[:, :len(self.frequencies)]) * self._scale
+        db = 20 * np.log10(np.maximum(magnitude, 10 ** (FLOOR_DB / 20)))
+        db = db.astype(np.float32)
+        db.flags.writeable = False
+        
+        with self._lock:
+            self._tiles[key] = db
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+            self.misses += 1
+            
+        return db
+        
+    def query(self, start=0.0, end=None, num_columns=1000):
+        """
+        Spectrogram of a time range
+        
+        Args:
+            start (float): Range start in seconds
+            end (float): Range end in seconds (default: end of the signal)
+            num_columns (int): Output width (e.g. plot width in pixels)
+            
+        Returns:
+            tuple: (times, frequencies, magnitudes) where times are frame
+                centres in seconds and magnitudes is a float32 dB array of
+                shape (len(times), len(frequencies)); at most about
+                num_columns frames (fewer when zoomed in past level 0)
+        """
+        end = self.duration if end is None else min(end, self.duration)
+        num_columns = max(1, int(num_columns))
+        
+        if self.num_frames(0) == 0 or end <= start:
+            return np.zeros(0), self.frequencies, np.zeros((0, len(self.frequencies)), dtype=np.float32)
+            
+        # Coarsest level that still has a frame per column
+        samples_per_column = (end - start) * self.sample_rate / num_columns
+        level = 0
+        for candidate, hop in enumerate(self.hops):
+            if hop <= samples_per_column:
+                level = candidate
+                
+        # Frames whose centre lies in the range (at least one)
+        hop = self.hops[level]
+        num_frames = self.num_frames(level)
+        offset = self.frame_size / 2
+        first = min(num_frames - 1, max(0, math.ceil((start * self.sample_rate - offset) / hop)))
+        last = min(num_frames, max(first + 1, math.floor((end * self.sample_rate - offset) / hop) + 1))
+        
+        tiles = range(first // self.tile_frames, (last - 1) // self.tile_frames + 1)
+        magnitudes = np.concatenate([self.tile(level, index) for index in tiles])
+        base = tiles.start * self.tile_frames
+        
+        times = (np.arange(first, last) * hop + offset) / self.sample_rate
+        return times, self.frequencies, magnitudes[first - base:last - base]
+        
+    def stats(self):
+        """
+        Tile cache counters
+        
+        Returns:
+            dict: 'hits', 'misses', 'tiles' held and 'levels'
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'tiles': len(self._tiles),
+            'levels': len(self.hops),
+        }
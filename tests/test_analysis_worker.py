@@ -0,0 +1,118 @@
+"""
+Tests for the background analysis worker
+"""
+
+import threading
+import numpy as np
+from scipy.io import wavfile
+from analysis_worker import DECODE_SHARE, AnalysisWorker
+from audio_analyzer import analyze_signal
+
+SAMPLE_RATE = 44100
+
+
+def sine(frequency=440.0, duration=3.0, amplitude=0.5):
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def drain(worker, thread):
+    worker.shutdown()
+    thread.join(10)
+    events = []
+    while not worker.events.empty():
+        events.append(worker.events.get())
+    return events
+
+
+def test_analyze_signal_reports_every_stage():
+    fractions = []
+    
+    result = analyze_signal(sine(), SAMPLE_RATE, track=True, segments=True, chord=True,
+                            progress=fractions.append)
+    
+    assert result.success and result.note == 'A4'
+    assert len(fractions) > 3
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+
+
+def test_progress_exception_stops_the_analysis():
+    fractions = []
+    
+    def stop(fraction):
+        fractions.append(fraction)
+        raise RuntimeError('stop')
+        
+    result = analyze_signal(sine(), SAMPLE_RATE, track=True, progress=stop)
+    
+    assert not result.success
+    assert len(fractions) == 1
+
+
+def test_signal_job_reports_progress_then_result():
+    worker = AnalysisWorker()
+    job_id = worker.submit_signal(sine(), SAMPLE_RATE, track=True)
+    thread = worker._thread
+    
+    while True:
+        kind, event_job, value = worker.events.get(timeout=10)
+        assert event_job == job_id
+        if kind == 'done':
+            break
+        assert 0.0 <= value <= 1.0
+        
+    assert value.note == 'A4'
+    drain(worker, thread)
+
+
+class CancellingWorker(AnalysisWorker):
+    """Cancels its job at the first progress report of the analysis"""
+    
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.reported = threading.Event()
+        
+    def _reporter(self, job_id, offset):
+        report = super()._reporter(job_id, offset)
+        
+        def cancel_and_report(fraction):
+            self.calls += 1
+            self.cancel(job_id)
+            self.reported.set()
+            report(fraction)
+            
+        return cancel_and_report
+
+
+def test_cancellation_between_tracked_blocks():
+    worker = CancellingWorker()
+    worker.submit_signal(sine(duration=10.0), SAMPLE_RATE, track=True)
+    thread = worker._thread
+    
+    assert worker.reported.wait(10)
+    events = drain(worker, thread)
+    
+    # Stopped at the first tracked block, and nothing posted for the job
+    assert worker.calls == 1
+    assert events == []
+
+
+def test_file_progress_covers_decoding_then_analysis(tmp_path):
+    path = tmp_path / 'a4.wav'
+    wavfile.write(path, SAMPLE_RATE, (sine() * 32767).astype(np.int16))
+    
+    worker = AnalysisWorker(block_size=SAMPLE_RATE)
+    worker.submit_file(str(path), track=True)
+    thread = worker._thread
+    
+    events = []
+    while not events or events[-1][0] != 'done':
+        events.append(worker.events.get(timeout=10))
+    drain(worker, thread)
+    
+    progress = [value for kind, _, value in events if kind == 'progress']
+    assert progress == sorted(progress)
+    assert DECODE_SHARE in progress and progress[-1] == 1.0
+    assert events[-1][2].note == 'A4'
@@ -0,0 +1,191 @@
+"""
+Tests for the ASGI entry point of the web app
+"""
+
+import io
+import json
+import sys
+import zipfile
+from pathlib import Path
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+pytest.importorskip('starlette')
+pytest.importorskip('soundfile')
+testclient = pytest.importorskip('starlette.testclient')
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'web'))
+import asgi  # noqa: E402
+from app import WAVEFORM_POINTS, decode_pcm, pcm_to_float  # noqa: E402
+
+
+def sine_wav(frequency=440.0, duration=1.0, sample_rate=44100):
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    buffer = io.BytesIO()
+    wavfile.write(buffer, sample_rate, (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16))
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='module')
+def client():
+    with testclient.TestClient(asgi.app) as client:
+        yield client
+
+
+def test_analyze_and_zoom_waveform(client):
+    response = client.post('/analyze', files={'audio': ('a.wav', sine_wav(), 'audio/wav')})
+    data = response.json()
+    
+    assert response.status_code == 200
+    assert data['note'].startswith('A')
+    audio_id = data['waveform']['audio_id']
+    
+    zoom = client.get(f'/waveform/{audio_id}', params={'start': 0.25, 'end': 0.5, 'points': 100})
+    assert zoom.status_code == 200
+    assert zoom.json()['points'] == 100
+
+
+
+def test_analyze_sends_only_compact_envelopes(client):
+    # No per-sample or per-bin arrays: the waveform is min/max/RMS envelopes
+    # in base64 float32 and the web app has no spectrum view
+    response = client.post('/analyze', files={'audio': ('a.wav', sine_wav(duration=10.0), 'audio/wav')})
+    data = response.json()
+    
+    assert not [key for key, value in data.items() if isinstance(value, list)]
+    waveform = data['waveform']
+    assert waveform['encoding'] == 'float32-base64'
+    assert waveform['points'] == WAVEFORM_POINTS
+    assert all(len(waveform[key]) == len(waveform['min']) for key in ('max', 'rms'))
+    assert len(response.content) < 20000
+
+def test_analyze_reports_the_chord_on_request(client):
+    response = client.post('/analyze', files={'audio': ('a.wav', sine_wav(), 'audio/wav')},
+                           data={'chord': '1'})
+    
+    assert response.status_code == 200
+    assert [note['note'] for note in response.json()['chord']] == ['A4']
+    
+    plain = client.post('/analyze', files={'audio': ('a.wav', sine_wav(), 'audio/wav')})
+    assert 'chord' not in plain.json()
+
+
+
+def test_decode_pcm_normalizes_full_scale_negative_int16():
+    # np.abs(int16(-32768)) overflows back to -32768 and was missed as the peak
+    body = np.array([-32768, 100, -50], dtype='<i2').tobytes()
+    
+    audio_data, sample_rate = decode_pcm(body, {'sample_rate': '44100'}, {})
+    
+    assert sample_rate == 44100
+    np.testing.assert_allclose(audio_data, [-1.0, 100 / 32768, -50 / 32768], rtol=1e-6)
+
+
+def test_analyze_live_accepts_raw_pcm(client):
+    t = np.arange(44100) / 44100
+    samples = (0.5 * np.sin(2 * np.pi * 440.0 * t) * 32767).astype('<i2')
+    samples[0] = -32768
+    
+    response = client.post('/analyze-live', content=samples.tobytes(), params={'sample_rate': 44100},
+                           headers={'content-type': 'application/octet-stream'})
+    
+    assert response.status_code == 200
+    assert response.json()['note'].startswith('A')
+
+
+def test_stream_and_upload_share_the_pcm_scale():
+    samples = np.array([-32768, 16384, 0], dtype='<i2')
+    
+    np.testing.assert_allclose(pcm_to_float(samples.tobytes(), samples.dtype), [-1.0, 0.5, 0.0])
+    np.testing.assert_allclose(pcm_to_float(samples.tobytes(), samples.dtype, normalize=True),
+                               [-1.0, 0.5, 0.0])
+    with pytest.raises(ValueError):
+        pcm_to_float(b'\0', samples.dtype)
+
+
+def test_tuner_stream_keeps_silence_quiet(client):
+    t = np.arange(44100) / 44100
+    tone = (0.5 * np.sin(2 * np.pi * 440.0 * t) * 32767).astype('<i2')
+    hiss = np.random.default_rng(0).integers(-8, 8, 44100).astype('<i2')
+    
+    with client.websocket_connect('/ws/tuner') as websocket:
+        websocket.send_text('{"sample_rate": 44100, "format": "int16"}')
+        websocket.send_bytes(tone.tobytes())
+        assert websocket.receive_json()['note'].startswith('A')
+        
+        # Blocks are not peak-normalized, so hiss stays under the silence gate
+        websocket.send_bytes(hiss.tobytes())
+        assert websocket.receive_json()['has_valid_signal'] is False
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1.5'])
+def test_malformed_content_length_is_a_client_error(client, length):
+    response = client.post('/analyze-live', content=b'{}',
+                           headers={'content-type': 'application/json', 'content-length': length})
+    assert response.status_code == 400
+    assert response.json()['success'] is False
+
+
+def test_bad_base64_is_a_client_error(client):
+    response = client.post('/analyze-live', json={'audio': '!!!'})
+    assert response.status_code == 400
+    assert response.json()['error'] == 'Audio base64 no válido'
+
+
+def test_chunked_upload_is_capped(client):
+    def chunks():
+        for _ in range(asgi.MAX_CONTENT_LENGTH // (1 << 20) + 2):
+            yield b'\0' * (1 << 20)
+            
+    response = client.post('/analyze-live', content=chunks(),
+                           headers={'content-type': 'application/octet-stream'})
+    assert response.status_code == 413
+
+
+
+def test_index_and_cache_stats(client):
+    assert client.get('/').status_code == 200
+    
+    stats = client.get('/cache-stats')
+    assert stats.status_code == 200
+    assert isinstance(stats.json(), dict)
+
+
+@pytest.mark.parametrize('files, error', [
+    ({'other': ('a.wav', b'', 'audio/wav')}, 'No se encontró archivo de audio'),
+    ({'audio': ('a.mp3', b'ID3', 'audio/mpeg')}, 'Solo se permiten archivos WAV'),
+])
+def test_analyze_rejects_missing_or_non_wav_uploads(client, files, error):
+    response = client.post('/analyze', files=files)
+    
+    assert response.status_code == 400
+    assert response.json() == {'success': False, 'error': error}
+
+
+def test_waveform_errors(client):
+    assert client.get('/waveform/unknown').status_code == 404
+    
+    response = client.post('/analyze', files={'audio': ('a.wav', sine_wav(), 'audio/wav')})
+    audio_id = response.json()['waveform']['audio_id']
+    assert client.get(f'/waveform/{audio_id}', params={'start': 'abc'}).status_code == 400
+
+
+def test_batch_streams_one_line_per_file(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('e.wav', sine_wav(329.63))
+        zf.writestr('notes.txt', 'not audio')
+        
+    files = [
+        ('audio', ('a.wav', sine_wav(440.0), 'audio/wav')),
+        ('audio', ('c.wav', sine_wav(261.63), 'audio/wav')),
+        ('audio', ('takes.zip', archive.getvalue(), 'application/zip')),
+    ]
+    response = client.post('/analyze-batch', files=files)
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    notes = {line['file']: line['note'] for line in lines}
+    assert notes == {'a.wav': 'A4', 'c.wav': 'C4', 'e.wav': 'E4'}
+    assert all('waveform' not in line for line in lines)
\ No newline at end of file
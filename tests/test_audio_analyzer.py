@@ -0,0 +1,132 @@
+"""
+Tests for the audio analyzer
+"""
+
+import json
+import pickle
+import numpy as np
+import pytest
+import audio_analyzer
+from audio_analyzer import AnalysisResult, PitchTracker, analyze_signal
+
+SAMPLE_RATE = 44100
+
+
+def sine(frequency=440.0, duration=1.0, amplitude=0.5):
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def test_analysis_result_has_slots():
+    result = AnalysisResult(note='A4')
+    
+    assert not hasattr(result, '__dict__')
+    with pytest.raises(AttributeError):
+        result.notee = 'A4'
+    assert result['note'] == 'A4'
+    assert result.get('missing', 1) == 1
+    assert pickle.loads(pickle.dumps(result)) == result
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_to_json_with_and_without_orjson(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(audio_analyzer, 'orjson', None)
+    result = analyze_signal(sine(), SAMPLE_RATE, track=True)
+    
+    summary = json.loads(result.to_json())
+    assert summary['note'] == 'A4'
+    assert 'pitch_track' not in summary and 'audio_data' not in summary
+    
+    full = json.loads(result.to_json(include_signal=True))
+    assert len(full['pitch_track']['frequency']) == len(result.pitch_track['frequency'])
+
+
+@pytest.mark.parametrize('refine', ['gaussian', 'qifft'])
+def test_analyze_frames_matches_track_pitch(refine):
+    signal = np.concatenate([sine(440.0), np.zeros(SAMPLE_RATE // 2), sine(261.63)])
+    
+    batched = audio_analyzer.analyze_frames(signal, SAMPLE_RATE, batch_frames=7, refine=refine)
+    tracked = audio_analyzer.track_pitch(signal, SAMPLE_RATE, refine=refine)
+    
+    assert batched['note'] == tracked['note']
+    np.testing.assert_array_equal(batched['is_valid'], tracked['is_valid'])
+    np.testing.assert_allclose(batched['time'], tracked['time'])
+    np.testing.assert_allclose(batched['frequency'], tracked['frequency'], atol=0.01)
+
+
+def test_analyze_frames_rejects_phase_refinement():
+    with pytest.raises(ValueError):
+        audio_analyzer.analyze_frames(sine(), SAMPLE_RATE, refine='phase')
+
+
+def chirp_with_noise(duration=1.0):
+    """Signal whose every frame differs (rising pitch, then noise)"""
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 0.5 * np.sin(2 * np.pi * (200 * t + 300 * t * t))
+    signal[len(t) // 2:] += 0.1 * np.random.default_rng(0).standard_normal(len(t) - len(t) // 2)
+    return signal.astype(np.float32)
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 1000, 1024, 4096, 5000, SAMPLE_RATE])
+def test_tracker_frames_do_not_depend_on_block_size(block_size):
+    frame_size, hop_size = 4096, 1000
+    signal = chirp_with_noise() if block_size > 1 else chirp_with_noise(0.2)
+    tracker = PitchTracker(SAMPLE_RATE, frame_size, hop_size)
+    
+    frames = []
+    for start in range(0, len(signal), block_size):
+        frames.extend(tracker.process(signal[start:start + block_size]))
+        
+    # A frame ends at every multiple of the hop once the ring buffer is full
+    ends = np.arange(hop_size, len(signal) + 1, hop_size)
+    ends = ends[ends >= frame_size]
+    assert len(frames) == len(ends)
+    for frame, end in zip(frames, ends):
+        expected = signal[end - frame_size:end].astype(np.float64)
+        assert frame['time'] == pytest.approx((end - frame_size / 2) / SAMPLE_RATE)
+        assert frame['rms'] == pytest.approx(np.sqrt(np.mean(expected ** 2)), rel=1e-5)
+        
+    whole = PitchTracker(SAMPLE_RATE, frame_size, hop_size).process(signal)
+    assert [f['frequency'] for f in frames] == pytest.approx([f['frequency'] for f in whole])
+
+
+def test_tracker_reset_starts_a_new_stream():
+    signal = chirp_with_noise()
+    tracker = PitchTracker(SAMPLE_RATE)
+    first = tracker.process(signal)
+    tracker.process(sine(440.0, 0.3))
+    tracker.reset()
+    
+    assert tracker.samples_processed == 0
+    assert tracker.process(signal) == first
+
+
+@pytest.mark.parametrize('refine, max_cents', [('none', 1.0), ('gaussian', 0.1), ('phase', 0.01)])
+def test_peak_refinement_accuracy(refine, max_cents):
+    # 441.3 Hz lies between bins (10.77 Hz apart for 4096 samples)
+    frames = PitchTracker(SAMPLE_RATE, refine=refine).process(sine(441.3))
+    cents = [1200 * np.log2(frame['frequency'] / 441.3) for frame in frames]
+    
+    # The phase vocoder needs a previous hop: its first frame falls back to
+    # the Gaussian interpolation
+    assert abs(cents[0]) < max(max_cents, 0.1)
+    assert max(abs(c) for c in cents[1:]) < max_cents
+
+
+def test_phase_refinement_restarts_after_silence():
+    signal = np.concatenate([sine(441.3, 0.5), np.zeros(SAMPLE_RATE // 2), sine(441.3, 0.5)])
+    frames = PitchTracker(SAMPLE_RATE, refine='phase').process(signal)
+    
+    # Frames wholly inside either note (the silence drops the old phase)
+    steady = [frame for frame in frames if frame['rms'] > 0.35]
+    assert len(steady) > 30
+    assert all(abs(1200 * np.log2(frame['frequency'] / 441.3)) < 0.1 for frame in steady)
+    assert not all(frame['is_valid'] for frame in frames)
+
+
+def test_tracker_rejects_bad_parameters():
+    with pytest.raises(ValueError):
+        PitchTracker(SAMPLE_RATE, frame_size=1024, hop_size=2048)
+    with pytest.raises(ValueError):
+        PitchTracker(SAMPLE_RATE, refine='cubic')
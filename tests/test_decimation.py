@@ -0,0 +1,89 @@
+"""
+Tests for waveform envelopes and their multi-resolution pyramid
+"""
+
+import base64
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'web'))
+from decimation import BASE_BIN_SIZE, LEVEL_FACTOR, WaveformPyramid, encode_float32  # noqa: E402
+
+SAMPLE_RATE = 8000
+
+
+def direct_envelope(signal, num_points):
+    """Reference min/max/RMS over num_points near-equal runs of samples"""
+    chunks = np.array_split(signal.astype(np.float64), num_points)
+    return (np.array([c.min() for c in chunks]), np.array([c.max() for c in chunks]),
+            np.array([np.sqrt(np.mean(c * c)) for c in chunks]))
+
+
+@pytest.fixture
+def signal():
+    return np.random.default_rng(0).uniform(-1, 1, 10 * SAMPLE_RATE + 123).astype(np.float32)
+
+
+def test_levels_shrink_by_the_level_factor(signal):
+    pyramid = WaveformPyramid(signal, SAMPLE_RATE)
+    
+    sizes = [bin_size for bin_size, *_ in pyramid.levels]
+    assert sizes[0] == BASE_BIN_SIZE
+    assert all(b == a * LEVEL_FACTOR for a, b in zip(sizes, sizes[1:]))
+    assert len(pyramid.levels[-1][1]) <= 256 < len(pyramid.levels[-2][1])
+
+
+def test_overview_keeps_every_peak(signal):
+    signal[12345] = 5.0
+    pyramid = WaveformPyramid(signal, SAMPLE_RATE)
+    
+    minimum, maximum, rms = pyramid.query(num_points=100)
+    
+    assert len(minimum) == 100
+    assert maximum.max() == 5.0
+    assert minimum.min() == signal.min() and maximum.min() > 0
+    overall = np.sqrt(np.mean(signal.astype(np.float64) ** 2))
+    assert np.sqrt(np.mean(rms.astype(np.float64) ** 2)) == pytest.approx(overall, rel=0.01)
+
+
+def test_query_matches_a_direct_envelope_on_bin_boundaries(signal):
+    pyramid = WaveformPyramid(signal, SAMPLE_RATE)
+    # 64 points over 64 * 256 samples: exactly one level-2 bin per point
+    start, count = 1024 * BASE_BIN_SIZE, 64 * 256
+    
+    minimum, maximum, rms = pyramid.query(start / SAMPLE_RATE, (start + count) / SAMPLE_RATE, 64)
+    expected = direct_envelope(signal[start:start + count], 64)
+    
+    np.testing.assert_array_equal(minimum, expected[0])
+    np.testing.assert_array_equal(maximum, expected[1])
+    np.testing.assert_allclose(rms, expected[2], rtol=1e-5)
+
+
+def test_partial_last_bin_and_deep_zoom(signal):
+    pyramid = WaveformPyramid(signal, SAMPLE_RATE)
+    
+    # The signal ends 123 samples into a level-0 bin
+    _, _, rms = pyramid.query(start=(len(signal) - 123) / SAMPLE_RATE, num_points=1)
+    assert rms[0] == pytest.approx(np.sqrt(np.mean(signal[-123:].astype(np.float64) ** 2)), rel=1e-5)
+    
+    # Zoomed past the finest level: one point per base bin
+    minimum, _, _ = pyramid.query(1.0, 1.0 + 10 * BASE_BIN_SIZE / SAMPLE_RATE, 1000)
+    assert len(minimum) == 10
+
+
+def test_empty_ranges_and_signals():
+    assert all(len(a) == 0 for a in WaveformPyramid(np.zeros(0), SAMPLE_RATE).query())
+    pyramid = WaveformPyramid(np.ones(100), SAMPLE_RATE)
+    assert all(len(a) == 0 for a in pyramid.query(start=0.5, end=0.2))
+
+
+def test_encode_round_trips_float32(signal):
+    encoded = WaveformPyramid(signal, SAMPLE_RATE).encode(start=2.0, end=50.0, num_points=300)
+    
+    assert encoded['encoding'] == 'float32-base64'
+    assert encoded['end'] == pytest.approx(len(signal) / SAMPLE_RATE)
+    values = np.frombuffer(base64.b64decode(encoded['max']), dtype='<f4')
+    assert len(values) == encoded['points'] == 300
+    assert encode_float32([1.5, -2.0]) == base64.b64encode(np.array([1.5, -2.0], '<f4').tobytes()).decode()
@@ -0,0 +1,79 @@
+"""
+Tests for polyphonic pitch estimation
+"""
+
+import numpy as np
+import pytest
+from audio_analyzer import analyze_signal
+from multipitch import MultiPitchEstimator, detect_notes
+
+SAMPLE_RATE = 44100
+
+# Open E major guitar chord: E2 B2 E3 G#3 B3 E4
+OPEN_E = [82.41, 123.47, 164.81, 207.65, 246.94, 329.63]
+
+
+def chord(frequencies, duration=1.5, num_harmonics=12, decay=0.7, noise=0.02, seed=0):
+    """Harmonic tones (partials h ** -decay, in phase) plus white noise, peak 1"""
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = sum(np.sin(2 * np.pi * f * h * t) / h ** decay
+                 for f in frequencies for h in range(1, num_harmonics + 1))
+    signal /= np.max(np.abs(signal))
+    return signal + noise * np.random.default_rng(seed).standard_normal(len(t))
+
+
+def names(notes):
+    return [note['note'] for note in notes]
+
+
+@pytest.mark.parametrize('decay', [0.7, 1.0])
+def test_open_e_chord_finds_every_string(decay):
+    # E2, E3 and E4 share every partial of the upper two: cancellation alone
+    # used to find only 4 of the 6 notes
+    notes = detect_notes(chord(OPEN_E, decay=decay), SAMPLE_RATE)
+    
+    assert names(notes) == ['E2', 'B2', 'E3', 'G#3', 'B3', 'E4']
+    assert all(abs(note['cents']) < 5 for note in notes)
+
+
+@pytest.mark.parametrize('frequencies, expected', [
+    ([261.63, 329.63, 392.0], ['C4', 'E4', 'G4']),
+    ([110.0, 164.81], ['A2', 'E3']),
+    ([220.0, 440.0], ['A3', 'A4']),
+    ([440.0], ['A4']),
+])
+def test_chords_intervals_and_single_notes(frequencies, expected):
+    assert names(detect_notes(chord(frequencies), SAMPLE_RATE)) == expected
+
+
+def test_silence_and_noise_have_no_notes():
+    assert detect_notes(np.zeros(SAMPLE_RATE), SAMPLE_RATE) == []
+    noise = 0.3 * np.random.default_rng(1).standard_normal(SAMPLE_RATE)
+    assert detect_notes(noise, SAMPLE_RATE) == []
+
+
+def test_batch_frames_do_not_change_the_result():
+    signal = chord(OPEN_E)
+    batched = detect_notes(signal, SAMPLE_RATE, batch_frames=1)
+    notes = detect_notes(signal, SAMPLE_RATE)
+    
+    assert names(batched) == names(notes)
+    assert [n['frequency'] for n in batched] == pytest.approx([n['frequency'] for n in notes])
+
+
+def test_estimate_names_each_frame():
+    estimator = MultiPitchEstimator(SAMPLE_RATE)
+    signal = chord([261.63, 329.63, 392.0], noise=0.0)
+    frames = np.stack([signal[:estimator.frame_size], np.zeros(estimator.frame_size)])
+    
+    notes = estimator.estimate(frames)
+    
+    assert names(notes[0]) == ['C4', 'E4', 'G4']
+    assert notes[1] == []
+
+
+def test_analyze_signal_reports_the_chord():
+    result = analyze_signal(chord([261.63, 329.63, 392.0]), SAMPLE_RATE, chord=True)
+    
+    assert names(result.chord) == ['C4', 'E4', 'G4']
+    assert analyze_signal(chord([440.0]), SAMPLE_RATE).chord is None
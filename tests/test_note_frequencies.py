@@ -0,0 +1,123 @@
+"""
+Tests for note tables, temperaments and note lookup
+"""
+
+import numpy as np
+import pytest
+from note_frequencies import (
+    NOTE_FREQUENCIES, TEMPERAMENTS, format_note_name, get_note_from_frequency,
+    get_note_table, get_notes_from_frequencies
+)
+
+
+def table(reference=440.0, temperament='equal'):
+    names, frequencies = get_note_table(reference, temperament)
+    return dict(zip(names, frequencies))
+
+
+def cents(a, b):
+    return 1200 * np.log2(a / b)
+
+
+@pytest.mark.parametrize('temperament', sorted(TEMPERAMENTS))
+@pytest.mark.parametrize('reference', [415.0, 440.0, 442.0])
+def test_a4_sits_on_the_reference(reference, temperament):
+    notes = table(reference, temperament)
+    
+    assert notes['A4'] == pytest.approx(reference)
+    assert notes['A5'] == pytest.approx(2 * reference)
+    assert notes['C0'] < notes['C#0'] < notes['B8']
+
+
+def test_equal_temperament_values():
+    assert NOTE_FREQUENCIES['A4'] == 440.0
+    assert NOTE_FREQUENCIES['C4'] == 261.63
+    assert NOTE_FREQUENCIES['E2'] == 82.41
+    assert len(NOTE_FREQUENCIES) == 108
+
+
+def test_just_intonation_has_pure_intervals():
+    notes = table(temperament='just')
+    
+    assert notes['E4'] / notes['C4'] == pytest.approx(5 / 4)
+    assert notes['G4'] / notes['C4'] == pytest.approx(3 / 2)
+    # Relative to equal temperament, the just major third is 13.7 cents flat
+    assert cents(notes['E4'] / notes['C4'], 2 ** (4 / 12)) == pytest.approx(-13.69, abs=0.01)
+
+
+def test_pythagorean_fifths_and_meantone_thirds():
+    pythagorean = table(temperament='pythagorean')
+    meantone = table(temperament='meantone')
+    
+    assert pythagorean['D4'] / pythagorean['G3'] == pytest.approx(3 / 2)
+    assert meantone['E4'] / meantone['C4'] == pytest.approx(5 / 4)
+    # Quarter-comma meantone fifths are narrowed by a quarter of the syntonic comma
+    assert cents(meantone['G4'] / meantone['C4'], 3 / 2) == pytest.approx(-5.38, abs=0.01)
+
+
+def test_custom_temperament():
+    offsets = [0.0] * 12
+    offsets[4] = -14.0  # Flatten every E
+    notes = table(temperament=offsets)
+    
+    assert cents(notes['E4'], table()['E4']) == pytest.approx(-14.0)
+    with pytest.raises(ValueError):
+        get_note_table(440.0, [0.0] * 11)
+    with pytest.raises(ValueError):
+        get_note_table(440.0, 'werckmeister')
+    with pytest.raises(ValueError):
+        get_note_table(0.0)
+
+
+def test_tables_are_cached_and_read_only():
+    _, frequencies = get_note_table(442.0, 'just')
+    
+    assert get_note_table(442, 'just')[1] is frequencies
+    with pytest.raises(ValueError):
+        frequencies[0] = 1.0
+
+
+@pytest.mark.parametrize('frequency, note, deviation', [
+    (440.0, 'A4', 0.0),
+    (445.0, 'A4', 19.56),
+    (261.63, 'C4', 0.0),
+    (453.0, 'A#4', -49.59),
+    (16.3516, 'C0', 0.0),
+])
+def test_nearest_note(frequency, note, deviation):
+    name, exact, offset = get_note_from_frequency(frequency)
+    
+    assert name == note
+    assert offset == pytest.approx(deviation, abs=0.05)
+    assert cents(frequency, exact) == pytest.approx(offset)
+
+
+def test_nearest_note_follows_the_temperament():
+    # Tuned to A4 = 440, just C4 is 264 Hz and E4 330 Hz (equal: 329.63 Hz)
+    _, equal_exact, equal_cents = get_note_from_frequency(330.5)
+    _, just_exact, just_cents = get_note_from_frequency(330.5, temperament='just')
+    
+    assert abs(just_cents) < abs(equal_cents)
+    assert just_exact == pytest.approx(330.0)
+    assert equal_exact == pytest.approx(329.63, abs=0.01)
+    assert get_note_from_frequency(0.0) == (None, None, None)
+
+
+def test_vectorized_lookup_matches_scalar():
+    frequencies = np.array([0.0, 82.41, 440.0, 445.0, 1000.0, -1.0])
+    
+    names, exact, offsets = get_notes_from_frequencies(frequencies, 442.0, 'meantone')
+    
+    for i, frequency in enumerate(frequencies):
+        name, exact_one, offset = get_note_from_frequency(frequency, 442.0, 'meantone')
+        assert names[i] == name
+        if name is None:
+            assert np.isnan(exact[i]) and np.isnan(offsets[i])
+        else:
+            assert exact[i] == pytest.approx(exact_one)
+            assert offsets[i] == pytest.approx(offset)
+
+
+def test_format_note_name():
+    assert format_note_name('C#4') == 'C♯4'
+    assert format_note_name(None) is None
@@ -0,0 +1,79 @@
+"""
+Tests for onset detection and note segmentation
+"""
+
+import numpy as np
+import pytest
+from audio_analyzer import analyze_segments
+from onsets import ONSET_METHODS, detect_onsets, onset_strength, segment_signal, steady_state
+
+SAMPLE_RATE = 44100
+
+# Note starts in seconds of the test melody
+STARTS = [0.25, 0.75, 1.25, 1.75]
+PITCHES = [261.63, 329.63, 392.0, 523.25]
+
+
+def melody(decay=6.0, seed=0):
+    """Plucked notes (exponential decay) at STARTS over quiet noise"""
+    length = int((STARTS[-1] + 0.5) * SAMPLE_RATE)
+    signal = 0.001 * np.random.default_rng(seed).standard_normal(length)
+    for start, pitch in zip(STARTS, PITCHES):
+        t = np.arange(length - int(start * SAMPLE_RATE)) / SAMPLE_RATE
+        signal[int(start * SAMPLE_RATE):] += 0.5 * np.sin(2 * np.pi * pitch * t) * np.exp(-decay * t)
+    return signal
+
+
+@pytest.mark.parametrize('method', ONSET_METHODS)
+def test_onsets_of_plucked_notes(method):
+    onsets = detect_onsets(melody(), SAMPLE_RATE, method=method)
+    
+    # Within a frame (2048 samples) of each true start
+    assert len(onsets) == len(STARTS)
+    assert np.abs(onsets - STARTS).max() < 2048 / SAMPLE_RATE
+
+
+def test_complex_domain_catches_a_legato_pitch_change():
+    # Same level throughout: only the pitch changes, at 0.5 s
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    signal = 0.5 * np.sin(2 * np.pi * np.where(t < 0.5, 440.0, 660.0) * t)
+    
+    onsets = detect_onsets(signal, SAMPLE_RATE, method='complex')
+    
+    assert any(abs(onset - 0.5) < 2048 / SAMPLE_RATE for onset in onsets)
+
+
+def test_batches_do_not_change_the_strength():
+    signal = melody()
+    times, strength = onset_strength(signal, SAMPLE_RATE)
+    _, batched = onset_strength(signal, SAMPLE_RATE, batch_frames=5)
+    
+    np.testing.assert_allclose(batched, strength, rtol=1e-4, atol=1e-6)
+    assert times[0] == pytest.approx(1024 / SAMPLE_RATE)
+
+
+def test_silence_and_short_signals_have_no_onsets():
+    assert len(detect_onsets(np.zeros(SAMPLE_RATE), SAMPLE_RATE)) == 0
+    assert len(detect_onsets(np.ones(100), SAMPLE_RATE)) == 0
+    with pytest.raises(ValueError):
+        onset_strength(np.zeros(SAMPLE_RATE), SAMPLE_RATE, method='energy')
+
+
+def test_segments_cover_the_signal_and_skip_attacks():
+    signal = melody()
+    bounds = segment_signal(signal, SAMPLE_RATE)
+    
+    assert [end for _, end in bounds][:-1] == [start for start, _ in bounds][1:]
+    assert bounds[-1][1] == len(signal)
+    
+    start, end = steady_state(*bounds[0], SAMPLE_RATE)
+    assert start == bounds[0][0] + int(0.05 * SAMPLE_RATE)
+    assert end - start <= int(0.5 * SAMPLE_RATE)
+    assert steady_state(0, 100, SAMPLE_RATE) == (0, 100)
+
+
+def test_analyze_segments_names_each_note():
+    notes = analyze_segments(melody(), SAMPLE_RATE)
+    
+    assert [note['note'] for note in notes] == ['C4', 'E4', 'G4', 'C5']
+    assert [note['start'] for note in notes] == pytest.approx(STARTS, abs=2048 / SAMPLE_RATE)
@@ -0,0 +1,31 @@
+"""
+Tests for the pitch estimators
+"""
+
+import numpy as np
+import pytest
+from pitch_estimators import ESTIMATORS
+
+SAMPLE_RATE = 44100
+
+
+@pytest.mark.parametrize('method', sorted(ESTIMATORS))
+def test_silence_has_no_pitch(method):
+    frequency, is_valid = ESTIMATORS[method](np.zeros(2048), SAMPLE_RATE)
+    
+    assert frequency == 0.0
+    assert not is_valid
+
+
+@pytest.mark.parametrize('method', ['yin', 'mcleod'])
+def test_constant_signal_has_no_pitch(method):
+    assert ESTIMATORS[method](np.full(2048, 0.5), SAMPLE_RATE) == (0.0, False)
+
+
+@pytest.mark.parametrize('method', sorted(ESTIMATORS))
+def test_sine(method):
+    t = np.arange(4096) / SAMPLE_RATE
+    frequency, is_valid = ESTIMATORS[method](np.sin(2 * np.pi * 440.0 * t), SAMPLE_RATE)
+    
+    assert is_valid
+    assert frequency == pytest.approx(440.0, abs=0.5)
@@ -0,0 +1,65 @@
+"""
+Tests for the result cache
+"""
+
+import pickle
+from result_cache import ResultCache
+from audio_analyzer import AnalysisResult
+
+
+class Exploit:
+    """Pickle payload that records that it ran"""
+    
+    ran = False
+    
+    def __reduce__(self):
+        return (setattr, (Exploit, 'ran', True))
+
+
+def test_disk_tier_round_trips_json(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    ResultCache(path=path).put('key', {'note': 'A4', 'cents': 1.5, 'harmonics': [1, 2]})
+    
+    assert ResultCache(path=path).get('key') == {'note': 'A4', 'cents': 1.5, 'harmonics': [1, 2]}
+
+
+def test_disk_tier_never_unpickles(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResultCache(path=path)
+    cache._db.execute('INSERT INTO results VALUES (?, ?, ?, ?, ?)',
+                      ('key', pickle.dumps(Exploit()), 1, 1e12, 1e12))
+    cache._db.commit()
+    
+    assert ResultCache(path=path).get('key') is None
+    assert not Exploit.ran
+
+
+def test_objects_stay_in_memory(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResultCache(path=path)
+    result = AnalysisResult(note='A4')
+    cache.put('key', result)
+    
+    assert cache.get('key') is result
+    assert ResultCache(path=path).get('key') is None
+
+
+def test_locked_disk_tier_degrades_to_memory(tmp_path, monkeypatch):
+    import result_cache
+    monkeypatch.setattr(result_cache, 'DB_TIMEOUT', 0.01)
+    path = str(tmp_path / 'cache.sqlite')
+    ResultCache(path=path).put('old', {'note': 'E2'})
+    cache = ResultCache(path=path)
+    
+    # Another process holds the write lock
+    other = result_cache.sqlite3.connect(path)
+    other.execute('BEGIN EXCLUSIVE')
+    try:
+        cache.put('key', {'note': 'A4'})
+        assert cache.get('key') == {'note': 'A4'}
+        assert cache.get('old') is None
+    finally:
+        other.rollback()
+        other.close()
+        
+    assert ResultCache(path=path).get('key') is None
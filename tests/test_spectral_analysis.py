@@ -0,0 +1,38 @@
+"""
+Tests for the spectral analyzer
+"""
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+from spectral_analysis import SpectralAnalyzer
+
+SAMPLE_RATE = 44100
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    path = tmp_path / 'a4.wav'
+    wavfile.write(path, SAMPLE_RATE, (0.5 * np.sin(2 * np.pi * 440.0 * t) * 32767).astype(np.int16))
+    return SpectralAnalyzer(str(path))
+
+
+def test_memoized_spectra_are_read_only(analyzer):
+    _, spectrum = analyzer.get_spectrum()
+    frequencies, magnitude = analyzer.get_magnitude()
+    
+    assert analyzer.get_magnitude()[1] is magnitude
+    with pytest.raises(ValueError):
+        spectrum[0] = 0
+    with pytest.raises(ValueError):
+        magnitude *= 2
+    assert frequencies[np.argmax(magnitude)] == pytest.approx(440.0, abs=1.0)
+
+
+def test_new_signal_clears_the_memoized_spectra(analyzer):
+    _, magnitude = analyzer.get_magnitude()
+    analyzer.audio_data = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    
+    assert analyzer.get_magnitude()[1] is not magnitude
+    assert not analyzer.get_magnitude()[1].any()
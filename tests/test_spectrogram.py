@@ -0,0 +1,75 @@
+"""
+Tests for the tiled multi-resolution spectrogram
+"""
+
+import numpy as np
+import pytest
+from audio_analyzer import compute_frame_spectra
+from spectrogram import FLOOR_DB, SpectrogramTiles
+
+SAMPLE_RATE = 44100
+
+
+def two_tones(duration=20.0):
+    """440 Hz for the first half, 880 Hz for the second, full scale"""
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    return np.sin(2 * np.pi * np.where(t < duration / 2, 440.0, 880.0) * t).astype(np.float32)
+
+
+def test_overview_uses_a_coarse_level_and_few_tiles():
+    tiles = SpectrogramTiles(two_tones(), SAMPLE_RATE, tile_frames=64)
+    
+    times, frequencies, magnitudes = tiles.query(num_columns=200)
+    
+    assert magnitudes.shape == (len(times), len(frequencies))
+    # Coarsest level with a frame per column: between one and two per column
+    assert 200 <= len(times) < 400
+    assert tiles.stats()['misses'] <= 4
+    # Peak bin follows the tone, at about 0 dB for a full-scale sine
+    peaks = frequencies[np.argmax(magnitudes, axis=1)]
+    assert np.all(np.abs(peaks[times < 9.5] - 440.0) < 22)
+    assert np.all(np.abs(peaks[times > 10.5] - 880.0) < 22)
+    assert magnitudes.max() == pytest.approx(0.0, abs=1.5)
+    assert magnitudes.min() >= FLOOR_DB
+
+
+def test_zoom_matches_a_direct_stft_and_reuses_tiles():
+    signal = two_tones()
+    tiles = SpectrogramTiles(signal, SAMPLE_RATE, tile_frames=64)
+    
+    times, _, magnitudes = tiles.query(5.0, 5.1, num_columns=1000)
+    
+    # Level 0 (hop 512): frame centres inside the range
+    assert np.all((times >= 5.0) & (times <= 5.1))
+    assert np.diff(times) == pytest.approx(512 / SAMPLE_RATE)
+    first = int(round(times[0] * SAMPLE_RATE)) - 1024
+    segment = signal[first:first + (len(times) - 1) * 512 + 2048]
+    _, _, spectra = compute_frame_spectra(segment, SAMPLE_RATE, 2048, 512, 'hanning')
+    expected = 20 * np.log10(np.maximum(np.abs(spectra) * tiles._scale, 10 ** (FLOOR_DB / 20)))
+    np.testing.assert_allclose(magnitudes, expected, atol=1e-3)
+    
+    misses = tiles.stats()['misses']
+    tiles.query(5.02, 5.08, num_columns=1000)
+    assert tiles.stats()['misses'] == misses
+    assert tiles.stats()['hits'] > 0
+
+
+def test_tiles_are_read_only_and_evicted():
+    tiles = SpectrogramTiles(two_tones(5.0), SAMPLE_RATE, tile_frames=16, max_tiles=3)
+    
+    for index in range(5):
+        tile = tiles.tile(0, index)
+    
+    assert tiles.stats()['tiles'] == 3
+    with pytest.raises(ValueError):
+        tile[0, 0] = 0.0
+
+
+def test_max_frequency_and_short_signals():
+    tiles = SpectrogramTiles(two_tones(1.0), SAMPLE_RATE, max_frequency=1000.0)
+    assert tiles.frequencies[-1] <= 1000.0
+    assert tiles.query()[2].shape[1] == len(tiles.frequencies)
+    
+    short = SpectrogramTiles(np.zeros(100), SAMPLE_RATE)
+    times, frequencies, magnitudes = short.query()
+    assert len(times) == 0 and magnitudes.shape == (0, len(frequencies))
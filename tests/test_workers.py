@@ -0,0 +1,88 @@
+"""
+Tests for the bounded analysis pool of the web app
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'web'))
+from workers import AnalysisPool, PoolBusyError  # noqa: E402
+
+
+def crash():
+    """Job whose worker process is killed, as the OOM killer would do"""
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def square(x):
+    return x * x
+
+
+def blocker(event):
+    """Job that runs until the event is set (threads share it)"""
+    event.wait(5)
+    return 'done'
+
+
+class ThreadAnalysisPool(AnalysisPool):
+    """Same bookkeeping, but on threads so jobs can share an Event"""
+    
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+
+def test_batch_uses_only_free_workers():
+    pool = ThreadAnalysisPool(max_workers=2, queue_limit=2)
+    release = threading.Event()
+    batch = pool.map_unordered(blocker, [(release,)] * 6)
+    
+    # Pull the first result in the background; meanwhile the batch holds at
+    # most max_workers slots and single requests still get the queue
+    results = []
+    consumer = threading.Thread(target=lambda: results.extend(batch))
+    consumer.start()
+    try:
+        threading.Event().wait(0.2)
+        assert pool.pending == 2
+        singles = [pool.submit(blocker, release) for _ in range(2)]
+        with pytest.raises(PoolBusyError):
+            pool.submit(blocker, release)
+    finally:
+        release.set()
+        consumer.join(5)
+        
+    assert results == ['done'] * 6
+    assert [future.result() for future in singles] == ['done'] * 2
+    pool.shutdown()
+
+
+def test_batch_rejected_when_pool_is_full():
+    pool = ThreadAnalysisPool(max_workers=1, queue_limit=1)
+    release = threading.Event()
+    try:
+        busy = [pool.submit(blocker, release) for _ in range(2)]
+        with pytest.raises(PoolBusyError):
+            list(pool.map_unordered(blocker, [(release,)] * 3))
+    finally:
+        release.set()
+    assert [future.result() for future in busy] == ['done'] * 2
+    pool.shutdown()
+
+
+def test_pool_recovers_after_a_worker_dies():
+    pool = AnalysisPool(max_workers=1, queue_limit=1)
+    try:
+        with pytest.raises(PoolBusyError):
+            asyncio.run(pool.run(crash))
+        assert asyncio.run(pool.run(square, 3)) == 9
+        assert list(pool.map_unordered(square, [(2,), (4,)])) in ([4, 16], [16, 4])
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
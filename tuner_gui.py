@@ -8,14 +8,49 @@ from tkinter import filedialog, messagebox
 from tkinter import ttk
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
+import math
 import os
 import sys
 import threading
-from audio_analyzer import analyze_audio
+import time
+from collections import deque
+from analysis_worker import AnalysisWorker
+from audio_analyzer import PitchTracker, get_tuning_status
 from live_recorder import LiveRecorder
 from custom_button import CustomButton
+from fft_cache import get_rfft_frequencies, get_window, rfft
+from spectrogram import SpectrogramTiles
+from note_frequencies import A4_FREQUENCY, format_note_name, get_note_from_frequency
+
+# Live tuner: analysis frame/hop (~43 pitch estimates per second at 44.1 kHz)
+# and display refresh period (~30 fps)
+LIVE_FRAME_SIZE = 4096
+LIVE_HOP_SIZE = 1024
+LIVE_REFRESH_MS = 33
+
+# Period of the analysis worker event polling
+ANALYSIS_POLL_MS = 50
+
+# Plots: waveform span, spectrum range and maximum refresh rate
+WAVEFORM_SPAN = 0.05  # 50 milliseconds
+WAVEFORM_LIMITS = (0.05, 0.1, 0.25, 0.5, 1.0)
+SPECTRUM_FRAME_SIZE = 4096
+SPECTRUM_MAX_FREQUENCY = 2000.0
+SPECTRUM_FLOOR_DB = -100.0
+PLOT_MAX_FPS = 30
+
+# Spectrogram window: frequency range, color scale and re-render delay
+# while zooming or panning
+SPECTROGRAM_MAX_FREQUENCY = 4000.0
+SPECTROGRAM_FLOOR_DB = -100.0
+SPECTROGRAM_RENDER_MS = 40
+
+# Cents needle geometry
+NEEDLE_WIDTH = 360
+NEEDLE_HEIGHT = 56
+NEEDLE_RANGE = 50
 
 
 def resource_path(relative_path):
@@ -29,22 +64,206 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+class PitchSmoother:
+    """
+    Smoothing and hysteresis for the live tuner display
+    
+    The pitch is smoothed in cents with an exponential moving average so the
+    needle does not jitter with every frame, while a jump of more than a
+    semitone (a new note) resets it instead of gliding across. The displayed
+    note only changes once the smoothed pitch is `hysteresis` cents past the
+    halfway point to a neighbour, and the last reading is held for
+    `hold_frames` frames without signal before the display clears.
+    """
+    
+    def __init__(self, reference=A4_FREQUENCY, temperament='equal', alpha=0.3,
+                 hysteresis=15.0, hold_frames=20):
+        """
+        Args:
+            reference (float): Frequency of A4 in Hz
+            temperament (str or sequence): Temperament for note naming
+            alpha (float): Weight of each new frame in the moving average
+            hysteresis (float): Cents past the note boundary before switching
+            hold_frames (int): Frames without signal before clearing
+        """
+        self.reference = reference
+        self.temperament = temperament
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.hold_frames = hold_frames
+        self.reset()
+    
+    def reset(self):
+        """Forget the current reading"""
+        self._pitch = None  # Smoothed pitch in cents from the reference
+        self._note = None
+        self._note_frequency = None
+        self._missing = 0
+    
+    def update(self, frame):
+        """
+        Add a PitchTracker frame
+        
+        Args:
+            frame (dict): Result of PitchTracker.process
+            
+        Returns:
+            dict: Reading to display (see current), or None without signal
+        """
+        if not frame['is_valid']:
+            self._missing += 1
+            if self._missing > self.hold_frames:
+                self.reset()
+            return self.current()
+        
+        self._missing = 0
+        pitch = 1200 * math.log2(frame['frequency'] / self.reference)
+        if self._pitch is None or abs(pitch - self._pitch) > 100:
+            self._pitch = pitch
+        else:
+            self._pitch += self.alpha * (pitch - self._pitch)
+        
+        frequency = self.reference * 2 ** (self._pitch / 1200)
+        if (self._note is None or
+                abs(1200 * math.log2(frequency / self._note_frequency)) > 50 + self.hysteresis):
+            self._note, self._note_frequency, _ = get_note_from_frequency(
+                frequency, self.reference, self.temperament
+            )
+        return self.current()
+    
+    def current(self):
+        """
+        Current reading
+        
+        Returns:
+            dict: 'note', 'frequency' (smoothed, Hz) and 'cents' from the
+                displayed note, or None without signal
+        """
+        if self._note is None:
+            return None
+        
+        frequency = self.reference * 2 ** (self._pitch / 1200)
+        return {
+            'note': self._note,
+            'frequency': frequency,
+            'cents': 1200 * math.log2(frequency / self._note_frequency),
+        }
+
+
+class SpectrogramWindow:
+    """
+    Zoomable spectrogram of a recording in its own window
+    
+    The image is rendered from a SpectrogramTiles cache: whenever the
+    visible time range changes (toolbar zoom or pan), only the tiles that
+    cover it at a resolution matching the plot width are fetched. Renders
+    are coalesced while dragging.
+    """
+    
+    def __init__(self, root, audio_data, sample_rate, title):
+        """
+        Args:
+            root: Parent Tk window
+            audio_data (numpy.array): Mono audio signal
+            sample_rate (int): Sample rate in Hz
+            title (str): Window title
+        """
+        self.tiles = SpectrogramTiles(audio_data, sample_rate, max_frequency=SPECTROGRAM_MAX_FREQUENCY)
+        self._pending_render = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("900x500")
+        self.window.configure(bg='#1a1a2e')
+        
+        self.figure = Figure(figsize=(9, 4.5), facecolor='#16213e')
+        self.ax = self.figure.add_subplot(111)
+        TunerGUI.style_axes(self.ax, 'Espectrograma', 'Tiempo (s)', 'Frecuencia (Hz)')
+        
+        duration = self.tiles.duration
+        self.image = self.ax.imshow(
+            np.zeros((1, 1), dtype=np.float32),
+            origin='lower',
+            aspect='auto',
+            cmap='magma',
+            interpolation='nearest',
+            vmin=SPECTROGRAM_FLOOR_DB,
+            vmax=0.0,
+            extent=(0, duration, 0, SPECTROGRAM_MAX_FREQUENCY)
+        )
+        self.ax.set_xlim(0, duration)
+        self.ax.set_ylim(0, self.tiles.frequencies[-1])
+        self.ax.set_autoscale_on(False)
+        
+        colorbar = self.figure.colorbar(self.image, ax=self.ax)
+        colorbar.set_label('dB', color='#a0a0a0')
+        colorbar.ax.tick_params(colors='#a0a0a0')
+        
+        self.canvas = FigureCanvasTkAgg(self.figure, self.window)
+        toolbar = NavigationToolbar2Tk(self.canvas, self.window)
+        toolbar.update()
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.render()
+    
+    def on_xlim_changed(self, ax):
+        """Schedule a render of the new time range"""
+        if self._pending_render is None:
+            self._pending_render = self.window.after(SPECTROGRAM_RENDER_MS, self.render)
+    
+    def render(self):
+        """Fetch the visible tiles and update the image"""
+        self._pending_render = None
+        
+        start, end = self.ax.get_xlim()
+        num_columns = max(1, int(self.ax.bbox.width))
+        times, frequencies, magnitudes = self.tiles.query(max(0.0, start), end, num_columns)
+        if len(times) == 0:
+            return
+        
+        # Each column spans one hop around its frame centre
+        step = times[1] - times[0] if len(times) > 1 else self.tiles.frame_size / self.tiles.sample_rate
+        self.image.set_data(magnitudes.T)
+        self.image.set_extent((times[0] - step / 2, times[-1] + step / 2, 0, frequencies[-1]))
+        self.canvas.draw_idle()
+    
+    def close(self):
+        if self.window.winfo_exists():
+            self.window.destroy()
+
+
 class TunerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Afinador de Instrumentos Musicales")
-        self.root.geometry("900x700")
+        self.root.geometry("900x760")
         self.root.configure(bg='#1a1a2e')
         
         # Current analysis result
         self.current_result = None
+        self.spectrogram_window = None
+        
+        # Background analysis: id of the job whose result will be displayed
+        self.worker = AnalysisWorker()
+        self.current_job = None
+        self._analysis_poll = None
         
         # Live recorder
         self.recorder = LiveRecorder()
         self.is_recording = False
         
+        # Live tuner: the capture thread appends tracker frames to a bounded
+        # deque (append/popleft are atomic, no lock) drained by the Tk loop
+        self.live_mode = False
+        self.live_thread = None
+        self.live_frames = deque(maxlen=256)
+        self.smoother = PitchSmoother()
+        self._live_display = None
+        
         # Setup UI
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_ui(self):
         """Create the user interface"""
@@ -117,6 +336,21 @@ class TunerGUI:
         )
         self.record_button.pack(side=tk.LEFT, padx=5)
         
+        self.live_button = CustomButton(
+            button_frame,
+            text="🎸 Afinador en Vivo",
+            command=self.toggle_live_tuner,
+            font=('Arial', 12, 'bold'),
+            bg='#8e44ad',
+            fg='#ffffff',
+            activebackground='#7d3c98',
+            activeforeground='#ffffff',
+            padx=20,
+            pady=10,
+            cursor='hand2'
+        )
+        self.live_button.pack(side=tk.LEFT, padx=5)
+        
         self.analyze_button = CustomButton(
             button_frame,
             text="🔍 Analizar",
@@ -133,6 +367,9 @@ class TunerGUI:
         )
         self.analyze_button.pack(side=tk.LEFT, padx=5)
         
+        # Progress of the background analysis (shown only while analyzing)
+        self.progress_bar = ttk.Progressbar(file_frame, length=400, mode='determinate', maximum=1.0)
+        
         # Results frame
         results_frame = tk.Frame(self.root, bg='#16213e', relief=tk.RAISED, borderwidth=2)
         results_frame.pack(pady=20, padx=40, fill=tk.BOTH)
@@ -156,6 +393,17 @@ class TunerGUI:
         )
         self.note_label.pack(pady=10)
         
+        # Cents needle (-50 to +50 cents)
+        self.needle_canvas = tk.Canvas(
+            results_frame,
+            width=NEEDLE_WIDTH,
+            height=NEEDLE_HEIGHT,
+            bg='#16213e',
+            highlightthickness=0
+        )
+        self.needle_canvas.pack()
+        self.draw_needle_scale()
+        
         # Frequency and deviation
         info_frame = tk.Frame(results_frame, bg='#16213e')
         info_frame.pack(pady=10)
@@ -191,19 +439,58 @@ class TunerGUI:
         viz_frame = tk.Frame(self.root, bg='#1a1a2e')
         viz_frame.pack(pady=10, padx=40, fill=tk.BOTH, expand=True)
         
-        # Create matplotlib figure for waveform
+        self.spectrogram_button = CustomButton(
+            viz_frame,
+            text="📊 Espectrograma",
+            command=self.show_spectrogram,
+            font=('Arial', 10, 'bold'),
+            bg='#4a90e2',
+            fg='#ffffff',
+            activebackground='#357abd',
+            activeforeground='#ffffff',
+            padx=10,
+            pady=4,
+            cursor='hand2',
+            state=tk.DISABLED
+        )
+        self.spectrogram_button.pack(anchor=tk.E, pady=(0, 5))
+        
+        # Create matplotlib figure for the waveform and the spectrum. The axes
+        # are styled once; new data only updates persistent animated artists,
+        # which are blitted over a cached background (see redraw_plots)
         self.figure = Figure(figsize=(8, 2.5), facecolor='#16213e')
-        self.ax = self.figure.add_subplot(111)
-        self.ax.set_facecolor('#1a1a2e')
-        self.ax.set_title('Forma de Onda del Audio', color='#00d4ff', fontsize=12)
-        self.ax.set_xlabel('Tiempo (s)', color='#a0a0a0')
-        self.ax.set_ylabel('Amplitud', color='#a0a0a0')
-        self.ax.tick_params(colors='#a0a0a0')
-        self.ax.grid(True, alpha=0.2, color='#00d4ff')
+        self.ax, self.spectrum_ax = self.figure.subplots(1, 2, gridspec_kw={'width_ratios': (3, 2)})
+        self.style_axes(self.ax, 'Forma de Onda del Audio (50ms)', 'Tiempo (s)', 'Amplitud')
+        self.style_axes(self.spectrum_ax, 'Espectro', 'Frecuencia (Hz)', 'dB')
+        self.ax.set_xlim(0, WAVEFORM_SPAN)
+        self.ax.set_ylim(-1.0, 1.0)
+        self.spectrum_ax.set_xlim(0, SPECTRUM_MAX_FREQUENCY)
+        self.spectrum_ax.set_ylim(SPECTRUM_FLOOR_DB, 0)
+        self.figure.subplots_adjust(left=0.08, right=0.98, bottom=0.2, top=0.86, wspace=0.25)
+        
+        self.wave_line, = self.ax.plot([], [], color='#00d4ff', linewidth=1.5, animated=True)
+        self.wave_info = self.ax.text(0.98, 0.95, '',
+                                      transform=self.ax.transAxes,
+                                      ha='right', va='top',
+                                      color='#a0a0a0',
+                                      fontsize=8,
+                                      bbox=dict(boxstyle='round', facecolor='#16213e', alpha=0.8, edgecolor='none'),
+                                      animated=True)
+        self.spectrum_line, = self.spectrum_ax.plot([], [], color='#16c79a', linewidth=1, animated=True)
+        self.peak_marker = self.spectrum_ax.axvline(0, color='#ff6b6b', linewidth=1, linestyle='--',
+                                                    visible=False, animated=True)
+        self.animated_artists = (self.wave_line, self.wave_info, self.spectrum_line, self.peak_marker)
         
         self.canvas = FigureCanvasTkAgg(self.figure, viz_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
+        # Blitting state: the background is recaptured after every full draw
+        # (first show, resize, new axis limits)
+        self._plot_background = None
+        self._last_redraw = 0.0
+        self._redraw_pending = False
+        self.canvas.mpl_connect('draw_event', self.on_plot_draw)
+        
         # Footer
         footer_label = tk.Label(
             self.root,
@@ -226,36 +513,76 @@ class TunerGUI:
         
         if file_path:
             self.current_file = file_path
+            self.current_samples = None
             filename = os.path.basename(file_path)
             self.file_label.config(text=f"Archivo: {filename}")
             self.analyze_button.config(state=tk.NORMAL)
             
-            # Clear previous results
+            # Clear previous results (and drop an analysis still running)
+            self.cancel_analysis()
             self.clear_results()
     
     def analyze_file(self):
-        """Analyze the selected audio file"""
-        if not hasattr(self, 'current_file'):
+        """Analyze the selected audio file in the background"""
+        samples = getattr(self, 'current_samples', None)
+        if samples is None and not hasattr(self, 'current_file'):
             messagebox.showerror("Error", "Por favor selecciona un archivo primero")
             return
         
         # Show processing message
         self.note_label.config(text="⏳", fg='#ffaa00')
-        self.root.update()
+        self.progress_bar['value'] = 0.0
+        self.progress_bar.pack(pady=(10, 0))
         
-        try:
-            # Analyze audio
-            result = analyze_audio(self.current_file)
+        # Submitting supersedes any job still running (live recordings are
+        # kept in memory)
+        if samples is not None:
+            self.current_job = self.worker.submit_signal(*samples)
+        else:
+            self.current_job = self.worker.submit_file(self.current_file)
+        
+        if self._analysis_poll is None:
+            self._analysis_poll = self.root.after(ANALYSIS_POLL_MS, self.poll_analysis)
+    
+    def cancel_analysis(self):
+        """Drop the running analysis, if any"""
+        if self.current_job is not None:
+            self.worker.cancel(self.current_job)
+            self.current_job = None
+            self.progress_bar.pack_forget()
+        
+        if self._analysis_poll is not None:
+            self.root.after_cancel(self._analysis_poll)
+            self._analysis_poll = None
+    
+    def poll_analysis(self):
+        """Tk loop: drain the worker events of the current job"""
+        self._analysis_poll = None
+        
+        while not self.worker.events.empty():
+            kind, job_id, value = self.worker.events.get()
+            if job_id != self.current_job:
+                continue  # Superseded job
             
-            if result['success']:
-                self.current_result = result
-                self.display_results(result)
+            if kind == 'progress':
+                self.progress_bar['value'] = value
             else:
-                messagebox.showerror("Error de Análisis", f"Error: {result['error']}")
-                self.clear_results()
+                self.current_job = None
+                self.progress_bar.pack_forget()
+                self.show_analysis_result(value)
+                return
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al analizar el archivo: {str(e)}")
+        self._analysis_poll = self.root.after(ANALYSIS_POLL_MS, self.poll_analysis)
+    
+    def show_analysis_result(self, result):
+        """Display a finished analysis or report its error"""
+        if result['success']:
+            self.current_result = result
+            self.display_results(result)
+            if result['audio_data'] is not None:
+                self.spectrogram_button.config(state=tk.NORMAL)
+        else:
+            messagebox.showerror("Error de Análisis", f"Error: {result['error']}")
             self.clear_results()
     
     def display_results(self, result):
@@ -276,6 +603,7 @@ class TunerGUI:
                 text="⚠️ Señal muy débil o solo ruido",
                 fg='#ff4757'
             )
+            self.update_needle(None, None)
             
             # Still plot the waveform to show what was captured
             self.plot_waveform(result['audio_data'], result['sample_rate'])
@@ -294,62 +622,179 @@ class TunerGUI:
         cents = result['cents']
         cents_text = f"Desviación: {cents:+.1f} cents"
         
-        if abs(cents) < 10:
-            cents_color = '#16c79a'  # Green - in tune
-        elif abs(cents) < 30:
-            cents_color = '#ffaa00'  # Orange - slightly off
-        else:
-            cents_color = '#ff4757'  # Red - out of tune
+        cents_color = self.cents_color(cents)
         
         self.cents_label.config(text=cents_text, fg=cents_color)
+        self.update_needle(cents, cents_color)
         
         # Display tuning status
-        self.status_label.config(text=result['tuning_status'])
+        self.status_label.config(text=result['tuning_status'], fg=self.status_color(result['tuning_status']))
         
-        if "✓" in result['tuning_status']:
-            self.status_label.config(fg='#16c79a')
-        elif "Agudo" in result['tuning_status']:
-            self.status_label.config(fg='#ffaa00')
-        else:
-            self.status_label.config(fg='#ff4757')
+        # Plot waveform and spectrum
+        self.plot_waveform(result['audio_data'], result['sample_rate'], result['frequency'])
+    
+    @staticmethod
+    def cents_color(cents):
+        """Color for a deviation: green in tune, orange slightly off, red out of tune"""
+        if abs(cents) < 10:
+            return '#16c79a'
+        elif abs(cents) < 30:
+            return '#ffaa00'
+        return '#ff4757'
+    
+    @staticmethod
+    def status_color(status):
+        """Color for a tuning status message"""
+        if "✓" in status:
+            return '#16c79a'
+        elif "Agudo" in status:
+            return '#ffaa00'
+        return '#ff4757'
+    
+    def draw_needle_scale(self):
+        """Draw the static scale of the cents needle and create the needle"""
+        center = NEEDLE_WIDTH / 2
+        half = NEEDLE_WIDTH / 2 - 20
         
-        # Plot waveform
-        self.plot_waveform(result['audio_data'], result['sample_rate'])
+        self.needle_canvas.create_rectangle(
+            center - half * 10 / NEEDLE_RANGE, 14, center + half * 10 / NEEDLE_RANGE, NEEDLE_HEIGHT - 14,
+            fill='#1e4d3a', outline=''
+        )
+        self.needle_canvas.create_line(center - half, NEEDLE_HEIGHT / 2, center + half, NEEDLE_HEIGHT / 2,
+                                       fill='#606060')
+        for cents in range(-NEEDLE_RANGE, NEEDLE_RANGE + 1, 10):
+            x = center + half * cents / NEEDLE_RANGE
+            tick = 10 if cents % 50 == 0 else 5
+            self.needle_canvas.create_line(x, NEEDLE_HEIGHT / 2 - tick, x, NEEDLE_HEIGHT / 2 + tick,
+                                           fill='#a0a0a0')
+        self.needle_canvas.create_text(center - half, 6, text="-50", fill='#a0a0a0', font=('Arial', 8))
+        self.needle_canvas.create_text(center + half, 6, text="+50", fill='#a0a0a0', font=('Arial', 8))
+        
+        self.needle = self.needle_canvas.create_line(center, 4, center, NEEDLE_HEIGHT - 4,
+                                                     width=3, fill='#606060', state=tk.HIDDEN)
     
-    def plot_waveform(self, audio_data, sample_rate):
-        """Plot audio waveform"""
-        self.ax.clear()
+    def update_needle(self, cents, color):
+        """
+        Move the needle (only its coordinates change, the scale is not redrawn)
         
-        # Create time axis
+        Args:
+            cents (float): Deviation in cents, or None to hide the needle
+            color (str): Needle color
+        """
+        if cents is None:
+            self.needle_canvas.itemconfigure(self.needle, state=tk.HIDDEN)
+            return
+        
+        half = NEEDLE_WIDTH / 2 - 20
+        x = NEEDLE_WIDTH / 2 + half * max(-NEEDLE_RANGE, min(NEEDLE_RANGE, cents)) / NEEDLE_RANGE
+        self.needle_canvas.coords(self.needle, x, 4, x, NEEDLE_HEIGHT - 4)
+        self.needle_canvas.itemconfigure(self.needle, fill=color, state=tk.NORMAL)
+    
+    @staticmethod
+    def style_axes(ax, title, xlabel, ylabel):
+        """Apply the dark theme to a plot"""
+        ax.set_facecolor('#1a1a2e')
+        ax.set_title(title, color='#00d4ff', fontsize=12)
+        ax.set_xlabel(xlabel, color='#a0a0a0')
+        ax.set_ylabel(ylabel, color='#a0a0a0')
+        ax.tick_params(colors='#a0a0a0')
+        ax.grid(True, alpha=0.2, color='#00d4ff')
+    
+    def plot_waveform(self, audio_data, sample_rate, frequency=None):
+        """
+        Plot the start of a recording and the spectrum of its middle
+        
+        Args:
+            audio_data (numpy.array): Mono audio signal
+            sample_rate (int): Sample rate in Hz
+            frequency (float): Detected frequency to mark on the spectrum
+        """
         duration = len(audio_data) / sample_rate
         
         # Show only first 0.05 seconds to see actual wave oscillations
         # This makes the sine waves visible instead of a solid block
-        display_duration = min(0.05, duration)  # 50 milliseconds
-        num_samples_to_show = int(display_duration * sample_rate)
-        
-        audio_to_plot = audio_data[:num_samples_to_show]
-        time = np.linspace(0, display_duration, num_samples_to_show)
-        
-        # Plot waveform
-        self.ax.plot(time, audio_to_plot, color='#00d4ff', linewidth=1.5)
-        self.ax.set_facecolor('#1a1a2e')
-        self.ax.set_title('Forma de Onda del Audio (primeros 50ms)', color='#00d4ff', fontsize=12)
-        self.ax.set_xlabel('Tiempo (s)', color='#a0a0a0')
-        self.ax.set_ylabel('Amplitud', color='#a0a0a0')
-        self.ax.tick_params(colors='#a0a0a0')
-        self.ax.grid(True, alpha=0.2, color='#00d4ff')
-        
-        # Add note about what we're showing
-        self.ax.text(0.98, 0.95, f'Mostrando {display_duration*1000:.0f}ms de {duration:.2f}s totales',
-                    transform=self.ax.transAxes,
-                    ha='right', va='top',
-                    color='#a0a0a0',
-                    fontsize=8,
-                    bbox=dict(boxstyle='round', facecolor='#16213e', alpha=0.8, edgecolor='none'))
-        
-        # Update canvas
-        self.canvas.draw()
+        display_duration = min(WAVEFORM_SPAN, duration)
+        
+        # Spectrum of the middle of the recording, where the note is stable
+        start = max(0, len(audio_data) // 2 - SPECTRUM_FRAME_SIZE // 2)
+        
+        self.set_plot_data(
+            audio_data[:int(display_duration * sample_rate)],
+            audio_data[start:start + SPECTRUM_FRAME_SIZE],
+            sample_rate,
+            frequency,
+            f'Mostrando {display_duration*1000:.0f}ms de {duration:.2f}s totales'
+        )
+    
+    def set_plot_data(self, waveform, frame, sample_rate, frequency, info):
+        """
+        Update the animated artists and schedule a redraw
+        
+        Args:
+            waveform (numpy.array): Samples to draw (at most WAVEFORM_SPAN)
+            frame (numpy.array): Samples whose spectrum is drawn
+            sample_rate (int): Sample rate in Hz
+            frequency (float): Frequency to mark on the spectrum, or None
+            info (str): Caption of the waveform
+        """
+        self.wave_line.set_data(np.arange(len(waveform)) / sample_rate, waveform)
+        self.wave_info.set_text(info)
+        
+        # Symmetric amplitude range from a few fixed steps, so the axes (and
+        # the cached background) only change when the level changes a lot
+        peak = float(np.max(np.abs(waveform))) if len(waveform) else 0.0
+        limit = next((step for step in WAVEFORM_LIMITS if peak <= step), WAVEFORM_LIMITS[-1])
+        if self.ax.get_ylim()[1] != limit:
+            self.ax.set_ylim(-limit, limit)
+            self._plot_background = None
+        
+        if len(frame):
+            window = get_window('hanning', len(frame))
+            magnitude = np.abs(rfft(frame * window)) * (2.0 / np.sum(window))
+            frequencies = get_rfft_frequencies(len(frame), sample_rate)
+            keep = frequencies <= SPECTRUM_MAX_FREQUENCY
+            self.spectrum_line.set_data(frequencies[keep], 20 * np.log10(np.maximum(magnitude[keep], 1e-10)))
+        else:
+            self.spectrum_line.set_data([], [])
+        
+        if frequency:
+            self.peak_marker.set_xdata([frequency, frequency])
+        self.peak_marker.set_visible(bool(frequency))
+        
+        self.redraw_plots()
+    
+    def on_plot_draw(self, event):
+        """After a full draw: cache the background and paint the animated artists"""
+        self._plot_background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self.animated_artists:
+            self.figure.draw_artist(artist)
+    
+    def redraw_plots(self):
+        """Blit the animated artists over the cached background (at most PLOT_MAX_FPS per second)"""
+        if self._redraw_pending:
+            return
+        
+        wait = self._last_redraw + 1.0 / PLOT_MAX_FPS - time.monotonic()
+        if wait > 0:
+            # Too soon: coalesce every update until then into one redraw
+            self._redraw_pending = True
+            self.root.after(int(wait * 1000) + 1, self._deferred_redraw)
+            return
+        
+        self._last_redraw = time.monotonic()
+        if self._plot_background is None:
+            # Full draw; on_plot_draw captures the new background
+            self.canvas.draw()
+            return
+        
+        self.canvas.restore_region(self._plot_background)
+        for artist in self.animated_artists:
+            self.figure.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+    
+    def _deferred_redraw(self):
+        self._redraw_pending = False
+        self.redraw_plots()
     
     def clear_results(self):
         """Clear all results"""
@@ -357,16 +802,12 @@ class TunerGUI:
         self.freq_label.config(text="Frecuencia: -- Hz")
         self.cents_label.config(text="Desviación: -- cents", fg='#a0a0a0')
         self.status_label.config(text="")
+        self.update_needle(None, None)
+        self.spectrogram_button.config(state=tk.DISABLED)
         
         # Clear plot
-        self.ax.clear()
-        self.ax.set_facecolor('#1a1a2e')
-        self.ax.set_title('Forma de Onda del Audio', color='#00d4ff', fontsize=12)
-        self.ax.set_xlabel('Tiempo (s)', color='#a0a0a0')
-        self.ax.set_ylabel('Amplitud', color='#a0a0a0')
-        self.ax.tick_params(colors='#a0a0a0')
-        self.ax.grid(True, alpha=0.2, color='#00d4ff')
-        self.canvas.draw()
+        empty = np.zeros(0, dtype=np.float32)
+        self.set_plot_data(empty, empty, 1, None, '')
     
     def start_live_recording(self):
         """Start live audio recording"""
@@ -374,6 +815,9 @@ class TunerGUI:
             messagebox.showwarning("Grabando", "Ya hay una grabación en proceso")
             return
         
+        if self.live_mode:
+            self.stop_live_tuner()
+        
         # Test microphone first
         if not self.recorder.test_microphone():
             messagebox.showerror(
@@ -453,28 +897,173 @@ class TunerGUI:
         self.is_recording = True
         
         try:
-            # Record audio (3 seconds)
-            output_file = self.recorder.record(duration=3.0)
-            
-            # Close countdown dialog
-            dialog.destroy()
+            # Record audio (3 seconds) straight into memory, no temp WAV
+            samples = self.recorder.capture(duration=3.0)
             
-            # Set as current file and analyze
-            self.current_file = output_file
-            self.file_label.config(text=f"Archivo: Grabación en vivo")
-            
-            # Analyze automatically
-            self.root.after(100, self.analyze_file)
+            # Tk is not thread-safe: hand the samples to the main loop
+            self.root.after(0, lambda: self.finish_recording(dialog, samples))
             
         except Exception as e:
-            dialog.destroy()
-            messagebox.showerror(
-                "Error de Grabación",
-                f"No se pudo grabar el audio:\n{str(e)}"
-            )
+            error = str(e)
+            self.root.after(0, lambda: self.recording_failed(dialog, error))
         
         finally:
             self.is_recording = False
+    
+    def finish_recording(self, dialog, samples):
+        """Close the countdown dialog and analyze a live recording"""
+        dialog.destroy()
+        
+        # Set as current recording and analyze
+        self.current_samples = samples
+        self.file_label.config(text="Archivo: Grabación en vivo")
+        self.analyze_button.config(state=tk.NORMAL)
+        
+        # Analyze automatically
+        self.root.after(100, self.analyze_file)
+    
+    def recording_failed(self, dialog, error):
+        """Close the countdown dialog and report a recording error"""
+        dialog.destroy()
+        messagebox.showerror(
+            "Error de Grabación",
+            f"No se pudo grabar el audio:\n{error}"
+        )
+
+    
+    def toggle_live_tuner(self):
+        """Start or stop the continuous live tuner"""
+        if self.live_mode:
+            self.stop_live_tuner()
+        else:
+            self.start_live_tuner()
+    
+    def start_live_tuner(self):
+        """Start capturing and tracking the pitch continuously"""
+        if self.is_recording:
+            messagebox.showwarning("Grabando", "Ya hay una grabación en proceso")
+            return
+        
+        try:
+            self.recorder.start_stream()
+        except Exception as e:
+            messagebox.showerror("Error de Micrófono", f"No se puede acceder al micrófono:\n{str(e)}")
+            return
+        
+        self.cancel_analysis()
+        self.live_mode = True
+        self.live_frames.clear()
+        self.smoother.reset()
+        self._live_display = None
+        
+        self.clear_results()
+        self.file_label.config(text="Afinador en vivo: toca una nota")
+        self.live_button.config(text="⏹ Detener Afinador")
+        
+        self.live_thread = threading.Thread(target=self.live_capture_loop, daemon=True)
+        self.live_thread.start()
+        self.root.after(LIVE_REFRESH_MS, self.poll_live_tuner)
+    
+    def stop_live_tuner(self):
+        """Stop the live tuner (the capture thread ends with the stream)"""
+        self.live_mode = False
+        self.recorder.stop_stream()
+        self.live_button.config(text="🎸 Afinador en Vivo")
+        self.file_label.config(text="Afinador en vivo detenido")
+    
+    def live_capture_loop(self):
+        """Capture thread: feed microphone blocks to a streaming pitch tracker"""
+        tracker = PitchTracker(self.recorder.sample_rate, LIVE_FRAME_SIZE, LIVE_HOP_SIZE)
+        
+        for block in self.recorder.iter_blocks(LIVE_HOP_SIZE):
+            if not self.live_mode:
+                break
+            self.live_frames.extend(tracker.process(block))
+    
+    def poll_live_tuner(self):
+        """Tk loop: drain the frame queue and refresh the display"""
+        if not self.live_mode:
+            return
+        
+        reading = self.smoother.current()
+        while self.live_frames:
+            reading = self.smoother.update(self.live_frames.popleft())
+        self.show_live_reading(reading)
+        self.plot_live(reading)
+        
+        if not self.live_thread.is_alive():
+            # The microphone stopped sending audio
+            self.stop_live_tuner()
+            self.status_label.config(text="⚠️ Se perdió la señal del micrófono", fg='#ff4757')
+            return
+        
+        self.root.after(LIVE_REFRESH_MS, self.poll_live_tuner)
+    
+    def plot_live(self, reading):
+        """Plot the latest captured samples and their spectrum"""
+        sample_rate = self.recorder.sample_rate
+        frame = self.recorder.get_latest(SPECTRUM_FRAME_SIZE)
+        if len(frame) < SPECTRUM_FRAME_SIZE:
+            return
+        
+        self.set_plot_data(
+            frame[-int(WAVEFORM_SPAN * sample_rate):],
+            frame,
+            sample_rate,
+            reading['frequency'] if reading else None,
+            'En vivo'
+        )
+    
+    def show_live_reading(self, reading):
+        """Update the labels and needle, touching Tk only when something changed"""
+        if reading is None:
+            display = None
+        else:
+            display = (reading['note'], round(reading['frequency'], 1), round(reading['cents'], 1))
+        
+        if display == self._live_display:
+            return
+        self._live_display = display
+        
+        if display is None:
+            self.note_label.config(text="🔇", fg='#a0a0a0')
+            self.freq_label.config(text="Frecuencia: -- Hz")
+            self.cents_label.config(text="Desviación: -- cents", fg='#a0a0a0')
+            self.status_label.config(text="")
+            self.update_needle(None, None)
+            return
+        
+        note, frequency, cents = display
+        color = self.cents_color(cents)
+        status = get_tuning_status(cents)
+        
+        self.note_label.config(text=format_note_name(note), fg='#00d4ff')
+        self.freq_label.config(text=f"Frecuencia detectada: {frequency:.1f} Hz")
+        self.cents_label.config(text=f"Desviación: {cents:+.1f} cents", fg=color)
+        self.status_label.config(text=status, fg=self.status_color(status))
+        self.update_needle(cents, color)
+    
+    def show_spectrogram(self):
+        """Open the spectrogram of the current result (replacing an open one)"""
+        if self.current_result is None or self.current_result['audio_data'] is None:
+            return
+        
+        if self.spectrogram_window is not None:
+            self.spectrogram_window.close()
+        
+        self.spectrogram_window = SpectrogramWindow(
+            self.root,
+            self.current_result['audio_data'],
+            self.current_result['sample_rate'],
+            f"Espectrograma - {self.file_label.cget('text')}"
+        )
+    
+    def on_close(self):
+        """Release the microphone before closing the window"""
+        self.live_mode = False
+        self.recorder.stop_stream()
+        self.worker.shutdown()
+        self.root.destroy()
 
 
 def main():
@@ -3,24 +3,391 @@ Afinador Musical - Flask Web Application
 Servidor web para análisis de audio de instrumentos musicales
 """
 
-from flask import Flask, render_template, request, jsonify
-from werkzeug.utils import secure_filename
-import os
-import tempfile
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask_sock import Sock
 import base64
-from audio_analyzer import analyze_audio
+import itertools
+import json
+import os
+import tarfile
+import zipfile
+from audio_analyzer import PitchTracker, analyze_audio, analyze_signal, get_tuning_status
+from note_frequencies import A4_FREQUENCY, TEMPERAMENTS, format_note_name
 import numpy as np
+from decimation import WaveformPyramid
+from result_cache import ResultCache, hash_audio_source
+from workers import AnalysisPool, PoolBusyError, env_int
+
+try:
+    # Opcional: codificación JSON más rápida (y sin conversiones de numpy)
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(obj):
+    """Codificar obj como JSON (bytes) con orjson si está instalado"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON de Flask (jsonify) con orjson si está instalado"""
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps_json(obj).decode()
+    
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_json(obj), mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+sock = Sock(app)
+pool = AnalysisPool()
+
+# Caché de resultados por contenido: en memoria y, si RESULT_CACHE_PATH está
+# definido, también en un archivo sqlite compartido entre procesos
+result_cache = ResultCache(
+    max_entries=env_int('RESULT_CACHE_ENTRIES', 256),
+    path=os.environ.get('RESULT_CACHE_PATH') or None,
+    ttl=env_int('RESULT_CACHE_TTL', 0) or None,
+)
+
+# Pirámides de forma de onda por archivo (audio_id = hash del contenido) para
+# servir el zoom sin volver a decodificar
+waveform_cache = ResultCache(max_entries=env_int('WAVEFORM_CACHE_ENTRIES', 64))
 
 ALLOWED_EXTENSIONS = {'wav'}
 
+# Formatos de PCM crudo aceptados por /analyze-live (little-endian)
+PCM_FORMATS = {
+    'int16': np.dtype('<i2'),
+    'float32': np.dtype('<f4'),
+}
+
+# Afinador en tiempo real: tramas de ~85 ms a 48 kHz con un salto de 1024
+# muestras, es decir ~45 actualizaciones por segundo
+STREAM_FRAME_SIZE = 4096
+STREAM_HOP_SIZE = 1024
+
+# Lotes de /analyze-batch: tamaño total de la petición y número de archivos
+BATCH_MAX_CONTENT_LENGTH = env_int('BATCH_MAX_CONTENT_LENGTH', 512 * 1024 * 1024)
+BATCH_MAX_FILES = env_int('BATCH_MAX_FILES', 1000)
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# Puntos de la envolvente de la forma de onda (por defecto y máximo)
+WAVEFORM_POINTS = 800  # Ancho del canvas de la página
+MAX_WAVEFORM_POINTS = 4000
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def get_tuning_params(params):
+    """
+    Leer la afinación de referencia (La4 en Hz) y el temperamento de la petición
+    
+    Raises:
+        ValueError: Si la referencia o el temperamento no son válidos
+    """
+    reference = float(params.get('reference') or A4_FREQUENCY)
+    if not 300 <= reference <= 500:
+        raise ValueError('La frecuencia de referencia debe estar entre 300 y 500 Hz')
+    
+    temperament = params.get('temperament') or 'equal'
+    if temperament not in TEMPERAMENTS:
+        raise ValueError(f'Temperamento desconocido: {temperament}')
+    
+    return reference, temperament
+
+
+def get_chord_param(params):
+    """Leer si se piden las notas simultáneas ('chord': '1', 'true' u 'on')"""
+    return (params.get('chord') or '').lower() in ('1', 'true', 'on')
+
+
+def pcm_to_float(data, dtype, normalize=False):
+    """
+    Convertir PCM mono crudo en muestras float32
+    
+    Los enteros se escalan a [-1, 1) por su fondo de escala. Con normalize,
+    la señal se normaliza además a su pico, como load_audio; solo tiene
+    sentido para una grabación completa, no para bloques sueltos de un
+    stream (un bloque de silencio subiría a fondo de escala).
+    
+    Args:
+        data (bytes): Muestras PCM
+        dtype (numpy.dtype): Formato de las muestras (ver PCM_FORMATS)
+        normalize (bool): Normalizar al pico
+        
+    Returns:
+        numpy.array: Muestras float32
+        
+    Raises:
+        ValueError: Si los datos no son un número entero de muestras
+    """
+    if len(data) % dtype.itemsize:
+        raise ValueError('Los datos de audio están truncados')
+    
+    # La única copia es la conversión a float32; np.frombuffer no copia
+    samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+    if dtype.kind == 'i':
+        samples *= 1.0 / (1 << (8 * dtype.itemsize - 1))
+    
+    if normalize:
+        # El pico se toma ya en float32: en int16, np.abs(-32768) desborda
+        # y vuelve a ser -32768
+        peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+        if peak > 0:
+            samples *= 1.0 / peak
+    
+    return samples
+
+
+def decode_pcm(body, params, headers):
+    """
+    Interpretar un cuerpo application/octet-stream como PCM mono crudo
+    
+    La frecuencia de muestreo llega en el parámetro 'sample_rate' o en la
+    cabecera X-Sample-Rate, y el formato en 'format' ('int16' o 'float32').
+    Las muestras se convierten con pcm_to_float y se normalizan al pico
+    (igual que al cargar un WAV).
+    
+    Returns:
+        tuple: (audio_data, sample_rate)
+        
+    Raises:
+        ValueError: Si falta la frecuencia de muestreo, el formato no es
+            válido o los datos están truncados
+    """
+    sample_rate = int(params.get('sample_rate') or headers.get('X-Sample-Rate') or 0)
+    if not 8000 <= sample_rate <= 192000:
+        raise ValueError('Frecuencia de muestreo no válida')
+    
+    sample_format = params.get('format') or 'int16'
+    if sample_format not in PCM_FORMATS:
+        raise ValueError(f'Formato de audio desconocido: {sample_format}')
+    
+    return pcm_to_float(body, PCM_FORMATS[sample_format], normalize=True), sample_rate
+
+
+def get_stream_params(config):
+    """
+    Leer la configuración inicial de una conexión /ws/tuner
+    
+    Returns:
+        tuple: (sample_rate, dtype, reference, temperament)
+        
+    Raises:
+        ValueError: Si algún parámetro no es válido
+    """
+    reference, temperament = get_tuning_params(config)
+    
+    sample_rate = int(config.get('sample_rate') or 0)
+    if not 8000 <= sample_rate <= 192000:
+        raise ValueError('Frecuencia de muestreo no válida')
+    
+    sample_format = config.get('format') or 'int16'
+    if sample_format not in PCM_FORMATS:
+        raise ValueError(f'Formato de audio desconocido: {sample_format}')
+    
+    return sample_rate, PCM_FORMATS[sample_format], reference, temperament
+
+
+def format_result(result):
+    """
+    Preparar la respuesta JSON de un análisis
+    
+    Los valores de AnalysisResult ya son tipos de Python, así que no hace
+    falta convertir cada campo.
+    
+    Args:
+        result (AnalysisResult): Resultado de analyze_audio / analyze_signal
+        
+    Returns:
+        tuple: (response, status_code)
+    """
+    if not result.success:
+        return {'success': False, 'error': result.error}, 500
+    
+    response = {
+        'success': True,
+        'note': result.note_formatted,
+        'frequency': result.frequency,
+        'exact_frequency': result.exact_frequency,
+        'cents': result.cents,
+        'tuning_status': result.tuning_status,
+        'has_valid_signal': result.has_valid_signal,
+        'signal_strength': result.signal_strength
+    }
+    
+    if result.chord is not None:
+        response['chord'] = result.chord
+    
+    return response, 200
+
+
+def stream_update(tracker, message, dtype):
+    """
+    Pasar un bloque binario de PCM al tracker de una conexión en tiempo real
+    
+    Se decodifica como en decode_pcm pero sin normalizar al pico: cada
+    bloque es un trozo del stream y el umbral de silencio del tracker
+    necesita la escala absoluta.
+    
+    Returns:
+        dict: Mensaje para el navegador con la trama más reciente, o None si
+            el bloque no completó ninguna trama
+    """
+    try:
+        samples = pcm_to_float(message, dtype)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    
+    frames = tracker.process(samples)
+    if not frames:
+        return None
+    
+    # Solo interesa la trama más reciente
+    frame = frames[-1]
+    update = {
+        'success': True,
+        'time': frame['time'],
+        'has_valid_signal': frame['is_valid'],
+        'signal_strength': frame['rms']
+    }
+    if frame['is_valid']:
+        update.update({
+            'note': format_note_name(frame['note']),
+            'frequency': frame['frequency'],
+            'exact_frequency': frame['frequency'] / 2 ** (frame['cents'] / 1200),
+            'cents': frame['cents'],
+            'tuning_status': get_tuning_status(frame['cents'])
+        })
+    return update
+
+
+def analyze_file_job(data, reference, temperament, audio_id=None, chord=False):
+    """
+    Analizar un archivo de audio codificado, con su forma de onda
+    
+    Se usa directamente en /analyze y, a través de analyze_upload_job (que
+    no devuelve la pirámide), como trabajo del pool en asgi.py.
+    
+    Returns:
+        tuple: (response, status_code, pyramid) donde pyramid es la
+            WaveformPyramid de la señal (None si el análisis falló) para
+            guardarla en waveform_cache bajo audio_id
+    """
+    result = analyze_audio(data, reference=reference, temperament=temperament, chord=chord)
+    response, status = format_result(result)
+    
+    pyramid = None
+    if status == 200 and result.audio_data is not None:
+        # Envolvente mín/máx/RMS por píxel (sin perder picos) en float32 base64
+        pyramid = WaveformPyramid(result.audio_data, result.sample_rate)
+        response['waveform'] = {'audio_id': audio_id, **pyramid.encode(num_points=WAVEFORM_POINTS)}
+    
+    return response, status, pyramid
+
+
+def analyze_batch_job(name, data, reference, temperament):
+    """Trabajo del pool: analizar un archivo de un lote (sin forma de onda)"""
+    if not allowed_file(name):
+        response = {'success': False, 'error': 'Solo se permiten archivos WAV'}
+    elif data is None:
+        response = {'success': False, 'error': 'Archivo demasiado grande'}
+    else:
+        result = analyze_audio(data, reference=reference, temperament=temperament, summary_only=True)
+        response, _ = format_result(result)
+    
+    return {'file': name, **response}
+
+
+def iter_batch_files(uploads):
+    """
+    Recorrer los archivos de un lote, expandiendo los .zip / .tar
+    
+    Los miembros de un archivo comprimido se leen uno a uno (en memoria, sin
+    extraerlos a disco) y se omiten los que no son WAV. Como mucho se
+    devuelven BATCH_MAX_FILES archivos.
+    
+    Args:
+        uploads (list): Pares (nombre, objeto tipo archivo) de la petición
+        
+    Returns:
+        iterator: Pares (nombre, bytes); bytes es None si el archivo supera
+            el tamaño máximo
+    """
+    return itertools.islice(_iter_uploads(uploads), BATCH_MAX_FILES)
+
+
+def _iter_uploads(uploads):
+    for filename, stream in uploads:
+        lower = filename.lower()
+        
+        if lower.endswith('.zip'):
+            with zipfile.ZipFile(stream) as archive:
+                members = ((info.filename, info.file_size, lambda info=info: archive.read(info))
+                           for info in archive.infolist() if not info.is_dir())
+                yield from _read_members(members)
+        elif lower.endswith(ARCHIVE_EXTENSIONS):
+            with tarfile.open(fileobj=stream, mode='r:*') as archive:
+                members = ((info.name, info.size, lambda info=info: archive.extractfile(info).read())
+                           for info in archive if info.isfile())
+                yield from _read_members(members)
+        else:
+            yield filename, stream.read()
+
+
+def _read_members(members):
+    """Leer los miembros WAV de un archivo comprimido, con límite de tamaño"""
+    for name, size, read in members:
+        basename = os.path.basename(name)
+        if not allowed_file(basename) or basename.startswith('._'):
+            continue
+        if size > app.config['MAX_CONTENT_LENGTH']:
+            yield name, None
+        else:
+            yield name, read()
+
+
+def batch_lines(uploads, reference, temperament):
+    """Analizar un lote en paralelo y generar una línea NDJSON por archivo"""
+    items = ((name, data, reference, temperament) for name, data in iter_batch_files(uploads))
+    
+    try:
+        for response in pool.map_unordered(analyze_batch_job, items):
+            yield dumps_json(response) + b'\n'
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        yield dumps_json({'success': False, 'error': f'Archivo comprimido no válido: {e}'}) + b'\n'
+    except PoolBusyError as e:
+        # Pool lleno: el resto del lote no se analiza
+        yield dumps_json({'success': False, 'error': str(e)}) + b'\n'
+
+
+def get_waveform_params(params):
+    """
+    Leer el tramo ('start', 'end' en segundos) y el ancho ('points') pedidos
+    
+    Raises:
+        ValueError: Si algún valor no es numérico
+    """
+    start = max(0.0, float(params.get('start') or 0))
+    end = params.get('end')
+    end = float(end) if end else None
+    points = min(MAX_WAVEFORM_POINTS, max(1, int(params.get('points') or WAVEFORM_POINTS)))
+    return start, end, points
+
+
 @app.route('/')
 def index():
     """Página principal"""
@@ -43,88 +410,176 @@ def analyze():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'error': 'Solo se permiten archivos WAV'}), 400
         
-        # Guardar archivo temporalmente
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Analizar audio
-        result = analyze_audio(filepath)
-        
-        # Limpiar archivo temporal
-        os.remove(filepath)
-        
-        if result['success']:
-            # Preparar respuesta - convertir numpy types a Python types
-            # Incluir datos de forma de onda (muestreados para reducir tamaño)
-            audio_data = result.get('audio_data', [])
-            if len(audio_data) > 1000:
-                # Submuestrear a 1000 puntos para el gráfico
-                step = len(audio_data) // 1000
-                waveform = audio_data[::step].tolist()
-            else:
-                waveform = audio_data.tolist() if hasattr(audio_data, 'tolist') else []
-            
-            response = {
-                'success': True,
-                'note': result['note_formatted'],
-                'frequency': float(result['frequency']),
-                'exact_frequency': float(result['exact_frequency']),
-                'cents': float(result['cents']),
-                'tuning_status': result['tuning_status'],
-                'has_valid_signal': bool(result.get('has_valid_signal', True)),
-                'signal_strength': float(result.get('signal_strength', 0)),
-                'waveform': waveform[:1000]  # Máximo 1000 puntos
-            }
+        try:
+            reference, temperament = get_tuning_params(request.form)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        chord = get_chord_param(request.form)
+        
+        # Las mismas grabaciones se suben una y otra vez: buscar primero por
+        # el hash del contenido y los parámetros
+        audio_id = hash_audio_source(file.stream).hexdigest()
+        key = result_cache.make_key(audio_id.encode(), endpoint='analyze',
+                                    reference=reference, temperament=temperament, chord=chord)
+        response = result_cache.get(key)
+        if response is not None:
             return jsonify(response)
-        else:
-            return jsonify({'success': False, 'error': result['error']}), 500
+        
+        # Analizar audio directamente desde el stream de la subida (werkzeug
+        # lo mantiene en memoria y solo lo vuelca a disco si es grande)
+        response, status, pyramid = analyze_file_job(file.stream, reference, temperament, audio_id, chord)
+        
+        if status == 200:
+            waveform_cache.put(audio_id, pyramid)
+            result_cache.put(key, response)
+        return jsonify(response), status
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/waveform/<audio_id>')
+def waveform(audio_id):
+    """
+    Envolvente de un tramo de la forma de onda de un archivo analizado
+    
+    Parámetros: 'start' y 'end' en segundos y 'points' (ancho en píxeles).
+    Responde 404 si la pirámide ya salió de la caché (hay que volver a
+    analizar el archivo).
+    """
+    pyramid = waveform_cache.get(audio_id)
+    if pyramid is None:
+        return jsonify({'success': False, 'error': 'Forma de onda no disponible'}), 404
+    
+    try:
+        start, end, points = get_waveform_params(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'audio_id': audio_id, **pyramid.encode(start, end, points)})
+
+
+@app.route('/cache-stats')
+def cache_stats():
+    """Contadores de aciertos/fallos de la caché de resultados"""
+    return jsonify(result_cache.stats())
+
+
+@app.route('/analyze-batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analizar muchos archivos en una sola petición
+    
+    Acepta varios archivos en el campo 'audio' (multipart) y/o archivos
+    .zip / .tar con WAVs dentro. Los archivos se analizan en paralelo en el
+    pool de procesos y la respuesta es NDJSON: una línea por archivo, en el
+    orden en que terminan, con la clave 'file' y los campos de /analyze.
+    """
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+    
+    if request.mimetype != 'multipart/form-data':
+        return jsonify({'success': False, 'error': 'No se encontró archivo de audio'}), 400
+    
+    def generate():
+        # El formulario se lee dentro del generador: Flask cierra los archivos
+        # subidos al terminar la vista, antes de que empiece la respuesta
+        uploads = [(file.filename, file.stream) for file in request.files.getlist('audio') if file.filename]
+        if not uploads:
+            yield dumps_json({'success': False, 'error': 'No se encontró archivo de audio'}) + b'\n'
+            return
+        
+        try:
+            reference, temperament = get_tuning_params(request.form)
+        except ValueError as e:
+            yield dumps_json({'success': False, 'error': str(e)}) + b'\n'
+            return
+        
+        yield from batch_lines(uploads, reference, temperament)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/analyze-live', methods=['POST'])
 def analyze_live():
-    """Analizar audio grabado en vivo desde el navegador"""
+    """
+    Analizar audio grabado en vivo desde el navegador
+    
+    Acepta PCM crudo (application/octet-stream, ver decode_pcm) con la
+    afinación en los parámetros de la URL, o el formato anterior: un WAV en
+    base64 dentro de JSON.
+    """
     try:
-        data = request.get_json()
-        
-        if not data or 'audio' not in data:
-            return jsonify({'success': False, 'error': 'No se recibieron datos de audio'}), 400
-        
-        # Decodificar audio base64
-        audio_data = base64.b64decode(data['audio'])
-        
-        # Guardar temporalmente
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_file.write(audio_data)
-        temp_file.close()
-        
-        # Analizar
-        result = analyze_audio(temp_file.name)
-        
-        # Limpiar
-        os.remove(temp_file.name)
-        
-        if result['success']:
-            response = {
-                'success': True,
-                'note': result['note_formatted'],
-                'frequency': float(result['frequency']),
-                'exact_frequency': float(result['exact_frequency']),
-                'cents': float(result['cents']),
-                'tuning_status': result['tuning_status'],
-                'has_valid_signal': bool(result.get('has_valid_signal', True)),
-                'signal_strength': float(result.get('signal_strength', 0))
-            }
-            return jsonify(response)
+        if request.mimetype == 'application/octet-stream':
+            try:
+                reference, temperament = get_tuning_params(request.args)
+                audio_data, sample_rate = decode_pcm(request.get_data(), request.args, request.headers)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            if len(audio_data) == 0:
+                return jsonify({'success': False, 'error': 'No se recibieron datos de audio'}), 400
+            
+            result = analyze_signal(audio_data, sample_rate, reference=reference,
+                                    temperament=temperament, summary_only=True)
         else:
-            return jsonify({'success': False, 'error': result['error']}), 500
+            data = request.get_json()
+            
+            if not data or 'audio' not in data:
+                return jsonify({'success': False, 'error': 'No se recibieron datos de audio'}), 400
+            
+            try:
+                reference, temperament = get_tuning_params(data)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            # Decodificar audio base64
+            audio_data = base64.b64decode(data['audio'])
+            
+            # Analizar en memoria, sin archivo temporal
+            result = analyze_audio(audio_data, reference=reference, temperament=temperament,
+                                   summary_only=True)
+        
+        response, status = format_result(result)
+        return jsonify(response), status
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@sock.route('/ws/tuner')
+def tuner_stream(ws):
+    """
+    Afinador en tiempo real por WebSocket
+    
+    El primer mensaje es JSON con la configuración ('sample_rate', 'format',
+    'reference', 'temperament'); después el navegador envía bloques binarios
+    de PCM mono continuamente. Cada conexión tiene su propio PitchTracker y,
+    por cada bloque que completa al menos una trama, se responde con la
+    nota de la trama más reciente.
+    """
+    try:
+        config = json.loads(ws.receive())
+        sample_rate, dtype, reference, temperament = get_stream_params(config)
+    except (ValueError, TypeError, AttributeError) as e:
+        ws.send(json.dumps({'success': False, 'error': str(e)}))
+        return
+    
+    tracker = PitchTracker(sample_rate, STREAM_FRAME_SIZE, STREAM_HOP_SIZE,
+                           reference=reference, temperament=temperament)
+    
+    while True:
+        message = ws.receive()
+        if message is None:
+            break
+        if isinstance(message, str):
+            # Mensaje de control: reiniciar el seguimiento
+            tracker.reset()
+            continue
+        
+        update = stream_update(tracker, message, dtype)
+        if update is not None:
+            ws.send(json.dumps(update))
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,401 @@
+"""
+Afinador Musical - Punto de entrada ASGI
+Sirve la misma aplicación que app.py, pero las peticiones se leen de forma
+asíncrona y cada análisis se ejecuta en un pool de procesos acotado
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import base64
+import binascii
+import json
+from contextlib import asynccontextmanager
+from pathlib import Path
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartException
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+from starlette.websockets import WebSocketDisconnect
+from audio_analyzer import PitchTracker, analyze_audio, analyze_signal, load_audio
+from app import (
+    BATCH_MAX_CONTENT_LENGTH, BATCH_MAX_FILES, STREAM_FRAME_SIZE, STREAM_HOP_SIZE,
+    allowed_file, analyze_file_job, batch_lines, decode_pcm, dumps_json, format_result,
+    get_chord_param, get_stream_params, get_tuning_params, get_waveform_params, pool,
+    result_cache, stream_update, waveform_cache
+)
+from decimation import WaveformPyramid
+from result_cache import hash_audio_source
+from workers import PoolBusyError
+
+BASE_DIR = Path(__file__).parent
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con orjson si está instalado"""
+    
+    def render(self, content):
+        return dumps_json(content)
+
+
+templates = Jinja2Templates(directory=BASE_DIR / 'templates')
+# Las plantillas usan la firma de Flask: url_for('static', filename=...)
+templates.env.globals['url_for'] = lambda endpoint, filename: f'/{endpoint}/{filename}'
+
+
+# Trabajos del pool: funciones de nivel de módulo para que puedan serializarse
+# y devuelven solo (respuesta JSON, código): ni la señal ni la pirámide de su
+# forma de onda cruzan de vuelta la frontera entre procesos
+
+def analyze_upload_job(data, reference, temperament, audio_id, chord=False):
+    """
+    Analizar un archivo subido, con la primera vista de su forma de onda
+    
+    La pirámide se construye y se descarta en el proceso del pool; el
+    proceso principal guarda la subida y solo la reconstruye si se pide un
+    zoom (ver waveform).
+    """
+    response, status, _ = analyze_file_job(data, reference, temperament, audio_id, chord)
+    return response, status
+
+
+def build_waveform(data):
+    """Pirámide de la forma de onda de un archivo subido"""
+    audio_data, sample_rate = load_audio(data)
+    return WaveformPyramid(audio_data, sample_rate)
+
+
+def analyze_encoded_job(data, reference, temperament):
+    """Analizar una grabación WAV enviada en base64"""
+    result = analyze_audio(data, reference=reference, temperament=temperament, summary_only=True)
+    return format_result(result)
+
+
+def analyze_pcm_job(audio_data, sample_rate, reference, temperament):
+    """Analizar muestras PCM ya decodificadas"""
+    result = analyze_signal(audio_data, sample_rate, reference=reference, temperament=temperament,
+                            summary_only=True)
+    return format_result(result)
+
+
+def error_response(message, status_code):
+    return FastJSONResponse({'success': False, 'error': message}, status_code=status_code)
+
+
+async def run_job(fn, *args, cache_key=None, upload=None):
+    """
+    Ejecutar un trabajo en el pool; 503 si el pool está saturado
+    
+    Si se da cache_key, una respuesta correcta se guarda en result_cache; si
+    se da upload (los bytes del archivo), se guarda en waveform_cache bajo el
+    audio_id de la respuesta para los zooms de la forma de onda.
+    """
+    try:
+        response, status = await pool.run(fn, *args)
+    except PoolBusyError as e:
+        return FastJSONResponse({'success': False, 'error': str(e)}, status_code=503,
+                            headers={'Retry-After': '1'})
+    except Exception as e:
+        return error_response(str(e), 500)
+        
+    if cache_key is not None and status == 200:
+        result_cache.put(cache_key, response)
+    if upload is not None and 'waveform' in response:
+        waveform_cache.put(response['waveform']['audio_id'], upload)
+    return FastJSONResponse(response, status_code=status)
+
+
+def parse_content_length(value):
+    """
+    Leer la cabecera Content-Length
+    
+    Returns:
+        int: Longitud en bytes (None si la cabecera no viene)
+        
+    Raises:
+        ValueError: Si no es un entero no negativo
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if not value.isdigit():
+        raise ValueError('Content-Length no válido')
+    return int(value)
+
+
+class BodyTooLarge(Exception):
+    """El cuerpo de la petición supera el límite de su ruta"""
+
+
+class BodySizeLimit:
+    """
+    Middleware ASGI que limita el tamaño del cuerpo de las peticiones
+    
+    Una petición con Content-Length mayor que el límite de su ruta se
+    rechaza (413) sin leerla, y una con la cabecera mal formada responde 400.
+    Como una subida chunked no envía Content-Length, además se cuentan los
+    bytes a medida que se leen y la lectura se corta (413) en cuanto pasan
+    del límite.
+    """
+    
+    def __init__(self, app, limit=MAX_CONTENT_LENGTH, limits=None):
+        """
+        Args:
+            app: Aplicación ASGI
+            limit (int): Límite en bytes por defecto
+            limits (dict): Límites por ruta ({'/analyze-batch': ...})
+        """
+        self.app = app
+        self.limit = limit
+        self.limits = limits or {}
+        
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+            
+        limit = self.limits.get(scope['path'], self.limit)
+        try:
+            length = parse_content_length(Headers(scope=scope).get('content-length'))
+        except ValueError as e:
+            await error_response(str(e), 400)(scope, receive, send)
+            return
+        if length is not None and length > limit:
+            await error_response('Archivo demasiado grande', 413)(scope, receive, send)
+            return
+            
+        received = 0
+        started = False
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    raise BodyTooLarge()
+            return message
+            
+        async def tracked_send(message):
+            nonlocal started
+            if message['type'] == 'http.response.start':
+                started = True
+            await send(message)
+            
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except BodyTooLarge:
+            if started:
+                raise
+            response = error_response('Archivo demasiado grande', 413)
+            await response(scope, receive, send)
+
+
+async def index(request):
+    """Página principal"""
+    return templates.TemplateResponse(request, 'index.html')
+
+
+async def analyze(request):
+    """Analizar archivo de audio subido"""
+    try:
+        form = await request.form()
+    except (HTTPException, MultiPartException):
+        return error_response('Formulario no válido', 400)
+        
+    # Verificar que se subió un archivo
+    file = form.get('audio')
+    if file is None or isinstance(file, str):
+        return error_response('No se encontró archivo de audio', 400)
+        
+    if file.filename == '':
+        return error_response('No se seleccionó ningún archivo', 400)
+        
+    if not allowed_file(file.filename):
+        return error_response('Solo se permiten archivos WAV', 400)
+        
+    try:
+        reference, temperament = get_tuning_params(form)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    chord = get_chord_param(form)
+        
+    data = await file.read()
+    
+    audio_id = hash_audio_source(data).hexdigest()
+    key = result_cache.make_key(audio_id.encode(), endpoint='analyze',
+                                reference=reference, temperament=temperament, chord=chord)
+    response = result_cache.get(key)
+    if response is not None:
+        return FastJSONResponse(response)
+        
+    return await run_job(analyze_upload_job, data, reference, temperament, audio_id, chord,
+                         cache_key=key, upload=data)
+
+
+async def waveform(request):
+    """Envolvente de un tramo de la forma de onda (ver app.py)"""
+    audio_id = request.path_params['audio_id']
+    pyramid = waveform_cache.get(audio_id)
+    if pyramid is None:
+        return error_response('Forma de onda no disponible', 404)
+        
+    if not isinstance(pyramid, WaveformPyramid):
+        # Primer zoom: la caché aún guarda la subida; la pirámide se construye
+        # una vez, fuera del bucle de eventos, y sustituye a los bytes
+        pyramid = await run_in_threadpool(build_waveform, pyramid)
+        waveform_cache.put(audio_id, pyramid)
+        
+    try:
+        start, end, points = get_waveform_params(request.query_params)
+    except ValueError as e:
+        return error_response(str(e), 400)
+        
+    return FastJSONResponse({'success': True, 'audio_id': audio_id, **pyramid.encode(start, end, points)})
+
+
+async def cache_stats(request):
+    """Contadores de aciertos/fallos de la caché de resultados"""
+    return FastJSONResponse(result_cache.stats())
+
+
+async def analyze_batch(request):
+    """Analizar muchos archivos en una sola petición (NDJSON, ver app.py)"""
+    try:
+        form = await request.form(max_files=BATCH_MAX_FILES)
+    except (HTTPException, MultiPartException):
+        return error_response('Formulario no válido', 400)
+        
+    uploads = [(file.filename, file.file) for file in form.getlist('audio')
+               if not isinstance(file, str) and file.filename]
+    if not uploads:
+        return error_response('No se encontró archivo de audio', 400)
+        
+    try:
+        reference, temperament = get_tuning_params(form)
+    except ValueError as e:
+        return error_response(str(e), 400)
+        
+    # El generador (lectura de archivos y espera del pool) es síncrono:
+    # Starlette lo recorre en su pool de hilos
+    return StreamingResponse(batch_lines(uploads, reference, temperament),
+                             media_type='application/x-ndjson')
+
+
+async def analyze_live(request):
+    """
+    Analizar audio grabado en vivo desde el navegador
+    
+    Acepta PCM crudo (application/octet-stream) o un WAV en base64 dentro de
+    JSON, igual que la ruta de app.py.
+    """
+    body = await request.body()
+    
+    if request.headers.get('content-type', '').startswith('application/octet-stream'):
+        try:
+            reference, temperament = get_tuning_params(request.query_params)
+            audio_data, sample_rate = decode_pcm(body, request.query_params, request.headers)
+        except ValueError as e:
+            return error_response(str(e), 400)
+            
+        if len(audio_data) == 0:
+            return error_response('No se recibieron datos de audio', 400)
+            
+        return await run_job(analyze_pcm_job, audio_data, sample_rate, reference, temperament)
+        
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+        
+    if not isinstance(data, dict) or 'audio' not in data:
+        return error_response('No se recibieron datos de audio', 400)
+        
+    try:
+        reference, temperament = get_tuning_params(data)
+    except ValueError as e:
+        return error_response(str(e), 400)
+        
+    # Decodificar audio base64
+    try:
+        audio_data = base64.b64decode(data['audio'], validate=True)
+    except (binascii.Error, ValueError, TypeError):
+        return error_response('Audio base64 no válido', 400)
+    if not audio_data:
+        return error_response('No se recibieron datos de audio', 400)
+        
+    return await run_job(analyze_encoded_job, audio_data, reference, temperament)
+
+
+async def tuner_stream(websocket):
+    """
+    Afinador en tiempo real por WebSocket (mismo protocolo que app.py)
+    
+    El seguimiento por salto es muy ligero, así que se hace en el propio
+    bucle de eventos en lugar de ocupar el pool de procesos.
+    """
+    await websocket.accept()
+    
+    try:
+        config = json.loads(await websocket.receive_text())
+        sample_rate, dtype, reference, temperament = get_stream_params(config)
+    except (ValueError, TypeError, AttributeError) as e:
+        await websocket.send_json({'success': False, 'error': str(e)})
+        await websocket.close()
+        return
+        
+    tracker = PitchTracker(sample_rate, STREAM_FRAME_SIZE, STREAM_HOP_SIZE,
+                           reference=reference, temperament=temperament)
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message.get('bytes') is None:
+                # Mensaje de control: reiniciar el seguimiento
+                tracker.reset()
+                continue
+                
+            update = stream_update(tracker, message['bytes'], dtype)
+            if update is not None:
+                await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+
+
+@asynccontextmanager
+async def lifespan(app):
+    pool.start()
+    yield
+    pool.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/analyze', analyze, methods=['POST']),
+        Route('/analyze-batch', analyze_batch, methods=['POST']),
+        Route('/cache-stats', cache_stats),
+        Route('/waveform/{audio_id}', waveform),
+        Route('/analyze-live', analyze_live, methods=['POST']),
+        WebSocketRoute('/ws/tuner', tuner_stream),
+        Mount('/static', StaticFiles(directory=BASE_DIR / 'static'), name='static'),
+    ],
+    middleware=[
+        Middleware(BodySizeLimit, limit=MAX_CONTENT_LENGTH,
+                   limits={'/analyze-batch': BATCH_MAX_CONTENT_LENGTH}),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5001)
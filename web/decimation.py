@@ -0,0 +1,148 @@
+"""
+Decimation Module
+Per-pixel min/max/RMS envelopes of long signals for drawing, from
+multi-resolution pyramids for zooming, with compact Float32 encoding
+"""
+
+import base64
+import numpy as np
+
+# Samples per bin of the finest pyramid level and ratio between levels
+BASE_BIN_SIZE = 16
+LEVEL_FACTOR = 4
+
+
+def _bin_edges(length, num_points):
+    """Start index of each of num_points (nearly) equal bins over length items"""
+    num_points = max(1, min(num_points, length))
+    return np.linspace(0, length, num_points + 1).astype(np.intp)[:-1]
+
+
+class WaveformPyramid:
+    """
+    Multi-resolution min/max/RMS summary of a signal
+    
+    Level 0 holds one bin per BASE_BIN_SIZE samples and every further level
+    merges LEVEL_FACTOR bins of the one below, down to a few hundred bins.
+    A query for any range and width is answered from the coarsest level that
+    still has at least one bin per output point, so zooming never touches
+    the full-rate samples again and each request costs O(points).
+    """
+    
+    def __init__(self, audio_data, sample_rate, min_bins=256):
+        """
+        Build the pyramid
+        
+        Args:
+            audio_data (numpy.array): Mono audio signal
+            sample_rate (int): Sample rate in Hz
+            min_bins (int): Stop adding levels below this many bins
+        """
+        audio_data = np.asarray(audio_data, dtype=np.float32)
+        self.num_samples = len(audio_data)
+        self.sample_rate = sample_rate
+        
+        # (bin_size, min, max, sum of squares) per level
+        self.levels = []
+        bin_size = BASE_BIN_SIZE
+        edges = np.arange(0, self.num_samples, bin_size)
+        if len(edges) == 0:
+            return
+            
+        minimum = np.minimum.reduceat(audio_data, edges)
+        maximum = np.maximum.reduceat(audio_data, edges)
+        power = np.add.reduceat(audio_data * audio_data, edges)
+        self.levels.append((bin_size, minimum, maximum, power))
+        
+        while len(minimum) > min_bins:
+            edges = np.arange(0, len(minimum), LEVEL_FACTOR)
+            minimum = np.minimum.reduceat(minimum, edges)
+            maximum = np.maximum.reduceat(maximum, edges)
+            power = np.add.reduceat(power, edges)
+            bin_size *= LEVEL_FACTOR
+            self.levels.append((bin_size, minimum, maximum, power))
+            
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+        
+    def query(self, start=0.0, end=None, num_points=1000):
+        """
+        Envelope of a time range
+        
+        Args:
+            start (float): Range start in seconds
+            end (float): Range end in seconds (default: end of the signal)
+            num_points (int): Number of output points (e.g. canvas width)
+            
+        Returns:
+            tuple: (minimum, maximum, rms) float32 arrays, at most num_points
+                long (fewer when zoomed in past the finest level)
+        """
+        first = int(np.clip(start * self.sample_rate, 0, self.num_samples))
+        last = self.num_samples if end is None else int(np.clip(end * self.sample_rate, first, self.num_samples))
+        num_points = max(1, int(num_points))
+        
+        if not self.levels or last <= first:
+            empty = np.zeros(0, dtype=np.float32)
+            return empty, empty, empty
+            
+        # Coarsest level that still has a bin per output point
+        samples_per_point = (last - first) / num_points
+        level = self.levels[0]
+        for candidate in self.levels:
+            if candidate[0] <= samples_per_point:
+                level = candidate
+                
+        bin_size, minimum, maximum, power = level
+        lo = first // bin_size
+        hi = max(lo + 1, -(-last // bin_size))
+        minimum, maximum, power = minimum[lo:hi], maximum[lo:hi], power[lo:hi]
+        
+        edges = _bin_edges(len(minimum), num_points)
+        bins = np.diff(np.append(edges, len(minimum)))
+        # The last bin of the signal may be partial
+        samples = bins * bin_size
+        if hi * bin_size > self.num_samples:
+            samples[-1] -= hi * bin_size - self.num_samples
+            
+        return (
+            np.minimum.reduceat(minimum, edges),
+            np.maximum.reduceat(maximum, edges),
+            np.sqrt(np.add.reduceat(power, edges) / samples).astype(np.float32),
+        )
+        
+    def encode(self, start=0.0, end=None, num_points=1000):
+        """
+        query() encoded for a JSON response
+        
+        Returns:
+            dict: 'min', 'max' and 'rms' as base64 little-endian float32,
+                plus 'points', 'start', 'end' and 'duration' in seconds
+        """
+        end = self.duration if end is None else min(end, self.duration)
+        minimum, maximum, rms = self.query(start, end, num_points)
+        
+        return {
+            'encoding': 'float32-base64',
+            'points': len(minimum),
+            'start': float(start),
+            'end': float(end),
+            'duration': self.duration,
+            'min': encode_float32(minimum),
+            'max': encode_float32(maximum),
+            'rms': encode_float32(rms),
+        }
+
+
+def encode_float32(array):
+    """
+    Encode an array as base64 little-endian float32
+    
+    Args:
+        array (numpy.array): Values to encode
+        
+    Returns:
+        str: Base64 text (4 bytes per value before encoding)
+    """
+    return base64.b64encode(np.asarray(array, dtype='<f4').tobytes()).decode('ascii')
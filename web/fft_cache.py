@@ -0,0 +1,128 @@
+"""
+FFT Cache Module
+Process-wide cache of analysis windows, frequency axes and FFT functions
+shared by every analyzer
+"""
+
+import os
+from functools import lru_cache
+import numpy as np
+import scipy.fft
+
+try:
+    # Optional: pyFFTW plans FFTs once per shape and reuses them
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft as fftw_scipy_fft
+    pyfftw.interfaces.cache.enable()
+except ImportError:
+    pyfftw = None
+
+# Maximum number of entries kept per cache (least recently used are evicted)
+CACHE_SIZE = 64
+
+# Longer arrays (e.g. a window spanning a whole file) are built on demand
+# instead of being kept alive in the cache
+MAX_CACHED_LENGTH = 1 << 18
+
+# Analysis windows by name ('none' is rectangular)
+WINDOW_FUNCTIONS = {
+    'hamming': np.hamming,
+    'hanning': np.hanning,
+    'blackman': np.blackman,
+}
+
+
+def _read_only(array):
+    """Mark a cached array as shared so callers cannot modify it in place"""
+    array.flags.writeable = False
+    return array
+
+
+def _build_window(window, size):
+    if window in WINDOW_FUNCTIONS:
+        return WINDOW_FUNCTIONS[window](size)
+    return np.ones(size)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_window(window, size):
+    return _read_only(_build_window(window, size))
+
+
+def get_window(window, size):
+    """
+    Get an analysis window
+    
+    Args:
+        window (str): 'hamming', 'hanning', 'blackman' or 'none'
+        size (int): Window length in samples
+        
+    Returns:
+        numpy.array: Window of the given length (read-only when cached)
+    """
+    if size > MAX_CACHED_LENGTH:
+        return _build_window(window, size)
+    return _cached_window(window, int(size))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_rfft_frequencies(n_fft, sample_rate):
+    return _read_only(scipy.fft.rfftfreq(n_fft, 1/sample_rate))
+
+
+def get_rfft_frequencies(n_fft, sample_rate):
+    """
+    Get the frequency of every bin of a real FFT
+    
+    Args:
+        n_fft (int): FFT length
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        numpy.array: Bin frequencies in Hz (read-only when cached)
+    """
+    if n_fft > MAX_CACHED_LENGTH:
+        return scipy.fft.rfftfreq(n_fft, 1/sample_rate)
+    return _cached_rfft_frequencies(int(n_fft), float(sample_rate))
+
+
+def rfft(x, n=None, axis=-1, workers=None):
+    """
+    Real FFT through the fastest available backend
+    
+    pyFFTW (if installed) plans each shape once and caches the plan; otherwise
+    scipy.fft is used, whose pocketfft backend keeps its own plan cache.
+    
+    Args:
+        x (numpy.array): Real input
+        n (int): FFT length (zero-pads or truncates x)
+        axis (int): Axis over which to compute the FFT
+        workers (int): Worker threads (-1 uses all cores)
+        
+    Returns:
+        numpy.array: Complex spectrum of the positive frequencies
+    """
+    if pyfftw is not None:
+        if workers is not None and workers < 0:
+            workers = os.cpu_count()
+        return fftw_scipy_fft.rfft(x, n, axis=axis, workers=workers)
+    return scipy.fft.rfft(x, n, axis=axis, workers=workers)
+
+
+def cache_info():
+    """
+    Hit/miss statistics of the caches
+    
+    Returns:
+        dict: functools cache_info() per cache
+    """
+    return {
+        'windows': _cached_window.cache_info(),
+        'rfft_frequencies': _cached_rfft_frequencies.cache_info(),
+    }
+
+
+def clear_cache():
+    """Drop every cached window and frequency axis"""
+    _cached_window.cache_clear()
+    _cached_rfft_frequencies.cache_clear()
@@ -0,0 +1,172 @@
+"""
+Onsets Module
+Note onset detection (spectral flux or complex-domain novelty over batched
+STFT frames) and segmentation of a recording into single notes
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d, median_filter
+from fft_cache import get_window, rfft
+
+# Onset detection functions
+ONSET_METHODS = ('flux', 'complex')
+
+# Log compression of magnitudes for spectral flux: log(1 + C * |X|), with
+# |X| = 1 for a full-scale sine
+FLUX_COMPRESSION = 100.0
+
+# Peak picking: a peak must be the maximum within PEAK_WINDOW seconds and
+# exceed the median over MEDIAN_WINDOW seconds by DELTA (on the detection
+# function normalized to a maximum of 1)
+PEAK_WINDOW = 0.05
+MEDIAN_WINDOW = 0.5
+DELTA = 0.1
+
+# Part of a note analyzed for its pitch: skip the attack, then take at most
+# STEADY_LENGTH seconds (the tail may already have decayed into silence)
+ATTACK_LENGTH = 0.05
+STEADY_LENGTH = 0.5
+
+
+def onset_strength(audio_data, sample_rate, frame_size=2048, hop_size=512, method='complex',
+                   batch_frames=512, workers=-1):
+    """
+    Onset detection function of a signal
+    
+    'flux' sums the increase of the log-compressed magnitude of every bin
+    between consecutive frames. 'complex' (rectified complex domain) sums,
+    over bins whose magnitude grows, the distance between each bin and its
+    prediction from the two previous frames (same magnitude, constant phase
+    advance), which also catches soft onsets that only change the phase.
+    
+    Frames are transformed `batch_frames` at a time with one batched FFT;
+    the last spectra of each batch carry over to the next, so memory stays
+    bounded for long recordings.
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between consecutive frames
+        method (str): One of ONSET_METHODS
+        batch_frames (int): Frames transformed per FFT call
+        workers (int): FFT worker threads (-1 uses all cores)
+        
+    Returns:
+        tuple: (times, strength) arrays with one value per frame, times
+            being frame centres in seconds
+    """
+    if method not in ONSET_METHODS:
+        raise ValueError(f"Unknown onset method: {method}")
+        
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    if len(audio_data) < frame_size:
+        return np.zeros(0), np.zeros(0)
+        
+    frames = sliding_window_view(audio_data, frame_size)[::hop_size]
+    window = get_window('hanning', frame_size)
+    # Magnitude 1 for a full-scale sine at a bin centre
+    scale = 2.0 / np.sum(window)
+    strength = np.zeros(len(frames))
+    
+    # The two spectra before the current batch (silence before the signal)
+    previous = np.zeros((2, frame_size // 2 + 1), dtype=np.complex64)
+    
+    for start in range(0, len(frames), batch_frames):
+        batch = slice(start, start + batch_frames)
+        spectra = np.concatenate((previous, rfft(frames[batch] * window, axis=-1, workers=workers)))
+        magnitude = np.abs(spectra) * scale
+        
+        if method == 'flux':
+            compressed = np.log1p(FLUX_COMPRESSION * magnitude)
+            strength[batch] = np.maximum(compressed[2:] - compressed[1:-1], 0.0).sum(axis=1)
+        else:
+            phase = np.angle(spectra)
+            predicted = magnitude[1:-1] * np.exp(1j * (2 * phase[1:-1] - phase[:-2]))
+            deviation = np.abs(spectra[2:] * scale - predicted)
+            deviation[magnitude[2:] < magnitude[1:-1]] = 0.0
+            strength[batch] = deviation.sum(axis=1)
+            
+        previous = spectra[-2:]
+        
+    times = (np.arange(len(frames)) * hop_size + frame_size / 2) / sample_rate
+    return times, strength
+
+
+def detect_onsets(audio_data, sample_rate, frame_size=2048, hop_size=512, method='complex',
+                  min_interval=0.1):
+    """
+    Times at which notes start
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal
+        sample_rate (int): Sample rate in Hz
+        frame_size (int): Samples per frame
+        hop_size (int): Samples between consecutive frames
+        method (str): Detection function, one of ONSET_METHODS
+        min_interval (float): Minimum time between onsets in seconds
+        
+    Returns:
+        numpy.array: Onset times in seconds, in increasing order
+    """
+    times, strength = onset_strength(audio_data, sample_rate, frame_size, hop_size, method)
+    if len(strength) == 0 or strength.max() <= 0:
+        return np.zeros(0)
+        
+    strength = strength / strength.max()
+    frame_rate = sample_rate / hop_size
+    
+    # Local maxima above an adaptive (moving median) threshold
+    peak_frames = 2 * int(PEAK_WINDOW * frame_rate / 2) + 1
+    median_frames = 2 * int(MEDIAN_WINDOW * frame_rate / 2) + 1
+    is_peak = strength == maximum_filter1d(strength, peak_frames)
+    threshold = median_filter(strength, median_frames) + DELTA
+    candidates = times[is_peak & (strength > threshold)]
+    
+    # Drop onsets closer than min_interval to the previous one
+    onsets = []
+    for onset in candidates:
+        if not onsets or onset - onsets[-1] >= min_interval:
+            onsets.append(onset)
+            
+    return np.array(onsets)
+
+
+def segment_signal(audio_data, sample_rate, method='complex', min_interval=0.1):
+    """
+    Split a recording into notes at their onsets
+    
+    Args:
+        audio_data (numpy.array): Mono audio signal
+        sample_rate (int): Sample rate in Hz
+        method (str): Detection function, one of ONSET_METHODS
+        min_interval (float): Minimum note length in seconds
+        
+    Returns:
+        list: (start, end) sample indices of each note, from its onset to
+            the next one (or the end of the signal)
+    """
+    onsets = detect_onsets(audio_data, sample_rate, method=method, min_interval=min_interval)
+    bounds = np.append(np.round(onsets * sample_rate).astype(int), len(audio_data))
+    
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def steady_state(start, end, sample_rate):
+    """
+    Part of a note segment to analyze for its pitch
+    
+    Args:
+        start (int): First sample of the segment
+        end (int): Sample after the last one
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        tuple: (start, end) sample indices after the attack (the whole
+            segment if it is too short to skip it)
+    """
+    attack = int(ATTACK_LENGTH * sample_rate)
+    if end - start <= 2 * attack:
+        return start, end
+    return start + attack, min(end, start + attack + int(STEADY_LENGTH * sample_rate))
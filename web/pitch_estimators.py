@@ -0,0 +1,359 @@
+"""
+Pitch Estimators Module
+Interchangeable fundamental frequency estimators for a single frame of audio
+"""
+
+import numpy as np
+from scipy.fft import irfft, next_fast_len
+from fft_cache import get_rfft_frequencies, get_window, rfft
+
+# Search range for the fundamental: ignore very low frequencies (below 20 Hz)
+# which are likely noise, and anything above 5 kHz
+MIN_FREQUENCY = 20
+MAX_FREQUENCY = 5000
+
+# Require a clear peak (SNR > 3 means peak is at least 3x stronger than average)
+MIN_SNR = 3.0
+
+# YIN: first dip of the normalized difference function below this value
+YIN_THRESHOLD = 0.15
+
+# McLeod: pick the first key maximum above this fraction of the highest one,
+# and only accept it if the normalized correlation (clarity) is high enough
+MPM_CUTOFF = 0.9
+MPM_MIN_CLARITY = 0.5
+
+# Sub-bin refinement of spectral peaks:
+# - 'parabolic': parabola through the peak bin and its neighbours (magnitude)
+# - 'gaussian': same on log-magnitude, exact for a Gaussian-shaped peak
+# - 'qifft': 'gaussian' on a 2x zero-padded FFT (quadratically interpolated FFT)
+PEAK_REFINEMENTS = ('none', 'parabolic', 'gaussian', 'qifft')
+
+
+def fft_size(frame_size, refine):
+    """FFT length for a frame: 'qifft' zero-pads to twice the frame size"""
+    return 2 * frame_size if refine == 'qifft' else frame_size
+
+
+def interpolate_peak(magnitude, peak_idx, refine='gaussian'):
+    """
+    Fractional bin offset of a spectral peak from its neighbouring bins
+    
+    Args:
+        magnitude (numpy.array): Magnitude spectrum, bins on the last axis
+        peak_idx (numpy.array): Index of the peak bin (one per spectrum)
+        refine (str): One of PEAK_REFINEMENTS
+        
+    Returns:
+        numpy.array: Offset in bins (-0.5..0.5) to add to peak_idx
+    """
+    if refine not in PEAK_REFINEMENTS:
+        raise ValueError(f"Unknown peak refinement: {refine}")
+        
+    peak_idx = np.asarray(peak_idx)
+    if refine == 'none':
+        return np.zeros(peak_idx.shape)
+        
+    n = magnitude.shape[-1]
+    neighbours = np.clip(peak_idx[..., np.newaxis] + np.array([-1, 0, 1]), 0, n - 1)
+    y = np.take_along_axis(magnitude, neighbours, axis=-1)
+    if refine != 'parabolic':
+        y = np.log(y + 1e-12)
+        
+    left, center, right = y[..., 0], y[..., 1], y[..., 2]
+    curvature = left - 2 * center + right
+    
+    # Only refine true local maxima that are not on the spectrum edges
+    usable = (peak_idx > 0) & (peak_idx < n - 1) & (curvature < 0)
+    offset = 0.5 * (left - right) / np.where(usable, curvature, -1.0)
+    
+    return np.where(usable, np.clip(offset, -0.5, 0.5), 0.0)
+
+
+def phase_vocoder_frequency(prev_phase, phase, peak_bin, frame_size, hop_size, sample_rate):
+    """
+    Frequency of a spectral peak from its phase advance between two frames
+    
+    The deviation of the measured phase advance from the one expected for
+    the bin center gives the offset from that center, independently of the
+    bin width.
+    
+    Args:
+        prev_phase (float): Phase of the peak bin in the previous frame
+        phase (float): Phase of the peak bin in the current frame
+        peak_bin (int): Index of the peak bin
+        frame_size (int): FFT size
+        hop_size (int): Samples between the two frames
+        sample_rate (int): Sample rate in Hz
+        
+    Returns:
+        float: Refined frequency in Hz
+    """
+    expected = 2 * np.pi * peak_bin * hop_size / frame_size
+    deviation = np.angle(np.exp(1j * (phase - prev_phase - expected)))  # wrap to [-pi, pi]
+    
+    bin_offset = deviation * frame_size / (2 * np.pi * hop_size)
+    return float((peak_bin + bin_offset) * sample_rate / frame_size)
+
+
+def find_spectral_peak(magnitude, freqs, min_freq=MIN_FREQUENCY, max_freq=MAX_FREQUENCY,
+                       refine='gaussian'):
+    """
+    Pick the fundamental as the strongest peak in the musical search range
+    
+    Works on a single spectrum or on a stack of spectra (one per row).
+    
+    Args:
+        magnitude (numpy.array): Magnitude spectrum, bins on the last axis
+        freqs (numpy.array): Frequency of each bin in Hz
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        refine (str): Sub-bin refinement, one of PEAK_REFINEMENTS
+        
+    Returns:
+        tuple: (peak_frequency in Hz, is_valid_peak), arrays when
+            magnitude is 2-D; invalid peaks report 0.0 Hz
+    """
+    # Find the peak frequency (fundamental): first bins above min/max_freq
+    min_freq_idx = np.searchsorted(freqs, min_freq, side='right')
+    max_freq_idx = np.searchsorted(freqs, max_freq, side='right')
+        
+    search_range = magnitude[..., min_freq_idx:max_freq_idx]
+    search_freqs = freqs[min_freq_idx:max_freq_idx]
+    
+    if search_range.shape[-1] == 0:
+        invalid = np.zeros(magnitude.shape[:-1], dtype=bool)
+        return np.zeros(magnitude.shape[:-1]), invalid
+        
+    peak_idx = np.argmax(search_range, axis=-1)
+    peak_magnitude = np.take_along_axis(search_range, peak_idx[..., np.newaxis], axis=-1)[..., 0]
+    
+    # Calculate Signal-to-Noise Ratio (SNR)
+    # Compare peak magnitude to average magnitude
+    avg_magnitude = np.mean(search_range, axis=-1)
+    snr = peak_magnitude / (avg_magnitude + 1e-10)  # Avoid division by zero
+    
+    # No clear fundamental frequency (low SNR) - likely just noise
+    is_valid = snr >= MIN_SNR
+    
+    # Refine the peak position between bins
+    offset = interpolate_peak(magnitude, peak_idx + min_freq_idx, refine)
+    peak_freqs = search_freqs[peak_idx] + offset * (freqs[1] - freqs[0])
+    
+    return np.where(is_valid, peak_freqs, 0.0), is_valid
+
+
+def fft_peak(frame, sample_rate, min_freq=MIN_FREQUENCY, max_freq=MAX_FREQUENCY,
+             refine='qifft'):
+    """
+    Strongest spectral peak of a Hamming-windowed frame
+    
+    Fast and accurate for pure tones, but locks onto the loudest partial,
+    which for low strings is often the 2nd or 3rd harmonic. With sub-bin
+    refinement the estimate is no longer quantized to sample_rate / N, so
+    short frames stay within a cent on clean tones.
+    
+    Args:
+        frame (numpy.array): Audio samples
+        sample_rate (int): Sample rate in Hz
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        refine (str): Sub-bin refinement, one of PEAK_REFINEMENTS
+        
+    Returns:
+        tuple: (frequency in Hz, is_valid)
+    """
+    n_fft = fft_size(len(frame), refine)
+    
+    # Apply Hamming window to reduce spectral leakage
+    magnitude = np.abs(rfft(frame * get_window('hamming', len(frame)), n_fft))
+    freqs = get_rfft_frequencies(n_fft, sample_rate)
+    
+    frequency, is_valid = find_spectral_peak(magnitude, freqs, min_freq, max_freq, refine)
+    return float(frequency), bool(is_valid)
+
+
+def _lag_range(frame_size, sample_rate, min_freq, max_freq):
+    """Lag search range (in samples) for a frequency range"""
+    min_lag = max(2, int(sample_rate / max_freq))
+    max_lag = min(int(np.ceil(sample_rate / min_freq)), frame_size // 2)
+    return min_lag, max_lag
+
+
+def _parabolic_offset(y, i):
+    """Vertex offset (-0.5..0.5) of the parabola through y[i-1], y[i], y[i+1]"""
+    if i <= 0 or i >= len(y) - 1:
+        return 0.0
+    denom = y[i - 1] - 2 * y[i] + y[i + 1]
+    if denom == 0:
+        return 0.0
+    return 0.5 * (y[i - 1] - y[i + 1]) / denom
+
+
+def _difference_function(frame, max_lag):
+    """
+    YIN difference function d(tau) for tau = 0..max_lag in O(N log N)
+    
+    d(tau) = sum_j (x[j] - x[j+tau])^2 over an integration window of
+    W = N - max_lag samples, expanded as energy terms minus twice the
+    cross-correlation of the window with the frame, which is computed by FFT.
+    """
+    frame = np.asarray(frame, dtype=np.float64)
+    n = len(frame)
+    w = n - max_lag
+    
+    size = next_fast_len(n + w)
+    corr = irfft(rfft(frame, size) * np.conj(rfft(frame[:w], size)), size)[:max_lag + 1]
+    
+    energy = np.concatenate(([0.0], np.cumsum(frame**2)))
+    tau = np.arange(max_lag + 1)
+    window_energy = energy[tau + w] - energy[tau]
+    
+    return np.maximum(energy[w] + window_energy - 2 * corr, 0.0)
+
+
+def yin(frame, sample_rate, min_freq=MIN_FREQUENCY, max_freq=MAX_FREQUENCY,
+        threshold=YIN_THRESHOLD):
+    """
+    YIN estimator (de Cheveigné & Kawahara, 2002)
+    
+    Picks the first period whose cumulative mean normalized difference dips
+    below `threshold`, which favours the true period over its multiples and
+    so avoids octave errors on harmonic-rich notes. Needs only two periods
+    of signal, so much shorter frames than the FFT peak can be used.
+    
+    Args:
+        frame (numpy.array): Audio samples
+        sample_rate (int): Sample rate in Hz
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        threshold (float): Absolute threshold on the normalized difference
+        
+    Returns:
+        tuple: (frequency in Hz, is_valid)
+    """
+    frame = np.asarray(frame, dtype=np.float64)
+    min_lag, max_lag = _lag_range(len(frame), sample_rate, min_freq, max_freq)
+    if max_lag <= min_lag:
+        return 0.0, False
+        
+    diff = _difference_function(frame, max_lag)
+    running_sum = np.cumsum(diff[1:])
+    
+    # Silence (or a constant signal) has no period: the normalized difference
+    # would be 0 everywhere and pass the threshold at the shortest lag
+    energy = np.dot(frame, frame)
+    if energy <= 0 or running_sum[-1] <= 1e-9 * energy:
+        return 0.0, False
+        
+    # Cumulative mean normalized difference: d'(0) = 1
+    cmnd = np.ones_like(diff)
+    cmnd[1:] = diff[1:] * np.arange(1, max_lag + 1) / np.maximum(running_sum, 1e-12)
+    
+    search = cmnd[min_lag:max_lag]
+    below = np.flatnonzero(search < threshold)
+    if len(below) == 0:
+        return 0.0, False
+        
+    # Walk from the first dip under the threshold down to its local minimum
+    tau = min_lag + below[0]
+    while tau + 1 < max_lag and cmnd[tau + 1] < cmnd[tau]:
+        tau += 1
+        
+    period = tau + _parabolic_offset(cmnd, tau)
+    return float(sample_rate / period), True
+
+
+def mcleod(frame, sample_rate, min_freq=MIN_FREQUENCY, max_freq=MAX_FREQUENCY,
+           cutoff=MPM_CUTOFF):
+    """
+    McLeod Pitch Method (McLeod & Wyvill, 2005)
+    
+    Uses the normalized square difference function, whose autocorrelation
+    term is computed by FFT, and picks the first key maximum that reaches
+    `cutoff` times the highest one.
+    
+    Args:
+        frame (numpy.array): Audio samples
+        sample_rate (int): Sample rate in Hz
+        min_freq (float): Lowest frequency searched
+        max_freq (float): Highest frequency searched
+        cutoff (float): Fraction of the highest key maximum to accept
+        
+    Returns:
+        tuple: (frequency in Hz, is_valid)
+    """
+    frame = np.asarray(frame, dtype=np.float64)
+    n = len(frame)
+    min_lag, max_lag = _lag_range(n, sample_rate, min_freq, max_freq)
+    if max_lag <= min_lag:
+        return 0.0, False
+        
+    size = next_fast_len(2 * n)
+    spectrum = rfft(frame, size)
+    acf = irfft(spectrum * np.conj(spectrum), size)[:max_lag + 1]
+    
+    energy = np.concatenate(([0.0], np.cumsum(frame**2)))
+    if energy[n] <= 0:
+        return 0.0, False
+        
+    tau = np.arange(max_lag + 1)
+    m = energy[n - tau] + (energy[n] - energy[tau])
+    nsdf = 2 * acf / np.maximum(m, 1e-12)
+    
+    # Key maxima: highest point of each positive lobe after the first
+    # negative-going zero crossing (skips the lobe around lag 0)
+    positive = nsdf > 0
+    crossings = np.flatnonzero(positive[1:] != positive[:-1]) + 1
+    rising = crossings[positive[crossings]]
+    falling = crossings[~positive[crossings]]
+    if len(falling) == 0:
+        return 0.0, False
+        
+    rising = rising[rising > falling[0]]
+    ends = np.searchsorted(falling, rising)
+    
+    peaks = []
+    for start, end_idx in zip(rising, ends):
+        end = falling[end_idx] if end_idx < len(falling) else len(nsdf)
+        start, end = max(start, min_lag), min(end, max_lag)
+        if start < end:
+            peaks.append(start + int(np.argmax(nsdf[start:end])))
+            
+    if not peaks:
+        return 0.0, False
+        
+    peak_values = nsdf[peaks]
+    best = peaks[int(np.argmax(peak_values >= cutoff * peak_values.max()))]
+    if nsdf[best] < MPM_MIN_CLARITY:
+        return 0.0, False
+        
+    period = best + _parabolic_offset(nsdf, best)
+    return float(sample_rate / period), True
+
+
+# Available estimators: estimator(frame, sample_rate) -> (frequency, is_valid)
+ESTIMATORS = {
+    'fft': fft_peak,
+    'yin': yin,
+    'mcleod': mcleod,
+}
+
+
+def get_estimator(method):
+    """
+    Look up a pitch estimator by name
+    
+    Args:
+        method (str): 'fft', 'yin' or 'mcleod'
+        
+    Returns:
+        callable: estimator(frame, sample_rate) -> (frequency, is_valid)
+        
+    Raises:
+        ValueError: If the method is unknown
+    """
+    try:
+        return ESTIMATORS[method]
+    except KeyError:
+        raise ValueError(f"Unknown pitch estimation method: {method}")
@@ -2,6 +2,8 @@
 
 const recorder = new AudioRecorder();
 let currentFile = null;
+let tunerSocket = null;
+let currentWaveform = null;
 
 // Elementos del DOM
 const uploadBtn = document.getElementById('uploadBtn');
@@ -11,6 +13,10 @@ const fileName = document.getElementById('fileName');
 const loading = document.getElementById('loading');
 const countdownDialog = document.getElementById('countdownDialog');
 const countdownNumber = document.getElementById('countdownNumber');
+const referenceSelect = document.getElementById('referenceSelect');
+const temperamentSelect = document.getElementById('temperamentSelect');
+const chordCheck = document.getElementById('chordCheck');
+const liveTunerBtn = document.getElementById('liveTunerBtn');
 
 // Event Listeners
 uploadBtn.addEventListener('click', () => {
@@ -52,6 +58,7 @@ fileInput.addEventListener('change', (e) => {
 });
 
 recordBtn.addEventListener('click', startLiveRecording);
+liveTunerBtn.addEventListener('click', toggleLiveTuner);
 
 // Analizar archivo subido
 async function analyzeFile(file) {
@@ -59,6 +66,9 @@ async function analyzeFile(file) {
 
     const formData = new FormData();
     formData.append('audio', file);
+    formData.append('reference', referenceSelect.value);
+    formData.append('temperament', temperamentSelect.value);
+    formData.append('chord', chordCheck.checked ? '1' : '0');
 
     try {
         const response = await fetch('/analyze', {
@@ -93,41 +103,42 @@ async function startLiveRecording() {
     countdownNumber.style.color = '#06ffa5';
 
     try {
-        const audioBlob = await recorder.startRecording(3000);
+        const recording = await recorder.startRecording(3000);
 
         // Cerrar diálogo
         countdownDialog.style.display = 'none';
         showLoading(true);
 
-        // Convertir a base64 y enviar
-        const reader = new FileReader();
-        reader.readAsDataURL(audioBlob);
-        reader.onloadend = async () => {
-            const base64Audio = reader.result.split(',')[1];
-
-            try {
-                const response = await fetch('/analyze-live', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ audio: base64Audio })
-                });
-
-                const result = await response.json();
-
-                if (result.success) {
-                    displayResults(result);
-                } else {
-                    alert(`Error: ${result.error}`);
-                }
-            } catch (error) {
-                console.error('Error:', error);
-                alert('Error al analizar la grabación');
-            } finally {
-                showLoading(false);
+        // Enviar PCM binario; la configuración va en la URL
+        const params = new URLSearchParams({
+            sample_rate: recording.sampleRate,
+            format: recording.format,
+            reference: referenceSelect.value,
+            temperament: temperamentSelect.value
+        });
+
+        try {
+            const response = await fetch(`/analyze-live?${params}`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/octet-stream'
+                },
+                body: recording.blob
+            });
+
+            const result = await response.json();
+
+            if (result.success) {
+                displayResults(result);
+            } else {
+                alert(`Error: ${result.error}`);
             }
-        };
+        } catch (error) {
+            console.error('Error:', error);
+            alert('Error al analizar la grabación');
+        } finally {
+            showLoading(false);
+        }
     } catch (error) {
         console.error('Error al grabar:', error);
         countdownDialog.style.display = 'none';
@@ -135,6 +146,64 @@ async function startLiveRecording() {
     }
 }
 
+// Afinador en tiempo real por WebSocket
+async function toggleLiveTuner() {
+    if (tunerSocket) {
+        stopLiveTuner();
+        return;
+    }
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    tunerSocket = new WebSocket(`${protocol}//${window.location.host}/ws/tuner`);
+    tunerSocket.binaryType = 'arraybuffer';
+
+    tunerSocket.onopen = async () => {
+        const sampleRate = await recorder.startStreaming((pcm) => {
+            if (tunerSocket && tunerSocket.readyState === WebSocket.OPEN) {
+                tunerSocket.send(pcm.buffer);
+            }
+        });
+
+        if (!sampleRate) {
+            stopLiveTuner();
+            return;
+        }
+
+        // El primer mensaje es la configuración; después solo audio binario
+        tunerSocket.send(JSON.stringify({
+            sample_rate: sampleRate,
+            format: 'int16',
+            reference: referenceSelect.value,
+            temperament: temperamentSelect.value
+        }));
+        liveTunerBtn.textContent = '⏹️ Detener Afinador';
+    };
+
+    tunerSocket.onmessage = (event) => {
+        const result = JSON.parse(event.data);
+
+        if (result.success) {
+            displayResults(result);
+        } else {
+            console.error('Error:', result.error);
+        }
+    };
+
+    tunerSocket.onclose = stopLiveTuner;
+}
+
+function stopLiveTuner() {
+    recorder.stopRecording();
+
+    if (tunerSocket) {
+        const socket = tunerSocket;
+        tunerSocket = null;
+        socket.onclose = null;
+        socket.close();
+    }
+    liveTunerBtn.textContent = '🎯 Afinador en Tiempo Real';
+}
+
 // Mostrar cuenta regresiva
 function showCountdown() {
     countdownDialog.style.display = 'flex';
@@ -160,6 +229,12 @@ function countdown(seconds) {
 
 // Mostrar resultados
 function displayResults(result) {
+    // Notas simultáneas (solo si se pidió el acorde)
+    const chordEl = document.getElementById('chord');
+    chordEl.textContent = result.chord && result.chord.length
+        ? `Acorde: ${result.chord.map(n => n.note_formatted).join(' ')}`
+        : '';
+
     if (!result.has_valid_signal) {
         // Sin señal válida
         document.querySelector('.note-text').textContent = '🔇';
@@ -194,13 +269,21 @@ function displayResults(result) {
     }
 
     // Dibujar forma de onda si está disponible
-    if (result.waveform && result.waveform.length > 0) {
+    if (result.waveform && result.waveform.points > 0) {
+        currentWaveform = result.waveform;
         drawWaveform(result.waveform);
     }
 }
 
-// Dibujar forma de onda en canvas
-function drawWaveform(waveformData) {
+// Decodificar un array float32 little-endian en base64
+function decodeFloat32(base64Data) {
+    const bytes = Uint8Array.from(atob(base64Data), c => c.charCodeAt(0));
+    return new Float32Array(bytes.buffer);
+}
+
+// Dibujar forma de onda en canvas: una barra mín/máx por píxel y la
+// envolvente RMS encima
+function drawWaveform(waveform) {
     const canvas = document.getElementById('waveform');
     const ctx = canvas.getContext('2d');
 
@@ -208,33 +291,80 @@ function drawWaveform(waveformData) {
     ctx.fillStyle = '#232946';
     ctx.fillRect(0, 0, canvas.width, canvas.height);
 
-    // Configurar estilo
-    ctx.strokeStyle = '#06ffa5';
-    ctx.lineWidth = 2;
+    const minimum = decodeFloat32(waveform.min);
+    const maximum = decodeFloat32(waveform.max);
+    const rms = decodeFloat32(waveform.rms);
 
     // Normalizar datos
-    const max = Math.max(...waveformData.map(Math.abs));
-    const normalized = waveformData.map(v => v / max);
+    let peak = 0;
+    for (let i = 0; i < minimum.length; i++) {
+        peak = Math.max(peak, Math.abs(minimum[i]), Math.abs(maximum[i]));
+    }
+    if (!waveform.scale) {
+        waveform.scale = peak || 1;
+    }
 
     // Dibujar
-    ctx.beginPath();
-    const step = canvas.width / normalized.length;
+    const step = canvas.width / minimum.length;
     const centerY = canvas.height / 2;
+    const gain = centerY * 0.8 / waveform.scale;
+    const barWidth = Math.max(1, step);
+
+    ctx.fillStyle = '#06ffa5';
+    for (let i = 0; i < minimum.length; i++) {
+        const top = centerY - maximum[i] * gain;
+        const bottom = centerY - minimum[i] * gain;
+        ctx.fillRect(i * step, top, barWidth, Math.max(1, bottom - top));
+    }
 
-    normalized.forEach((value, i) => {
-        const x = i * step;
-        const y = centerY + (value * centerY * 0.8);
+    ctx.fillStyle = 'rgba(255, 255, 255, 0.35)';
+    for (let i = 0; i < rms.length; i++) {
+        const height = rms[i] * gain;
+        ctx.fillRect(i * step, centerY - height, barWidth, 2 * height);
+    }
+}
 
-        if (i === 0) {
-            ctx.moveTo(x, y);
-        } else {
-            ctx.lineTo(x, y);
-        }
-    });
+// Zoom con la rueda del ratón (doble clic para ver todo): pide al servidor la
+// envolvente del tramo visible con un punto por píxel
+async function zoomWaveform(start, end) {
+    const canvas = document.getElementById('waveform');
+    const params = new URLSearchParams({ start, end, points: canvas.width });
 
-    ctx.stroke();
+    try {
+        const response = await fetch(`/waveform/${currentWaveform.audio_id}?${params}`);
+        if (!response.ok) return;
+
+        const view = await response.json();
+        view.audio_id = currentWaveform.audio_id;
+        view.scale = currentWaveform.scale;
+        currentWaveform = view;
+        drawWaveform(view);
+    } catch (error) {
+        console.error('Error:', error);
+    }
 }
 
+document.getElementById('waveform').addEventListener('wheel', (e) => {
+    if (!currentWaveform || !currentWaveform.audio_id) return;
+    e.preventDefault();
+
+    const canvas = e.currentTarget;
+    const { start, end, duration } = currentWaveform;
+    const span = end - start;
+    const position = start + span * (e.offsetX / canvas.clientWidth);
+    const factor = e.deltaY < 0 ? 0.5 : 2;
+    const newSpan = Math.min(duration, Math.max(0.005, span * factor));
+    const newStart = Math.min(Math.max(0, position - (position - start) * newSpan / span), duration - newSpan);
+
+    zoomWaveform(newStart, newStart + newSpan);
+});
+
+document.getElementById('waveform').addEventListener('dblclick', () => {
+    if (currentWaveform && currentWaveform.audio_id) {
+        zoomWaveform(0, currentWaveform.duration);
+    }
+});
+
 // Mostrar/ocultar loading
 function showLoading(show) {
     loading.style.display = show ? 'flex' : 'none';
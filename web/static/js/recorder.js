@@ -1,4 +1,4 @@
-// Recorder.js - Web Audio API para grabación en vivo con conversión a WAV
+// Recorder.js - Web Audio API para grabación en vivo con conversión a PCM/WAV
 
 class AudioRecorder {
     constructor() {
@@ -48,12 +48,42 @@ class AudioRecorder {
             // Detener después de la duración especificada
             setTimeout(() => {
                 this.stopRecording();
-                const wavBlob = this.exportWAV();
-                resolve(wavBlob);
+                resolve(this.exportPCM());
             }, duration);
         });
     }
 
+    // Transmisión continua: entrega cada bloque del micrófono como PCM int16
+    // (bloques pequeños para que la latencia total quede por debajo de 100 ms)
+    async startStreaming(onChunk, bufferSize = 1024) {
+        if (!this.stream) {
+            const hasPermission = await this.requestPermission();
+            if (!hasPermission) return null;
+        }
+
+        this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+        this.source = this.audioContext.createMediaStreamSource(this.stream);
+        this.processor = this.audioContext.createScriptProcessor(bufferSize, 1, 1);
+
+        this.processor.onaudioprocess = (e) => {
+            onChunk(this.floatToInt16(e.inputBuffer.getChannelData(0)));
+        };
+
+        this.source.connect(this.processor);
+        this.processor.connect(this.audioContext.destination);
+
+        return this.audioContext.sampleRate;
+    }
+
+    floatToInt16(samples) {
+        const pcm = new Int16Array(samples.length);
+        for (let i = 0; i < samples.length; i++) {
+            const sample = Math.max(-1, Math.min(1, samples[i]));
+            pcm[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+        }
+        return pcm;
+    }
+
     stopRecording() {
         if (this.processor) {
             this.processor.disconnect();
@@ -65,10 +95,7 @@ class AudioRecorder {
         }
     }
 
-    exportWAV() {
-        const sampleRate = this.audioContext.sampleRate;
-        const numChannels = 1;
-
+    mergeBuffers() {
         // Combinar todos los buffers
         let totalLength = 0;
         for (let i = 0; i < this.audioData.length; i++) {
@@ -81,6 +108,25 @@ class AudioRecorder {
             samples.set(this.audioData[i], offset);
             offset += this.audioData[i].length;
         }
+        return samples;
+    }
+
+    // PCM crudo int16 little-endian (mitad de bytes que float32, sin cabecera
+    // ni base64) para enviar como application/octet-stream
+    exportPCM() {
+        const pcm = this.floatToInt16(this.mergeBuffers());
+        // Int16Array usa el orden de bytes de la plataforma (little-endian en la práctica)
+        return {
+            blob: new Blob([pcm.buffer], { type: 'application/octet-stream' }),
+            sampleRate: this.audioContext.sampleRate,
+            format: 'int16'
+        };
+    }
+
+    exportWAV() {
+        const sampleRate = this.audioContext.sampleRate;
+        const numChannels = 1;
+        const samples = this.mergeBuffers();
 
         // Convertir a WAV
         const wavBuffer = this.encodeWAV(samples, sampleRate, numChannels);
@@ -0,0 +1,197 @@
+"""
+Pool de procesos para el análisis de audio
+Ejecuta los análisis (CPU) fuera del bucle de eventos del servidor ASGI,
+con un límite de trabajos en espera para no acumular peticiones sin fin
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+def env_int(name, default):
+    """Leer un entero de una variable de entorno (default si no está definida)"""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# Configuración por variables de entorno
+ANALYSIS_WORKERS = env_int('ANALYSIS_WORKERS', os.cpu_count() or 1)
+ANALYSIS_QUEUE_LIMIT = env_int('ANALYSIS_QUEUE_LIMIT', 2 * ANALYSIS_WORKERS)
+
+
+class PoolBusyError(RuntimeError):
+    """El pool está ejecutando y esperando el máximo de trabajos permitido"""
+
+
+# Mensaje para los trabajos que estaban en un proceso que murió
+WORKER_DIED = 'Un proceso de análisis terminó inesperadamente, inténtalo de nuevo'
+
+
+class AnalysisPool:
+    """
+    ProcessPoolExecutor acotado
+    
+    Como máximo `max_workers` análisis se ejecutan a la vez y `queue_limit`
+    esperan turno; por encima de eso submit() rechaza el trabajo en lugar de
+    encolarlo, para que el servidor pueda responder 503 de inmediato.
+    
+    Si un proceso muere (p. ej. el sistema lo mata por falta de memoria con
+    un archivo enorme), ProcessPoolExecutor queda roto para siempre: los
+    trabajos que estaban en vuelo fallan con PoolBusyError (503) y el
+    siguiente envío crea un pool nuevo.
+    """
+    
+    def __init__(self, max_workers=None, queue_limit=None):
+        """
+        Args:
+            max_workers (int): Procesos de análisis (default: ANALYSIS_WORKERS)
+            queue_limit (int): Trabajos en espera permitidos
+                (default: ANALYSIS_QUEUE_LIMIT)
+        """
+        self.max_workers = max_workers or ANALYSIS_WORKERS
+        self.queue_limit = ANALYSIS_QUEUE_LIMIT if queue_limit is None else queue_limit
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        
+    @property
+    def pending(self):
+        """Trabajos en ejecución o en espera"""
+        return self._pending
+        
+    def start(self):
+        """Crear los procesos (se llama al arrancar el servidor)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            
+    def shutdown(self):
+        """Terminar los procesos al parar el servidor"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            
+    def submit(self, fn, *args, **kwargs):
+        """
+        Enviar un trabajo al pool
+        
+        Args:
+            fn (callable): Función de nivel de módulo (debe poder serializarse)
+            
+        Returns:
+            concurrent.futures.Future: Resultado del trabajo
+            
+        Raises:
+            PoolBusyError: Si ya hay max_workers + queue_limit trabajos
+        """
+        if not self._acquire(self.max_workers + self.queue_limit):
+            raise PoolBusyError('Servidor ocupado, inténtalo de nuevo')
+        return self._submit(fn, *args, **kwargs)
+        
+    def map_unordered(self, fn, items, window=None):
+        """
+        Ejecutar fn(*args) para cada tupla de argumentos, en paralelo
+        
+        Los argumentos se consumen de forma perezosa y nunca hay más de
+        `window` trabajos en vuelo, así que un lote grande no satura la cola
+        ni carga todos los archivos en memoria a la vez.
+        
+        El lote respeta la capacidad del pool: su primer trabajo (o el
+        siguiente, si no le queda ninguno en vuelo) entra con el mismo límite
+        que submit(), y los demás solo ocupan procesos libres, nunca los
+        puestos de la cola, que quedan para las peticiones sueltas. Si el
+        pool está lleno, el lote espera a sus propios trabajos, es decir, se
+        encoge; varios lotes a la vez se reparten los procesos.
+        
+        Args:
+            fn (callable): Función de nivel de módulo
+            items (iterable): Tuplas de argumentos
+            window (int): Trabajos simultáneos (default: max_workers)
+            
+        Yields:
+            Resultado de cada trabajo, en el orden en que terminan
+            
+        Raises:
+            PoolBusyError: Si el pool está lleno y el lote no tiene trabajos
+                en vuelo a los que esperar
+        """
+        window = window or self.max_workers
+        in_flight = set()
+        
+        try:
+            for args in items:
+                while True:
+                    if len(in_flight) < window:
+                        limit = self.max_workers if in_flight else self.max_workers + self.queue_limit
+                        if self._acquire(limit):
+                            break
+                        if not in_flight:
+                            raise PoolBusyError('Servidor ocupado, inténtalo de nuevo')
+                            
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield self._result(future)
+                        
+                in_flight.add(self._submit(fn, *args))
+                
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._result(future)
+        finally:
+            # Cliente desconectado o error: no dejar trabajos huérfanos en cola
+            for future in in_flight:
+                future.cancel()
+                
+    async def run(self, fn, *args, **kwargs):
+        """Versión async de submit(): espera el resultado sin bloquear el bucle"""
+        try:
+            return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        except BrokenProcessPool:
+            raise PoolBusyError(WORKER_DIED) from None
+        
+    def _acquire(self, limit):
+        """Reservar un puesto si hay menos de `limit` trabajos pendientes"""
+        with self._lock:
+            if self._pending >= limit:
+                return False
+            self._pending += 1
+            return True
+            
+    def _submit(self, fn, *args, **kwargs):
+        """Enviar un trabajo con el puesto ya reservado"""
+        self.start()
+        executor = self._executor
+        try:
+            try:
+                future = executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # Un proceso murió: pool nuevo y un solo reintento
+                future = self._restart(executor).submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+        
+    def _restart(self, broken):
+        """Sustituir un pool roto (una sola vez aunque lo detecten varios hilos)"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self._executor
+            
+    @staticmethod
+    def _result(future):
+        """Resultado de un trabajo; PoolBusyError si su proceso murió"""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            raise PoolBusyError(WORKER_DIED) from None
+            
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1